@@ -1,4 +1,4 @@
-from flask import Flask, jsonify, send_from_directory
+from flask import Flask, jsonify, abort
 from flask_cors import CORS
 from flask_migrate import Migrate
 from flask_login import LoginManager
@@ -6,6 +6,8 @@ from authlib.integrations.flask_client import OAuth
 import os
 from config import Config
 from models import db, User
+from routes.static_assets import StaticAssets
+from routes.compression import init_compression
 
 def create_app():
     # Configure static folder for different deployment environments
@@ -29,18 +31,16 @@ def create_app():
 
     app = Flask(__name__, static_folder=static_dir)
     print(f"Static folder configured: {app.static_folder}")
-    print(f"Static folder exists: {os.path.exists(app.static_folder)}")
-    if os.path.exists(app.static_folder):
-        try:
-            contents = os.listdir(app.static_folder)
-            print(f"Static folder contents: {contents[:5]}...")  # Show first 5 items
-        except Exception as e:
-            print(f"Error reading static folder: {e}")
     app.config.from_object(Config)
+    # UTF-8 output (e.g. '°C') matches the fast encoder in services/serialization.py
+    app.json.ensure_ascii = False
 
     # Enable CORS with credentials support
     CORS(app, resources={r"/api/*": {"origins": "*", "supports_credentials": True}})
 
+    # Compress JSON/NDJSON/CSV API responses (see routes/compression.py)
+    init_compression(app)
+
     # Initialize extensions
     db.init_app(app)
     migrate = Migrate(app, db)
@@ -84,39 +84,40 @@ def create_app():
     from routes.health_routes import health_bp
     from routes.blood_test_routes import blood_test_bp
     from routes.user_routes import user_bp
+    from routes.dashboard_routes import dashboard_bp
+    from routes.analytics_routes import analytics_bp
     
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
     app.register_blueprint(health_bp, url_prefix='/api/health')
     app.register_blueprint(blood_test_bp, url_prefix='/api/blood-tests')
     app.register_blueprint(user_bp, url_prefix='/api/users')
+    app.register_blueprint(dashboard_bp, url_prefix='/api/dashboard')
+    app.register_blueprint(analytics_bp, url_prefix='/api/analytics')
     
     # Serve React frontend (exclude API routes)
+    # The build folder is indexed once here (see routes/static_assets.py)
+    static_assets = StaticAssets(app.static_folder)
+    print(f"Static assets indexed: {len(static_assets.assets)} files")
+
     @app.route('/', defaults={'path': ''})
     @app.route('/<path:path>')
     def serve(path):
         # Skip API routes - let blueprints handle them
         if path.startswith('api/'):
-            from flask import abort
             abort(404)
 
-        # Check static files first
-        if path and path.startswith('static/'):
-            static_path = os.path.join(app.static_folder, path)
-            print(f"Static request: {path}")
-            print(f"Static folder: {app.static_folder}")
-            print(f"Full path: {static_path}")
-            print(f"File exists: {os.path.exists(static_path)}")
-
-            if os.path.exists(static_path):
-                print(f"✅ Serving static file: {path}")
-                return send_from_directory(app.static_folder, path)
-            else:
-                print(f"❌ Static file not found: {path}")
-                print(f"Available in static folder: {os.listdir(app.static_folder) if os.path.exists(app.static_folder) else 'N/A'}")
-                return f"Static file not found: {path}", 404
+        # Build files first
+        response = static_assets.response(path) if path else None
+        if response is not None:
+            return response
+        if path.startswith('static/'):
+            return f"Static file not found: {path}", 404
 
         # For all other routes, serve index.html (SPA routing)
-        return send_from_directory(app.static_folder, 'index.html')
+        response = static_assets.response('index.html')
+        if response is None:
+            abort(404)
+        return response
     
     # Health check endpoint
     @app.route('/api/health-check')
@@ -24,6 +24,10 @@ if [ ! -f "frontend/build/index.html" ]; then
     exit 1
 fi
 
+# Precompress static assets (served as .br/.gz variants by the app)
+echo "🗜️  Precompressing frontend assets..."
+python precompress_assets.py frontend/build
+
 # Make sync scheduler executable
 chmod +x sync_scheduler.py
 echo "✅ Sync scheduler configured!"
@@ -14,7 +14,32 @@ class Config:
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     UPLOAD_FOLDER = 'uploads/blood_tests'
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
+    EXPORT_FOLDER = os.getenv('EXPORT_FOLDER', 'exports')
+    EXPORT_LINK_TTL = int(os.getenv('EXPORT_LINK_TTL', 3600))  # Seconds a download link stays valid
+    EXPORT_ARCHIVES_KEPT = 2  # Completed archives kept per user (latest is the next delta base)
     
+    # Cache for derived per-user data (see services/cache.py)
+    CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'memory')  # memory, null or module:Class
+    CACHE_MAX_ENTRIES = int(os.getenv('CACHE_MAX_ENTRIES', 1024))
+    CACHE_DEFAULT_TIMEOUT = int(os.getenv('CACHE_DEFAULT_TIMEOUT', 300))  # Seconds
+    SERIES_CACHE_MAX_BYTES = int(os.getenv('SERIES_CACHE_MAX_BYTES', 64 * 1024 * 1024))  # In-memory NumPy series cache, 0 disables
+
+    # Anomaly detection on ingested series (see services/anomaly_service.py)
+    ANOMALY_EWMA_SPAN = int(os.getenv('ANOMALY_EWMA_SPAN', 30))  # Days; EWMA alpha = 2 / (span + 1)
+    ANOMALY_ZSCORE_THRESHOLD = float(os.getenv('ANOMALY_ZSCORE_THRESHOLD', 3.0))
+    ANOMALY_MIN_OBSERVATIONS = int(os.getenv('ANOMALY_MIN_OBSERVATIONS', 14))  # Warm-up before values are scored
+
+    # Per-user monthly Parquet snapshots queried with DuckDB (see services/snapshot_service.py)
+    SNAPSHOT_FOLDER = os.getenv('SNAPSHOT_FOLDER', 'snapshots')
+    SNAPSHOT_QUERY_THREADS = int(os.getenv('SNAPSHOT_QUERY_THREADS', 2))  # DuckDB threads per query
+    SNAPSHOT_QUERY_MEMORY_LIMIT = os.getenv('SNAPSHOT_QUERY_MEMORY_LIMIT', '256MB')
+
+    # Response compression for /api/* (see routes/compression.py)
+    COMPRESSION_ENABLED = os.getenv('COMPRESSION_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', 1024))  # Bytes; smaller bodies are sent as is
+    COMPRESSION_GZIP_LEVEL = int(os.getenv('COMPRESSION_GZIP_LEVEL', 6))  # 1-9
+    COMPRESSION_BROTLI_QUALITY = int(os.getenv('COMPRESSION_BROTLI_QUALITY', 4))  # 0-11
+
     # OAuth Configuration
     GOOGLE_CLIENT_ID = os.getenv('GOOGLE_CLIENT_ID')
     GOOGLE_CLIENT_SECRET = os.getenv('GOOGLE_CLIENT_SECRET')
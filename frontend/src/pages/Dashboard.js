@@ -19,20 +19,13 @@ function Dashboard({ user }) {
   const loadDashboardData = async () => {
     setLoading(true);
     try {
-      // Load integrations
-      const integrationsResponse = await apiFetch('/api/auth/integrations');
-      const integrationsData = await integrationsResponse.json();
-      setIntegrations(integrationsData);
-
-      // Load health summary
-      const healthResponse = await apiFetch('/api/health/summary?days=7');
-      const healthData = await healthResponse.json();
-      setHealthSummary(healthData);
-
-      // Load recent blood tests
-      const bloodTestsResponse = await apiFetch('/api/blood-tests');
-      const bloodTestsData = await bloodTestsResponse.json();
-      setBloodTests(bloodTestsData.slice(0, 3)); // Show only 3 most recent
+      // Load integrations, health summary and recent blood tests in one request
+      // (columnar: each summary's values is a plain array, oldest to newest)
+      const response = await apiFetch('/api/dashboard?days=7&blood_tests_limit=3&layout=columnar');
+      const data = await response.json();
+      setIntegrations(data.integrations);
+      setHealthSummary(data.health_summary);
+      setBloodTests(data.blood_tests); // Only the 3 most recent
     } catch (error) {
       console.error('Error loading dashboard data:', error);
     } finally {
@@ -180,11 +173,11 @@ function Dashboard({ user }) {
                   <div key={type} className="metric-item">
                     <div className="metric-label">{type.replace(/_/g, ' ')}</div>
                     <div className="metric-value">
-                      {data.values.length > 0 && data.values[data.values.length - 1]?.value !== undefined && (
+                      {data.values.length > 0 && data.values[data.values.length - 1] !== undefined && (
                         <>
-                          {typeof data.values[data.values.length - 1].value === 'number'
-                            ? data.values[data.values.length - 1].value.toFixed(1)
-                            : data.values[data.values.length - 1].value}
+                          {typeof data.values[data.values.length - 1] === 'number'
+                            ? data.values[data.values.length - 1].toFixed(1)
+                            : data.values[data.values.length - 1]}
                           <span className="metric-unit">{data.unit || ''}</span>
                         </>
                       )}
@@ -28,8 +28,23 @@ ChartJS.register(
   Filler
 );
 
+// Dates of a columnar series; dates=delta responses send a start date plus day offsets
+const decodeDates = (series) => {
+  if (series.dates) {
+    return series.dates;
+  }
+  const dates = [];
+  let day = new Date(`${series.start_date}T00:00:00Z`);
+  series.date_deltas.forEach(delta => {
+    day = new Date(day.getTime() + delta * 86400000);
+    dates.push(day.toISOString().slice(0, 10));
+  });
+  return dates;
+};
+
 function HealthData({ user }) {
   const [healthData, setHealthData] = useState([]);
+  const [series, setSeries] = useState([]);
   const [dataTypes, setDataTypes] = useState([]);
   const [selectedType, setSelectedType] = useState('');
   const [dateRange, setDateRange] = useState('30');
@@ -62,9 +77,12 @@ function HealthData({ user }) {
       const startDate = new Date();
       startDate.setDate(startDate.getDate() - parseInt(dateRange));
 
+      // One object per provider series with parallel date/value arrays
       const params = new URLSearchParams({
         start_date: startDate.toISOString(),
-        end_date: endDate.toISOString()
+        end_date: endDate.toISOString(),
+        layout: 'columnar',
+        dates: 'delta'
       });
 
       if (selectedType) {
@@ -73,7 +91,18 @@ function HealthData({ user }) {
 
       const response = await apiFetch(`/api/health?${params}`);
       const data = await response.json();
-      setHealthData(data);
+      const decoded = data.series.map(item => ({ ...item, dates: decodeDates(item) }));
+      setSeries(decoded);
+
+      // Flat rows, newest first, for the table and stats
+      const rows = decoded.flatMap(item => item.dates.map((date, index) => ({
+        date,
+        provider: item.provider,
+        value: item.values[index],
+        unit: item.unit
+      })));
+      rows.sort((a, b) => b.date.localeCompare(a.date));
+      setHealthData(rows);
     } catch (error) {
       console.error('Error loading health data:', error);
     } finally {
@@ -82,35 +111,22 @@ function HealthData({ user }) {
   };
 
   const prepareChartData = () => {
-    if (!healthData.length) {
+    if (!series.length) {
       return null;
     }
 
-    // Group by provider
-    const groupedData = {};
-    healthData.forEach(item => {
-      if (!groupedData[item.provider]) {
-        groupedData[item.provider] = [];
-      }
-      groupedData[item.provider].push(item);
-    });
-
-    // Sort each group by date
-    Object.keys(groupedData).forEach(provider => {
-      groupedData[provider].sort((a, b) => new Date(a.date) - new Date(b.date));
-    });
-
     const colors = {
       fitbit: { border: '#00b0b9', bg: 'rgba(0, 176, 185, 0.1)' },
       oura: { border: '#6772e5', bg: 'rgba(103, 114, 229, 0.1)' },
       clue: { border: '#ff5c8d', bg: 'rgba(255, 92, 141, 0.1)' }
     };
 
-    const datasets = Object.entries(groupedData).map(([provider, data]) => ({
+    // Series arrive grouped by provider and sorted by date
+    const datasets = series.map(({ provider, dates, values }) => ({
       label: provider.charAt(0).toUpperCase() + provider.slice(1),
-      data: data.map(item => ({
-        x: item.date,
-        y: item.value
+      data: dates.map((date, index) => ({
+        x: date,
+        y: values[index]
       })),
       borderColor: colors[provider]?.border || '#ff7744',
       backgroundColor: colors[provider]?.bg || 'rgba(255, 119, 68, 0.1)',
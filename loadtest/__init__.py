@@ -0,0 +1,5 @@
+"""
+Load-testing tools
+- generate_data: bulk-load a synthetic multi-year dataset
+- run: drive the API with authenticated sessions and report latency percentiles
+"""
@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Synthetic dataset generator for load tests
+Bulk-loads users, integrations, health_data, blood_tests and blood_markers
+with realistic daily series: per-user baselines, autocorrelated day-to-day
+noise, weekly patterns, missing days and menstrual cycles for Clue users.
+Rows go in with COPY on PostgreSQL and executemany elsewhere, bypassing the
+ingestion path; derived tables are rebuilt afterwards (--skip-derived to
+leave them empty).
+
+Target database comes from DATABASE_URL (or --database-url), e.g.
+sqlite:///loadtest.db or postgresql://localhost/health_loadtest
+
+Usage: python -m loadtest.generate_data [--users 100] [--years 5] [--metrics 30] [--database-url URL]
+"""
+
+import argparse
+import csv
+import io
+import os
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+# Add repository root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# (provider, data_type, unit, mean, std, low, high, decimals), most common first;
+# --metrics N loads the first N
+METRICS = (
+    ('oura', 'sleep_score', 'score', 76, 8, 0, 100, 0),
+    ('oura', 'readiness_score', 'score', 78, 9, 0, 100, 0),
+    ('oura', 'activity_score', 'score', 80, 9, 0, 100, 0),
+    ('oura', 'sleep_duration', 'hours', 7.2, 0.8, 2, 12, 2),
+    ('oura', 'resting_heart_rate', 'bpm', 58, 5, 38, 100, 0),
+    ('oura', 'hrv', 'ms', 45, 12, 8, 180, 0),
+    ('oura', 'steps', 'steps', 8000, 3000, 0, 40000, 0),
+    ('oura', 'temperature_deviation', '°C', 0, 0.25, -2, 2, 2),
+    ('fitbit', 'steps', 'steps', 8200, 3200, 0, 40000, 0),
+    ('fitbit', 'resting_heart_rate', 'bpm', 60, 5, 38, 100, 0),
+    ('fitbit', 'sleep_duration', 'hours', 7.0, 0.9, 2, 12, 2),
+    ('fitbit', 'distance', 'km', 6, 2.5, 0, 40, 2),
+    ('fitbit', 'calories', 'kcal', 2300, 300, 1200, 5000, 0),
+    ('clue', 'cycle_day', 'day', None, None, None, None, 0),
+    ('clue', 'period', 'boolean', None, None, None, None, 0),
+    ('oura', 'rem_sleep', 'hours', 1.6, 0.4, 0, 4, 2),
+    ('oura', 'deep_sleep', 'hours', 1.2, 0.35, 0, 3, 2),
+    ('oura', 'light_sleep', 'hours', 4.2, 0.6, 1, 8, 2),
+    ('oura', 'sleep_efficiency', '%', 88, 5, 50, 100, 0),
+    ('oura', 'sleep_latency', 'minutes', 15, 8, 0, 90, 0),
+    ('oura', 'sleep_wakeups', 'count', 2, 1.2, 0, 12, 0),
+    ('oura', 'temperature_trend_deviation', '°C', 0, 0.15, -1.5, 1.5, 2),
+    ('oura', 'body_temperature', '°C', 36.6, 0.2, 35.5, 38.5, 2),
+    ('oura', 'active_calories', 'kcal', 450, 150, 0, 2000, 0),
+    ('oura', 'target_calories', 'kcal', 500, 50, 200, 1000, 0),
+    ('oura', 'sedentary_time', 'hours', 8, 1.5, 0, 18, 2),
+    ('oura', 'low_activity_time', 'hours', 3, 1, 0, 10, 2),
+    ('oura', 'medium_activity_time', 'hours', 0.8, 0.4, 0, 5, 2),
+    ('oura', 'high_activity_time', 'hours', 0.2, 0.15, 0, 3, 2),
+    ('clue', 'mood', 'score', 3, 1, 1, 5, 0),
+)
+
+# (marker_name, unit, reference_low, reference_high, mean, std)
+BLOOD_MARKERS = (
+    ('Hemoglobin', 'g/dL', 12.0, 17.5, 14.5, 1.2),
+    ('Hematocrit', '%', 36, 50, 43, 3),
+    ('White Blood Cells', '10^9/L', 4.0, 11.0, 6.5, 1.5),
+    ('Platelets', '10^9/L', 150, 400, 260, 50),
+    ('Glucose', 'mg/dL', 70, 99, 88, 9),
+    ('HbA1c', '%', 4.0, 5.6, 5.2, 0.3),
+    ('Total Cholesterol', 'mg/dL', 125, 200, 185, 30),
+    ('LDL', 'mg/dL', 0, 100, 105, 25),
+    ('HDL', 'mg/dL', 40, 90, 58, 12),
+    ('Triglycerides', 'mg/dL', 0, 150, 110, 40),
+    ('TSH', 'mIU/L', 0.4, 4.0, 1.9, 0.8),
+    ('Vitamin D', 'ng/mL', 30, 100, 32, 10),
+    ('Ferritin', 'ng/mL', 30, 300, 90, 45),
+    ('Iron', 'ug/dL', 60, 170, 100, 30),
+    ('CRP', 'mg/L', 0, 3.0, 1.2, 1.0),
+)
+
+LAB_NAMES = ('Quest Diagnostics', 'LabCorp', 'Sonic Healthcare', 'Synlab')
+PROVIDER_SHARE = {'oura': 0.8, 'fitbit': 0.5, 'clue': 0.4}  # Share of users with each integration
+MISSING_DAY_RATE = 0.05
+AR_COEFFICIENT = 0.7  # Day-to-day autocorrelation of the noise
+BLOOD_TESTS_PER_YEAR = 2
+
+
+def _metric_series(rng, specs, days):
+    """(n_metrics, days) values: user baseline + AR(1) noise + weekly pattern"""
+    means = np.array([spec[3] for spec in specs], dtype=float)
+    stds = np.array([spec[4] for spec in specs], dtype=float)
+
+    baseline = means + rng.normal(0, 0.5, len(specs)) * stds
+    innovations = rng.normal(0, np.sqrt(1 - AR_COEFFICIENT ** 2), (days, len(specs)))
+    noise = np.empty_like(innovations)
+    noise[0] = rng.normal(0, 1, len(specs))
+    for day in range(1, days):
+        noise[day] = AR_COEFFICIENT * noise[day - 1] + innovations[day]
+
+    weekly = rng.normal(0, 0.2, (7, len(specs)))  # Per-user weekday effect in std units
+    weekday = (np.arange(days) + rng.integers(7)) % 7
+    values = baseline + (noise + weekly[weekday]) * stds
+
+    for i, (_, _, _, _, _, low, high, decimals) in enumerate(specs):
+        values[:, i] = np.round(np.clip(values[:, i], low, high), decimals)
+    return values.T
+
+
+def _cycle_rows(rng, user_id, dates, now):
+    """cycle_day for every day and period on bleeding days, as health_data tuples"""
+    rows = []
+    cycle_day = int(rng.integers(1, 29))
+    cycle_length = int(np.clip(round(rng.normal(28.5, 2.5)), 21, 40))
+    period_length = int(rng.integers(3, 8))
+    for day in dates:
+        rows.append((user_id, 'clue', 'cycle_day', day, float(cycle_day), 'day', now, now))
+        if cycle_day <= period_length:
+            rows.append((user_id, 'clue', 'period', day, 1.0, 'boolean', now, now))
+        cycle_day += 1
+        if cycle_day > cycle_length:
+            cycle_day = 1
+            cycle_length = int(np.clip(round(rng.normal(28.5, 2.5)), 21, 40))
+            period_length = int(rng.integers(3, 8))
+    return rows
+
+
+def generate_user_health_data(rng, user_id, providers, metrics, dates):
+    """health_data tuples for one user (columns as in HEALTH_DATA_INSERT_COLUMNS)"""
+    now = datetime.utcnow()
+    specs = [spec for spec in metrics if spec[0] in providers and spec[3] is not None]
+    rows = []
+
+    if specs:
+        values = _metric_series(rng, specs, len(dates))
+        present = rng.random(values.shape) >= MISSING_DAY_RATE
+        for (provider, data_type, unit, *_), series, mask in zip(specs, values, present):
+            for day, value, keep in zip(dates, series.tolist(), mask.tolist()):
+                if keep:
+                    rows.append((user_id, provider, data_type, day, value, unit, now, now))
+
+    if 'clue' in providers and any(spec[1] == 'cycle_day' for spec in metrics):
+        rows.extend(_cycle_rows(rng, user_id, dates, now))
+    return rows
+
+
+def generate_blood_tests(rng, dates):
+    """[(test_date, lab_name, [marker tuples])] spread over the date range"""
+    count = max(1, round(len(dates) / 365 * BLOOD_TESTS_PER_YEAR))
+    tests = []
+    lab_name = LAB_NAMES[rng.integers(len(LAB_NAMES))]
+    for index in sorted(rng.choice(len(dates), size=min(count, len(dates)), replace=False)):
+        markers = []
+        for name, unit, low, high, mean, std in BLOOD_MARKERS:
+            value = round(max(0.0, rng.normal(mean, std)), 2)
+            markers.append((name, value, unit, low, high, not (low <= value <= high)))
+        tests.append((dates[index], lab_name, markers))
+    return tests
+
+
+HEALTH_DATA_INSERT_COLUMNS = ('user_id', 'provider', 'data_type', 'date', 'value', 'unit', 'created_at', 'updated_at')
+BLOOD_MARKER_INSERT_COLUMNS = ('blood_test_id', 'marker_name', 'value', 'unit',
+                               'reference_range_low', 'reference_range_high', 'is_abnormal')
+
+
+def bulk_insert(connection, table, columns, rows):
+    """Insert tuples into a table: COPY on PostgreSQL, executemany otherwise"""
+    if not rows:
+        return
+    if connection.dialect.name == 'postgresql':
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        buffer.seek(0)
+        cursor = connection.connection.cursor()
+        cursor.copy_expert(f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+        cursor.close()
+    else:
+        connection.execute(table.insert(), [dict(zip(columns, row)) for row in rows])
+
+
+def generate_dataset(users, years, metric_count, seed=42, batch_users=50, email_prefix='loadtest', skip_derived=False):
+    """Load users × years × metrics of synthetic data into the configured database"""
+    from sqlalchemy import func
+    from app import create_app
+    from models import db, User, Integration, HealthData, BloodTest, BloodMarker
+
+    app = create_app()
+    rng = np.random.default_rng(seed)
+    metrics = METRICS[:metric_count]
+    end = date.today()
+    dates = [end - timedelta(days=offset) for offset in range(years * 365 - 1, -1, -1)]
+
+    with app.app_context():
+        print(f"=== SYNTHETIC DATA LOAD START: {datetime.utcnow()} ===")
+        print(f"Database: {db.engine.url.render_as_string(hide_password=True)}")
+        db.create_all()
+
+        offset = db.session.query(func.count(User.id)).filter(User.email.like(f'{email_prefix}-%')).scalar()
+        user_ids = []
+        total_rows = 0
+        started = time.perf_counter()
+
+        for batch_start in range(0, users, batch_users):
+            batch_size = min(batch_users, users - batch_start)
+            with db.engine.begin() as connection:
+                ids = connection.execute(
+                    User.__table__.insert().returning(User.__table__.c.id, sort_by_parameter_order=True),
+                    [{
+                        'email': f'{email_prefix}-{offset + batch_start + i}@example.com',
+                        'name': f'Load Test {offset + batch_start + i}',
+                        'data_version': 0,
+                        'created_at': datetime.utcnow(),
+                        'updated_at': datetime.utcnow(),
+                    } for i in range(batch_size)]
+                ).scalars().all()
+
+                integrations, health_rows, tests = [], [], []
+                for user_id in ids:
+                    providers = {p for p, share in PROVIDER_SHARE.items() if rng.random() < share} or {'oura'}
+                    integrations.extend({
+                        'user_id': user_id, 'provider': provider, 'is_active': True,
+                        'access_token': 'loadtest', 'last_sync': datetime.utcnow(), 'created_at': datetime.utcnow()
+                    } for provider in sorted(providers))
+                    health_rows.extend(generate_user_health_data(rng, user_id, providers, metrics, dates))
+                    tests.extend((user_id, test) for test in generate_blood_tests(rng, dates))
+
+                connection.execute(Integration.__table__.insert(), integrations)
+                bulk_insert(connection, HealthData.__table__, HEALTH_DATA_INSERT_COLUMNS, health_rows)
+
+                test_ids = connection.execute(
+                    BloodTest.__table__.insert().returning(BloodTest.__table__.c.id, sort_by_parameter_order=True),
+                    [{
+                        'user_id': user_id, 'test_date': test_date, 'lab_name': lab_name,
+                        'created_at': datetime.utcnow(), 'updated_at': datetime.utcnow()
+                    } for user_id, (test_date, lab_name, _) in tests]
+                ).scalars().all()
+                bulk_insert(connection, BloodMarker.__table__, BLOOD_MARKER_INSERT_COLUMNS, [
+                    (test_id, *marker) for test_id, (_, (_, _, markers)) in zip(test_ids, tests) for marker in markers
+                ])
+
+            user_ids.extend(ids)
+            total_rows += len(health_rows)
+            elapsed = time.perf_counter() - started
+            print(f"{len(user_ids)}/{users} users, {total_rows:,} health_data rows "
+                  f"({total_rows / elapsed:,.0f} rows/s)")
+
+        if not skip_derived:
+            from services import rollup_service, catalog_service, anomaly_service, reconciliation, snapshot_service
+            print("Rebuilding derived tables")
+            for uid in user_ids:
+                rollup_service.rebuild_rollups(uid)
+                catalog_service.rebuild_catalog(uid)
+                anomaly_service.rebuild_anomalies(uid)
+                reconciliation.rebuild_canonical(uid)
+                snapshot_service.rebuild_snapshots(uid)
+
+        if user_ids:
+            print(f"User ids {user_ids[0]}-{user_ids[-1]}")
+        print(f"✅ Loaded {len(user_ids)} users and {total_rows:,} health_data rows "
+              f"in {time.perf_counter() - started:.1f}s")
+        return user_ids
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Bulk-load a synthetic health dataset for load tests')
+    parser.add_argument('--users', type=int, default=100, help='Users to create (default 100)')
+    parser.add_argument('--years', type=int, default=5, help='Years of daily history per user (default 5)')
+    parser.add_argument('--metrics', type=int, default=len(METRICS),
+                        help=f'Metrics per user, at most {len(METRICS)} (default all)')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed (default 42)')
+    parser.add_argument('--batch-users', type=int, default=50, help='Users per transaction (default 50)')
+    parser.add_argument('--email-prefix', default='loadtest', help='Prefix of generated user emails')
+    parser.add_argument('--skip-derived', action='store_true', help='Do not rebuild rollups, catalog and other derived tables')
+    parser.add_argument('--database-url', help='Overrides DATABASE_URL')
+    args = parser.parse_args()
+
+    if args.database_url:
+        os.environ['DATABASE_URL'] = args.database_url
+    generate_dataset(args.users, args.years, min(args.metrics, len(METRICS)), seed=args.seed,
+                     batch_users=args.batch_users, email_prefix=args.email_prefix, skip_derived=args.skip_derived)
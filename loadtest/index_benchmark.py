@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+health_data index benchmark
+Loads the same synthetic dataset into a scratch health_data table once per
+index set and measures what each set costs writes and buys reads:
+- bulk load, sync-style inserts and value updates (rows/s), each row looked
+  up by its unique key first the way services.ingestion does
+- median/p95 latency of every hot query from loadtest.query_plans
+- index size
+
+Runs on a temporary SQLite file by default; with a PostgreSQL --database-url
+the tables are created in a scratch schema (index_benchmark) and dropped
+afterwards.
+
+Usage: python -m loadtest.index_benchmark [--users 30] [--years 3] [--repeats 20] [--database-url URL]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+# Add repository root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Secondary indexes per set; the unique (user_id, provider, data_type, date)
+# constraint is always present
+INDEX_SETS = {
+    'previous': {
+        'idx_user_date': ('user_id', 'date'),
+        'idx_user_type_date': ('user_id', 'data_type', 'date'),
+        'idx_user_provider': ('user_id', 'provider'),
+        'idx_user_provider_date': ('user_id', 'provider', 'date'),
+        'idx_user_provider_type': ('user_id', 'provider', 'data_type'),
+    },
+    'consolidated': {
+        'idx_user_date': ('user_id', 'date'),
+        'idx_user_type_date': ('user_id', 'data_type', 'date'),
+    },
+}
+
+SCRATCH_SCHEMA = 'index_benchmark'
+COMMIT_EVERY = 50  # Rows per transaction for the sync-style writes
+
+
+def benchmark_table(metadata, indexes):
+    """health_data with the model's columns (no foreign keys) and the given indexes"""
+    from sqlalchemy import Column, Index, Table, UniqueConstraint
+    from models import HealthData
+
+    columns = [
+        Column(column.name, column.type, primary_key=column.primary_key, nullable=column.nullable)
+        for column in HealthData.__table__.columns
+    ]
+    return Table(
+        'health_data', metadata, *columns,
+        UniqueConstraint('user_id', 'provider', 'data_type', 'date', name='unique_user_provider_type_date'),
+        *[Index(name, *index_columns) for name, index_columns in indexes.items()]
+    )
+
+
+def _engine(database_url, set_name):
+    from sqlalchemy import create_engine
+
+    if database_url and database_url.startswith('postgresql'):
+        engine = create_engine(database_url, connect_args={'options': f'-csearch_path={SCRATCH_SCHEMA}'})
+        with engine.begin() as connection:
+            connection.exec_driver_sql(f'CREATE SCHEMA IF NOT EXISTS {SCRATCH_SCHEMA}')
+        return engine, None
+
+    path = os.path.join(tempfile.mkdtemp(prefix='index_benchmark_'), f'{set_name}.db')
+    return create_engine(f'sqlite:///{path}'), path
+
+
+def _index_bytes(connection, indexes):
+    """Total on-disk size of the secondary indexes and the unique constraint"""
+    names = list(indexes) + ['unique_user_provider_type_date']
+    if connection.dialect.name == 'postgresql':
+        return sum(connection.exec_driver_sql(
+            'SELECT pg_relation_size(%(name)s::regclass)', {'name': f'{SCRATCH_SCHEMA}.{name}'}
+        ).scalar() for name in names)
+    # SQLite names the unique constraint's index sqlite_autoindex_health_data_N
+    return connection.exec_driver_sql(
+        "SELECT COALESCE(SUM(pgsize), 0) FROM dbstat WHERE name IN (SELECT name FROM sqlite_master "
+        "WHERE type = 'index' AND tbl_name = 'health_data')"
+    ).scalar()
+
+
+def _sync_writes(engine, table, rows):
+    """Look up each row by its unique key, then update or insert it; returns rows/s"""
+    from sqlalchemy import select
+
+    started = time.perf_counter()
+    connection = engine.connect()
+    transaction = connection.begin()
+    for count, (user_id, provider, data_type, day, value, unit, now, _) in enumerate(rows, 1):
+        key = (table.c.user_id == user_id) & (table.c.provider == provider) & \
+              (table.c.data_type == data_type) & (table.c.date == day)
+        existing = connection.execute(select(table.c.id).where(key)).scalar()
+        if existing is None:
+            connection.execute(table.insert().values(
+                user_id=user_id, provider=provider, data_type=data_type, date=day,
+                value=value, unit=unit, created_at=now, updated_at=now
+            ))
+        else:
+            connection.execute(table.update().where(table.c.id == existing).values(value=value, updated_at=now))
+        if count % COMMIT_EVERY == 0:
+            transaction.commit()
+            transaction = connection.begin()
+    transaction.commit()
+    connection.close()
+    return len(rows) / (time.perf_counter() - started)
+
+
+def run_set(set_name, indexes, base_rows, new_rows, updated_rows, query_args, repeats, database_url=None):
+    """Load, write and read against one index set; returns its measurements"""
+    from sqlalchemy import MetaData
+    from loadtest.generate_data import bulk_insert, HEALTH_DATA_INSERT_COLUMNS
+    from loadtest.query_plans import hot_queries
+
+    engine, path = _engine(database_url, set_name)
+    metadata = MetaData()
+    table = benchmark_table(metadata, indexes)
+    metadata.drop_all(engine)
+    metadata.create_all(engine)
+
+    try:
+        started = time.perf_counter()
+        with engine.begin() as connection:
+            bulk_insert(connection, table, HEALTH_DATA_INSERT_COLUMNS, base_rows)
+        result = {'bulk_load': len(base_rows) / (time.perf_counter() - started)}
+
+        result['insert'] = _sync_writes(engine, table, new_rows)
+        result['update'] = _sync_writes(engine, table, updated_rows)
+
+        with engine.connect() as connection:
+            connection.exec_driver_sql('ANALYZE')
+            result['index_bytes'] = _index_bytes(connection, indexes)
+
+            latencies = {}
+            for name, statement in hot_queries(*query_args).items():
+                samples = []
+                for _ in range(repeats):
+                    query_started = time.perf_counter()
+                    connection.execute(statement).all()
+                    samples.append((time.perf_counter() - query_started) * 1000)
+                latencies[name] = (float(np.median(samples)), float(np.percentile(samples, 95)))
+            result['reads'] = latencies
+    finally:
+        metadata.drop_all(engine)
+        engine.dispose()
+        if path:
+            os.remove(path)
+            os.rmdir(os.path.dirname(path))
+
+    return result
+
+
+def _change(before, after):
+    return f'{(after - before) / before * 100:+.0f}%' if before else 'n/a'
+
+
+def run_benchmark(users=30, years=3, repeats=20, write_days=14, seed=7, database_url=None):
+    """Benchmark every INDEX_SETS entry on the same data and print a comparison"""
+    from loadtest.generate_data import METRICS, PROVIDER_SHARE, generate_user_health_data
+
+    rng = np.random.default_rng(seed)
+    end = date.today()
+    dates = [end - timedelta(days=offset) for offset in range(years * 365 + write_days - 1, -1, -1)]
+    base_dates, write_dates = dates[:-write_days], dates[-write_days:]
+
+    base_rows, new_rows = [], []
+    for user_id in range(1, users + 1):
+        providers = {p for p, share in PROVIDER_SHARE.items() if rng.random() < share} or {'oura'}
+        rows = generate_user_health_data(rng, user_id, providers, METRICS, dates)
+        base_rows.extend(row for row in rows if row[3] < write_dates[0])
+        new_rows.extend(row for row in rows if row[3] >= write_dates[0])
+
+    # Re-sync the last days with new values: every lookup hits an existing row
+    now = datetime.utcnow()
+    updated_rows = [row[:4] + (row[4] + 1, row[5], now, now) for row in base_rows if row[3] >= base_dates[-write_days]]
+
+    # Hot queries run for user 1 and its first series
+    user_rows = [row for row in base_rows if row[0] == 1]
+    provider, data_type = user_rows[0][1], user_rows[0][2]
+    query_args = (1, provider, data_type, base_dates[-1])
+
+    print(f"=== INDEX BENCHMARK: {len(base_rows):,} base rows, {len(new_rows):,} inserts, "
+          f"{len(updated_rows):,} updates, {repeats} runs per query ===")
+    results = {}
+    for set_name, indexes in INDEX_SETS.items():
+        print(f"Running {set_name}: {', '.join(indexes)} + unique_user_provider_type_date")
+        results[set_name] = run_set(set_name, indexes, base_rows, new_rows, updated_rows,
+                                    query_args, repeats, database_url)
+
+    names = list(results)
+    first, last = results[names[0]], results[names[-1]]
+    print(f"\n{'metric':<28}" + ''.join(f'{name:>16}' for name in names) + f"{'change':>10}")
+    for metric, label in (('bulk_load', 'bulk load rows/s'), ('insert', 'sync insert rows/s'),
+                          ('update', 'sync update rows/s')):
+        print(f"{label:<28}" + ''.join(f"{results[name][metric]:>16,.0f}" for name in names)
+              + f"{_change(first[metric], last[metric]):>10}")
+    print(f"{'index size KB':<28}" + ''.join(f"{results[name]['index_bytes'] / 1024:>16,.0f}" for name in names)
+          + f"{_change(first['index_bytes'], last['index_bytes']):>10}")
+    print('read latency ms (median / p95)')
+    for query in first['reads']:
+        print(f"  {query:<26}" + ''.join(
+            f"{results[name]['reads'][query][0]:>8.2f}/{results[name]['reads'][query][1]:<7.2f}" for name in names
+        ) + f"{_change(first['reads'][query][0], last['reads'][query][0]):>10}")
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compare health_data index sets on write throughput and read latency')
+    parser.add_argument('--users', type=int, default=30, help='Users in the dataset (default 30)')
+    parser.add_argument('--years', type=int, default=3, help='Years of history per user (default 3)')
+    parser.add_argument('--write-days', type=int, default=14, help='Days of new data written by the sync benchmark (default 14)')
+    parser.add_argument('--repeats', type=int, default=20, help='Runs per read query (default 20)')
+    parser.add_argument('--seed', type=int, default=7, help='Random seed (default 7)')
+    parser.add_argument('--database-url', help='PostgreSQL database for a scratch schema (default: temporary SQLite file)')
+    args = parser.parse_args()
+
+    run_benchmark(args.users, args.years, args.repeats, args.write_days, args.seed, args.database_url)
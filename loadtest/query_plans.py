@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Query-plan regression check for the hot health_data queries
+Runs EXPLAIN (SQLite: EXPLAIN QUERY PLAN, PostgreSQL: EXPLAIN (FORMAT
+JSON)) for every health_data query the routes and services issue, against
+a dataset loaded with loadtest.generate_data, and compares the access
+paths with the snapshot in loadtest/plans/<dialect>.json.
+
+A query fails when its plan scans health_data sequentially or differs from
+the snapshot, once health_data holds at least --row-threshold rows (small
+tables are legitimately scanned). Exits 1 on any failure.
+
+Usage: python -m loadtest.query_plans [--update] [--row-threshold 10000] [--database-url URL]
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+from datetime import datetime, timedelta
+
+# Add repository root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PLANS_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'plans')
+DEFAULT_ROW_THRESHOLD = 10000
+
+
+def hot_queries(user_id, provider, data_type, last_date):
+    """{name: statement} for the health_data queries in routes/ and services/
+
+    Every statement comes from the builder its call site executes, named
+    after where it lives, so a query change shows up here unedited.
+    """
+    from models import HealthData
+    from routes.health_routes import health_data_query, json_export_query
+    from services import (ingestion, reconciliation, rollup_service, anomaly_service, series_cache,
+                          catalog_service, export_service, export_job_service, snapshot_service)
+    from services.rollup_service import period_start, period_end
+
+    month = period_start(last_date, 'month')
+    window_start = last_date - timedelta(days=30)
+    # Export jobs: a full archive up to a watermark, or the delta since a base
+    watermark = datetime.combine(last_date, datetime.min.time())
+    full_export = {'created_until': watermark}
+    delta_export = {'created_after': watermark - timedelta(days=1), 'created_until': watermark}
+
+    return {
+        # routes/health_routes.py get_health_data
+        'health.list_type_range': health_data_query(user_id, start=window_start, data_type=data_type),
+        'health.list_range': health_data_query(user_id, start=window_start),
+        'health.list_provider_type': health_data_query(user_id, 'columnar', provider=provider, data_type=data_type),
+        # services/ingestion.py save_health_data
+        'ingestion.existing_row': ingestion.existing_row_select(user_id, provider, data_type, last_date),
+        # services/reconciliation.py apply_upsert
+        'reconciliation.candidates': reconciliation.candidates_select(user_id, data_type, last_date),
+        # services/rollup_service.py _recompute_bucket
+        'rollup.recompute_bucket': rollup_service.bucket_stats_select(
+            user_id, provider, data_type, month, period_end(month, 'month')
+        ),
+        # models.py HealthData.get_window_summary (series cache disabled)
+        'summary.window_stats': HealthData.window_stats_select(user_id, window_start),
+        'summary.window_values': HealthData.window_values_select(user_id, window_start),
+        # services/series_cache.py load_user_series
+        'series_cache.load': series_cache.user_series_select(user_id),
+        # services/export_service.py (streamed exports) and routes/health_routes.py JSON export
+        'export.health_data': export_service._table_query('health_data', user_id),
+        'export.json': json_export_query(user_id),
+        # services/export_job_service.py run_export_job: full and delta archives
+        'export_job.reusable_base': export_job_service.base_rows_select(user_id, last_date),
+        'export_job.count_full': export_service._count_query('health_data', user_id, **full_export),
+        'export_job.count_delta': export_service._count_query('health_data', user_id, **delta_export),
+        'export_job.rows_full': export_service._table_query('health_data', user_id, **full_export),
+        'export_job.rows_delta': export_service._table_query('health_data', user_id, **delta_export),
+        # services/snapshot_service.py _write_month
+        'snapshot.write_month': snapshot_service.month_rows_select(user_id, month),
+        # Rebuilds (rebuild_aggregates.py, snapshot rebuilds): anomaly replay,
+        # canonical values, rollups, catalog, snapshot months
+        'anomaly.rebuild': anomaly_service.replay_select(user_id),
+        'reconciliation.rebuild': reconciliation.rebuild_select(user_id),
+        'rollup.rebuild': rollup_service.rebuild_select(user_id),
+        'catalog.rebuild': catalog_service.rebuild_select(user_id),
+        'snapshot.rebuild': snapshot_service.data_dates_select(user_id),
+    }
+
+
+def explain(connection, statement):
+    """Normalised access paths of a statement's plan: a list of strings
+
+    Only the shape is kept (operations, tables, indexes, index conditions
+    on SQLite), not cost or row estimates, so snapshots survive data growth.
+    """
+    compiled = statement.compile(dialect=connection.dialect)
+
+    if connection.dialect.name == 'postgresql':
+        rows = connection.exec_driver_sql(f'EXPLAIN (FORMAT JSON) {compiled}', compiled.params).scalar()
+        plan = rows if isinstance(rows, list) else json.loads(rows)
+        steps = []
+
+        def walk(node, depth):
+            step = node['Node Type']
+            if node.get('Relation Name'):
+                step += f" on {node['Relation Name']}"
+            if node.get('Index Name'):
+                step += f" using {node['Index Name']}"
+            steps.append('  ' * depth + step)
+            for child in node.get('Plans', []):
+                walk(child, depth + 1)
+
+        walk(plan[0]['Plan'], 0)
+        return steps
+
+    params = tuple(compiled.params[name] for name in compiled.positiontup or ())
+    rows = connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {compiled}', params).all()
+    depth = {0: -1}
+    steps = []
+    for node_id, parent, _, detail in rows:
+        depth[node_id] = depth.get(parent, -1) + 1
+        steps.append('  ' * depth[node_id] + detail)
+    return steps
+
+
+def sequential_scans(steps, table='health_data'):
+    """Plan steps that read every row of table"""
+    pattern = re.compile(rf'^\s*(Seq Scan on {table}\b|SCAN {table}\b)')
+    return [step.strip() for step in steps if pattern.match(step)]
+
+
+def check_plans(update=False, row_threshold=DEFAULT_ROW_THRESHOLD):
+    """Explain every hot query and compare with the stored snapshot; returns failure messages"""
+    from sqlalchemy import func, select
+    from app import create_app
+    from models import db, HealthData
+
+    app = create_app()
+    failures = []
+
+    with app.app_context():
+        dialect = db.engine.dialect.name
+        snapshot_file = os.path.join(PLANS_FOLDER, f'{dialect}.json')
+        snapshot = {}
+        if os.path.exists(snapshot_file):
+            with open(snapshot_file) as f:
+                snapshot = json.load(f)
+
+        with db.engine.connect() as connection:
+            if dialect == 'postgresql':
+                connection.exec_driver_sql('ANALYZE health_data')
+            else:
+                connection.exec_driver_sql('ANALYZE')
+
+            total_rows = connection.execute(select(func.count()).select_from(HealthData)).scalar()
+            busiest = connection.execute(
+                select(HealthData.user_id).group_by(HealthData.user_id).order_by(func.count().desc()).limit(1)
+            ).scalar()
+            if busiest is None:
+                return ['health_data is empty; load a dataset with loadtest.generate_data first']
+            provider, data_type, last_date = connection.execute(
+                select(HealthData.provider, HealthData.data_type, func.max(HealthData.date))
+                .where(HealthData.user_id == busiest)
+                .group_by(HealthData.provider, HealthData.data_type)
+                .order_by(func.count().desc()).limit(1)
+            ).one()
+
+            enforce = total_rows >= row_threshold
+            print(f"=== QUERY PLANS ({dialect}): {total_rows:,} health_data rows, user {busiest}, "
+                  f"{provider}/{data_type} ===")
+            if not enforce:
+                print(f"Below --row-threshold {row_threshold:,}: plans are reported, not enforced")
+
+            plans = {}
+            for name, statement in hot_queries(busiest, provider, data_type, last_date).items():
+                steps = plans[name] = explain(connection, statement)
+                problems = []
+                scans = sequential_scans(steps)
+                if scans:
+                    problems.append(f"sequential scan: {'; '.join(scans)}")
+                if not update and name in snapshot and snapshot[name] != steps:
+                    problems.append('plan changed:\n      was: ' + '\n           '.join(snapshot[name])
+                                    + '\n      now: ' + '\n           '.join(steps))
+                elif not update and name not in snapshot:
+                    problems.append('no stored plan (run with --update)')
+
+                status = 'OK' if not problems else ('FAIL' if enforce else 'WARN')
+                print(f"{status:<5}{name}")
+                for step in steps:
+                    print(f"       {step}")
+                for problem in problems:
+                    print(f"    -> {problem}")
+                if problems and enforce:
+                    failures.extend(f'{name}: {problem}' for problem in problems)
+
+        if update:
+            os.makedirs(PLANS_FOLDER, exist_ok=True)
+            with open(snapshot_file, 'w') as f:
+                json.dump(plans, f, indent=2, sort_keys=True, ensure_ascii=False)
+                f.write('\n')
+            print(f"Stored {len(plans)} plans in {snapshot_file}")
+
+    return failures
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Check health_data query plans against stored snapshots')
+    parser.add_argument('--update', action='store_true', help='Store the current plans as the new snapshot')
+    parser.add_argument('--row-threshold', type=int, default=DEFAULT_ROW_THRESHOLD,
+                        help=f'health_data rows from which plans are enforced (default {DEFAULT_ROW_THRESHOLD})')
+    parser.add_argument('--database-url', help='Overrides DATABASE_URL')
+    args = parser.parse_args()
+
+    if args.database_url:
+        os.environ['DATABASE_URL'] = args.database_url
+    failures = check_plans(update=args.update, row_threshold=args.row_threshold)
+    if failures:
+        print(f"❌ {len(failures)} query plan problems")
+        sys.exit(1)
+    print("✅ Query plans match")
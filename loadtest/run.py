@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+API load test
+Drives a running server with authenticated sessions for the users created
+by loadtest.generate_data and reports p50/p95/p99 latency and throughput
+per endpoint. Session cookies are signed with the app's SECRET_KEY, so run
+with the same SECRET_KEY (and DATABASE_URL, to look up the users) as the
+server under test.
+
+Usage: python -m loadtest.run --base-url http://localhost:5007 [--concurrency 16] [--duration 60]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from datetime import date, timedelta
+
+import numpy as np
+import requests
+
+# Add repository root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from loadtest.generate_data import METRICS
+
+DATA_TYPES = sorted({spec[1] for spec in METRICS})
+
+
+def _health_path(rng):
+    start = date.today() - timedelta(days=rng.choice((30, 90, 365)))
+    return f'/api/health?data_type={rng.choice(DATA_TYPES)}&start_date={start.isoformat()}'
+
+
+# name: (default weight, path builder)
+SCENARIOS = {
+    'health': (40, _health_path),
+    'summary': (20, lambda rng: f'/api/health/summary?days={rng.choice((7, 30, 90))}'),
+    'data_summary': (20, lambda rng: '/api/health/data-summary'),
+    'blood_tests': (15, lambda rng: '/api/blood-tests'),
+    'export': (5, lambda rng: '/api/health/export?format=ndjson&table=health_data'),
+}
+
+
+def session_cookies(user_ids, secret_key):
+    """{user_id: signed flask session cookie value} logging each user in"""
+    from flask import Flask
+
+    signer = Flask(__name__)
+    signer.secret_key = secret_key
+    serializer = signer.session_interface.get_signing_serializer(signer)
+    return {uid: serializer.dumps({'_user_id': str(uid), '_fresh': True}) for uid in user_ids}
+
+
+def load_user_ids(database_url, email_prefix):
+    """Ids of generated users in the database"""
+    from sqlalchemy import create_engine, text
+
+    engine = create_engine(database_url)
+    with engine.connect() as connection:
+        rows = connection.execute(
+            text('SELECT id FROM users WHERE email LIKE :pattern ORDER BY id'),
+            {'pattern': f'{email_prefix}-%'}
+        )
+        return [row[0] for row in rows]
+
+
+def _worker(base_url, cookies, cookie_name, scenarios, weights, deadline, measure_from, results, seed):
+    rng = random.Random(seed)
+    session = requests.Session()
+    user_ids = list(cookies)
+
+    while time.perf_counter() < deadline:
+        name = rng.choices(scenarios, weights)[0]
+        uid = rng.choice(user_ids)
+        path = SCENARIOS[name][1](rng)
+        started = time.perf_counter()
+        try:
+            response = session.get(base_url + path, cookies={cookie_name: cookies[uid]}, timeout=120)
+            size = len(response.content)
+            ok = response.status_code < 400
+        except requests.RequestException:
+            size, ok = 0, False
+        finished = time.perf_counter()
+        if started >= measure_from:
+            results.append((name, finished - started, ok, size))
+
+
+def summarize(results, elapsed):
+    """Per-scenario and overall request count, errors, throughput and latency percentiles (ms)"""
+    by_name = {}
+    for name, latency, ok, size in results:
+        by_name.setdefault(name, []).append((latency, ok, size))
+    by_name['all'] = [(latency, ok, size) for _, latency, ok, size in results]
+
+    report = {}
+    for name, samples in by_name.items():
+        if not samples:
+            continue
+        latencies = np.array([sample[0] for sample in samples]) * 1000
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        report[name] = {
+            'requests': len(samples),
+            'errors': sum(1 for sample in samples if not sample[1]),
+            'throughput': len(samples) / elapsed,
+            'mean_ms': float(latencies.mean()),
+            'p50_ms': float(p50),
+            'p95_ms': float(p95),
+            'p99_ms': float(p99),
+            'mean_bytes': float(np.mean([sample[2] for sample in samples])),
+        }
+    return report
+
+
+def run_load_test(base_url, user_ids, secret_key, concurrency=16, duration=60, warmup=5,
+                  scenarios=None, cookie_name='session', seed=0):
+    """Run the weighted scenario mix from concurrency threads and return summarize()'s report"""
+    scenarios = scenarios or list(SCENARIOS)
+    weights = [SCENARIOS[name][0] for name in scenarios]
+    cookies = session_cookies(user_ids, secret_key)
+
+    results = []  # list.append is atomic, so workers share it without a lock
+    started = time.perf_counter()
+    measure_from = started + warmup
+    deadline = measure_from + duration
+    threads = [
+        threading.Thread(target=_worker, args=(base_url.rstrip('/'), cookies, cookie_name, scenarios, weights,
+                                               deadline, measure_from, results, seed + i), daemon=True)
+        for i in range(concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return summarize(results, time.perf_counter() - measure_from)
+
+
+def print_report(report):
+    print(f"{'endpoint':<14}{'requests':>10}{'errors':>8}{'req/s':>9}{'mean':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'KB':>9}")
+    for name, row in sorted(report.items(), key=lambda item: item[0] == 'all'):
+        print(f"{name:<14}{row['requests']:>10}{row['errors']:>8}{row['throughput']:>9.1f}"
+              f"{row['mean_ms']:>9.1f}{row['p50_ms']:>9.1f}{row['p95_ms']:>9.1f}{row['p99_ms']:>9.1f}"
+              f"{row['mean_bytes'] / 1024:>9.1f}")
+    print("(latencies in ms)")
+
+
+if __name__ == '__main__':
+    from config import Config
+
+    parser = argparse.ArgumentParser(description='Load test the health API with authenticated sessions')
+    parser.add_argument('--base-url', default='http://localhost:5007', help='Server under test')
+    parser.add_argument('--concurrency', type=int, default=16, help='Concurrent clients (default 16)')
+    parser.add_argument('--duration', type=float, default=60, help='Measured seconds (default 60)')
+    parser.add_argument('--warmup', type=float, default=5, help='Unmeasured seconds before measuring (default 5)')
+    parser.add_argument('--endpoints', help=f"Comma-separated subset of {', '.join(SCENARIOS)}")
+    parser.add_argument('--user-ids', help='Id range to log in as, e.g. 1-1000 (default: generated users in DATABASE_URL)')
+    parser.add_argument('--email-prefix', default='loadtest', help='Email prefix used by generate_data')
+    parser.add_argument('--json', help='Also write the report to this file')
+    args = parser.parse_args()
+
+    scenarios = args.endpoints.split(',') if args.endpoints else None
+    unknown = set(scenarios or []) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"Unknown endpoints: {', '.join(sorted(unknown))}")
+
+    if args.user_ids:
+        first, _, last = args.user_ids.partition('-')
+        user_ids = list(range(int(first), int(last or first) + 1))
+    else:
+        user_ids = load_user_ids(Config.SQLALCHEMY_DATABASE_URI, args.email_prefix)
+    if not user_ids:
+        parser.error('No users to log in as; run loadtest.generate_data first or pass --user-ids')
+
+    print(f"=== LOAD TEST: {args.concurrency} clients, {args.duration:.0f}s, {len(user_ids)} users ===")
+    report = run_load_test(args.base_url, user_ids, Config.SECRET_KEY, concurrency=args.concurrency,
+                           duration=args.duration, warmup=args.warmup, scenarios=scenarios)
+    print_report(report)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
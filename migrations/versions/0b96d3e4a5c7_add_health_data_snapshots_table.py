@@ -0,0 +1,37 @@
+"""Add health_data_snapshots table for per-user monthly Parquet snapshots
+
+Revision ID: 0b96d3e4a5c7
+Revises: f71c4d8a2e93
+Create Date: 2026-10-19 16:02:41.518203
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0b96d3e4a5c7'
+down_revision = 'f71c4d8a2e93'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('health_data_snapshots',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('month', sa.Date(), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.Column('snapshot_version', sa.Integer(), nullable=False),
+        sa.Column('row_count', sa.Integer(), nullable=False),
+        sa.Column('refreshed_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id', 'month', name='unique_snapshot_user_month')
+    )
+
+    # Snapshot files for existing history are written by rebuild_aggregates.py
+
+
+def downgrade():
+    op.drop_table('health_data_snapshots')
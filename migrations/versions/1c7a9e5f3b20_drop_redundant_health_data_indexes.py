@@ -0,0 +1,32 @@
+"""Drop health_data indexes covered by the unique constraint and the date indexes
+
+Revision ID: 1c7a9e5f3b20
+Revises: 0b96d3e4a5c7
+Create Date: 2026-10-19 17:21:08.944127
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1c7a9e5f3b20'
+down_revision = '0b96d3e4a5c7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # (user_id, provider) and (user_id, provider, data_type) are prefixes of
+    # unique_user_provider_type_date; no hot query needs (user_id, provider, date)
+    with op.batch_alter_table('health_data', schema=None) as batch_op:
+        batch_op.drop_index('idx_user_provider_type')
+        batch_op.drop_index('idx_user_provider_date')
+        batch_op.drop_index('idx_user_provider')
+
+
+def downgrade():
+    with op.batch_alter_table('health_data', schema=None) as batch_op:
+        batch_op.create_index('idx_user_provider', ['user_id', 'provider'], unique=False)
+        batch_op.create_index('idx_user_provider_date', ['user_id', 'provider', 'date'], unique=False)
+        batch_op.create_index('idx_user_provider_type', ['user_id', 'provider', 'data_type'], unique=False)
@@ -0,0 +1,45 @@
+"""Cascade user deletes to derived health data tables and export jobs
+
+Revision ID: 7e4f2a9c1b86
+Revises: 1c7a9e5f3b20
+Create Date: 2026-10-19 18:40:15.203871
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7e4f2a9c1b86'
+down_revision = '1c7a9e5f3b20'
+branch_labels = None
+depends_on = None
+
+# Tables whose user_id foreign key was created unnamed (PostgreSQL names it <table>_user_id_fkey)
+TABLES = (
+    'health_data_rollups',
+    'export_jobs',
+    'health_data_catalog',
+    'health_data_anomaly_state',
+    'health_data_anomalies',
+    'health_data_canonical',
+    'health_data_snapshots',
+)
+
+
+def _recreate_user_fks(ondelete):
+    # SQLite does not enforce foreign keys by default and cannot alter them in place
+    if op.get_bind().dialect.name == 'sqlite':
+        return
+    for table in TABLES:
+        name = f'{table}_user_id_fkey'
+        op.drop_constraint(name, table, type_='foreignkey')
+        op.create_foreign_key(name, table, 'users', ['user_id'], ['id'], ondelete=ondelete)
+
+
+def upgrade():
+    _recreate_user_fks('CASCADE')
+
+
+def downgrade():
+    _recreate_user_fks(None)
@@ -0,0 +1,47 @@
+"""Add health_data_rollups table for weekly/monthly/yearly statistics
+
+Revision ID: 8c3d51e0b7a2
+Revises: 5b1e7c2a9f40
+Create Date: 2026-10-19 10:41:53.207614
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c3d51e0b7a2'
+down_revision = '5b1e7c2a9f40'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('health_data_rollups',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('provider', sa.String(length=50), nullable=False),
+        sa.Column('data_type', sa.String(length=100), nullable=False),
+        sa.Column('period', sa.String(length=10), nullable=False),
+        sa.Column('period_start', sa.Date(), nullable=False),
+        sa.Column('value_count', sa.Integer(), nullable=False),
+        sa.Column('value_sum', sa.Float(), nullable=False),
+        sa.Column('value_sum_sq', sa.Float(), nullable=False),
+        sa.Column('value_min', sa.Float(), nullable=True),
+        sa.Column('value_max', sa.Float(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id', 'provider', 'data_type', 'period', 'period_start', name='unique_rollup_user_provider_type_period')
+    )
+    with op.batch_alter_table('health_data_rollups', schema=None) as batch_op:
+        batch_op.create_index('idx_rollup_user_type_period', ['user_id', 'data_type', 'period', 'period_start'], unique=False)
+
+    # Populate with: python rebuild_aggregates.py
+
+
+def downgrade():
+    with op.batch_alter_table('health_data_rollups', schema=None) as batch_op:
+        batch_op.drop_index('idx_rollup_user_type_period')
+
+    op.drop_table('health_data_rollups')
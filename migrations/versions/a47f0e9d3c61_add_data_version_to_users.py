@@ -0,0 +1,26 @@
+"""Add data_version to users for conditional GET support
+
+Revision ID: a47f0e9d3c61
+Revises: 8c3d51e0b7a2
+Create Date: 2026-10-19 11:02:37.551902
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a47f0e9d3c61'
+down_revision = '8c3d51e0b7a2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('data_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_column('data_version')
@@ -0,0 +1,45 @@
+"""Add health_data_catalog table for per-user series metadata
+
+Revision ID: c2e84b6f1d05
+Revises: a47f0e9d3c61
+Create Date: 2026-10-19 11:24:08.730116
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c2e84b6f1d05'
+down_revision = 'a47f0e9d3c61'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('health_data_catalog',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('provider', sa.String(length=50), nullable=False),
+        sa.Column('data_type', sa.String(length=100), nullable=False),
+        sa.Column('unit', sa.String(length=50), nullable=True),
+        sa.Column('first_date', sa.Date(), nullable=True),
+        sa.Column('last_date', sa.Date(), nullable=True),
+        sa.Column('record_count', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id', 'provider', 'data_type', name='unique_catalog_user_provider_type')
+    )
+
+    # Populate from existing data
+    op.execute(
+        "INSERT INTO health_data_catalog "
+        "(user_id, provider, data_type, unit, first_date, last_date, record_count, updated_at) "
+        "SELECT user_id, provider, data_type, MAX(unit), MIN(date), MAX(date), COUNT(id), CURRENT_TIMESTAMP "
+        "FROM health_data GROUP BY user_id, provider, data_type"
+    )
+
+
+def downgrade():
+    op.drop_table('health_data_catalog')
@@ -0,0 +1,63 @@
+"""Add health_data_anomaly_state and health_data_anomalies tables
+
+Revision ID: e5a0b3c71d28
+Revises: c2e84b6f1d05
+Create Date: 2026-10-19 13:02:41.518902
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5a0b3c71d28'
+down_revision = 'c2e84b6f1d05'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('health_data_anomaly_state',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('provider', sa.String(length=50), nullable=False),
+        sa.Column('data_type', sa.String(length=100), nullable=False),
+        sa.Column('ewma_mean', sa.Float(), nullable=True),
+        sa.Column('ewma_var', sa.Float(), nullable=True),
+        sa.Column('observation_count', sa.Integer(), nullable=False),
+        sa.Column('last_date', sa.Date(), nullable=True),
+        sa.Column('last_value', sa.Float(), nullable=True),
+        sa.Column('prev_ewma_mean', sa.Float(), nullable=True),
+        sa.Column('prev_ewma_var', sa.Float(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id', 'provider', 'data_type', name='unique_anomaly_state_user_provider_type')
+    )
+    op.create_table('health_data_anomalies',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('provider', sa.String(length=50), nullable=False),
+        sa.Column('data_type', sa.String(length=100), nullable=False),
+        sa.Column('date', sa.Date(), nullable=False),
+        sa.Column('value', sa.Float(), nullable=False),
+        sa.Column('expected', sa.Float(), nullable=False),
+        sa.Column('std', sa.Float(), nullable=False),
+        sa.Column('zscore', sa.Float(), nullable=False),
+        sa.Column('detected_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id', 'provider', 'data_type', 'date', name='unique_anomaly_user_provider_type_date')
+    )
+    with op.batch_alter_table('health_data_anomalies', schema=None) as batch_op:
+        batch_op.create_index('idx_anomaly_user_date', ['user_id', 'date'], unique=False)
+
+    # State and flags for existing history are filled by rebuild_aggregates.py
+
+
+def downgrade():
+    with op.batch_alter_table('health_data_anomalies', schema=None) as batch_op:
+        batch_op.drop_index('idx_anomaly_user_date')
+
+    op.drop_table('health_data_anomalies')
+    op.drop_table('health_data_anomaly_state')
@@ -0,0 +1,39 @@
+"""Add health_data_canonical table for reconciled multi-provider values
+
+Revision ID: f71c4d8a2e93
+Revises: e5a0b3c71d28
+Create Date: 2026-10-19 13:48:12.306574
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f71c4d8a2e93'
+down_revision = 'e5a0b3c71d28'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('health_data_canonical',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('data_type', sa.String(length=100), nullable=False),
+        sa.Column('date', sa.Date(), nullable=False),
+        sa.Column('value', sa.Float(), nullable=False),
+        sa.Column('unit', sa.String(length=50), nullable=True),
+        sa.Column('provider', sa.String(length=50), nullable=False),
+        sa.Column('source_count', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id', 'data_type', 'date', name='unique_canonical_user_type_date')
+    )
+
+    # Values for existing history are filled by rebuild_aggregates.py, which applies the merge rules
+
+
+def downgrade():
+    op.drop_table('health_data_canonical')
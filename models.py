@@ -1,5 +1,7 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
+from sqlalchemy import event
+from sqlalchemy.orm import Session
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
 
@@ -13,6 +15,7 @@ class User(UserMixin, db.Model):
     google_id = db.Column(db.String(255), unique=True)
     name = db.Column(db.String(255))
     profile_pic = db.Column(db.String(500))
+    data_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # Bumped on every write to the user's data
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -90,12 +93,12 @@ class HealthData(db.Model):
     user = db.relationship('User', back_populates='health_data')
 
     # Indexes for optimal query performance
+    # Every index is paid for on each upsert, so only these three are kept;
+    # the unique constraint's index also serves (user, provider[, type]) lookups.
+    # Check changes with loadtest/index_benchmark.py and loadtest/query_plans.py.
     __table_args__ = (
         db.Index('idx_user_date', 'user_id', 'date'),
         db.Index('idx_user_type_date', 'user_id', 'data_type', 'date'),
-        db.Index('idx_user_provider', 'user_id', 'provider'),
-        db.Index('idx_user_provider_date', 'user_id', 'provider', 'date'),
-        db.Index('idx_user_provider_type', 'user_id', 'provider', 'data_type'),
         # Unique constraint prevents duplicate entries for same user/date/type/provider
         db.UniqueConstraint('user_id', 'provider', 'data_type', 'date', name='unique_user_provider_type_date'),
     )
@@ -116,42 +119,360 @@ class HealthData(db.Model):
 
     @staticmethod
     def get_user_data_summary(user_id):
-        """Get comprehensive data summary for a user"""
-        from sqlalchemy import func
+        """Get comprehensive data summary for a user
 
-        # Count records by provider and type
-        provider_counts = db.session.query(
-            HealthData.provider,
-            HealthData.data_type,
-            func.count(HealthData.id).label('count'),
-            func.min(HealthData.date).label('earliest_date'),
-            func.max(HealthData.date).label('latest_date')
-        ).filter_by(user_id=user_id).group_by(
-            HealthData.provider, HealthData.data_type
+        Cached per user under the user's data version, so any write to their
+        data moves readers to a fresh entry (computing it only reads the
+        catalog). Treat the returned dict as read-only.
+        """
+        from services.cache import get_cache
+
+        data_version = db.session.get(User, user_id).data_version
+        cache = get_cache()
+        cache_key = f'data_summary:{user_id}:{data_version}'
+        summary = cache.get(cache_key)
+        if summary is None:
+            summary = HealthData._compute_user_data_summary(user_id)
+            cache.set(cache_key, summary)
+        return summary
+
+    @staticmethod
+    def _compute_user_data_summary(user_id):
+        """Build the data summary from the per-user catalog (O(data types))"""
+        entries = HealthDataCatalog.query.filter_by(user_id=user_id).order_by(
+            HealthDataCatalog.provider, HealthDataCatalog.data_type
         ).all()
 
-        # Get date range for user's data
-        date_range = db.session.query(
-            func.min(HealthData.date).label('first_date'),
-            func.max(HealthData.date).label('last_date'),
-            func.count(HealthData.id).label('total_records')
-        ).filter_by(user_id=user_id).first()
+        first_dates = [e.first_date for e in entries if e.first_date]
+        last_dates = [e.last_date for e in entries if e.last_date]
 
         return {
-            'total_records': date_range.total_records if date_range else 0,
+            'total_records': sum(e.record_count for e in entries),
             'date_range': {
-                'first_date': date_range.first_date.isoformat() if date_range and date_range.first_date else None,
-                'last_date': date_range.last_date.isoformat() if date_range and date_range.last_date else None,
+                'first_date': min(first_dates).isoformat() if first_dates else None,
+                'last_date': max(last_dates).isoformat() if last_dates else None,
             },
             'providers': [{
-                'provider': p.provider,
-                'data_type': p.data_type,
-                'record_count': p.count,
+                'provider': e.provider,
+                'data_type': e.data_type,
+                'record_count': e.record_count,
                 'date_range': {
-                    'earliest': p.earliest_date.isoformat() if p.earliest_date else None,
-                    'latest': p.latest_date.isoformat() if p.latest_date else None,
+                    'earliest': e.first_date.isoformat() if e.first_date else None,
+                    'latest': e.last_date.isoformat() if e.last_date else None,
                 }
-            } for p in provider_counts]
+            } for e in entries]
+        }
+
+    @staticmethod
+    def get_window_summary(user_id, days, include_values=True):
+        """Per data_type summary of the last `days` days, aggregated in SQL
+
+        Latest value, min/max/avg and count come from window functions over
+        the (user_id, data_type, date) index, so only one row per data_type
+        is returned from the stats query. The per-day series is a separate
+        column-only query and can be skipped with include_values=False.
+
+        When the in-memory series cache is enabled the same result is
+        computed over the user's cached arrays instead.
+        """
+        from datetime import timedelta
+        from services import series_cache
+
+        if series_cache.is_enabled():
+            return series_cache.window_summary(user_id, days, include_values)
+
+        start_date = datetime.utcnow().date() - timedelta(days=days)
+        stats = db.session.execute(HealthData.window_stats_select(user_id, start_date)).all()
+
+        summary = {}
+        for row in stats:
+            summary[row.data_type] = {
+                'unit': row.unit or '',
+                'latest_value': row.value,
+                'latest_date': row.date.isoformat(),
+                'count': row.count,
+                'min': row.min_value,
+                'max': row.max_value,
+                'avg': float(row.avg_value) if row.avg_value is not None else None
+            }
+            if include_values:
+                summary[row.data_type]['values'] = []
+
+        if include_values:
+            series = db.session.execute(HealthData.window_values_select(user_id, start_date))
+            for data_type, date, value in series:
+                summary[data_type]['values'].append({'date': date.isoformat(), 'value': value})
+
+        return summary
+
+    @staticmethod
+    def window_stats_select(user_id, start_date):
+        """One row per data_type since start_date: latest value and window statistics"""
+        from sqlalchemy import func
+
+        # Materialise the user's rows in the window first so the planner seeks
+        # the (user_id, date) range instead of walking every row of the user
+        # via idx_user_type_date to satisfy the PARTITION BY ordering.
+        rows = db.select(
+            HealthData.id,
+            HealthData.data_type,
+            HealthData.date,
+            HealthData.value,
+            HealthData.unit
+        ).where(
+            HealthData.user_id == user_id,
+            HealthData.date >= start_date
+        ).cte('window_rows').prefix_with('MATERIALIZED')
+
+        # A single window definition so the rows are sorted once; the
+        # aggregates use the whole partition as their frame.
+        window = {
+            'partition_by': rows.c.data_type,
+            'order_by': (rows.c.date.desc(), rows.c.id.desc())
+        }
+        partition = dict(window, rows=(None, None))
+        ranked = db.select(
+            rows.c.data_type,
+            rows.c.date,
+            rows.c.value,
+            rows.c.unit,
+            func.row_number().over(**window).label('row_number'),
+            func.count(rows.c.id).over(**partition).label('count'),
+            func.min(rows.c.value).over(**partition).label('min_value'),
+            func.max(rows.c.value).over(**partition).label('max_value'),
+            func.avg(rows.c.value).over(**partition).label('avg_value')
+        ).subquery()
+
+        return db.select(ranked).where(ranked.c.row_number == 1)
+
+    @staticmethod
+    def window_values_select(user_id, start_date):
+        """(data_type, date, value) rows since start_date, newest first"""
+        return db.select(
+            HealthData.data_type, HealthData.date, HealthData.value
+        ).where(
+            HealthData.user_id == user_id,
+            HealthData.date >= start_date
+        ).order_by(HealthData.date.desc())
+
+
+class HealthDataRollup(db.Model):
+    """
+    Incrementally maintained per-period statistics over health_data.
+
+    One row per user/provider/data_type/period/period_start, where period is
+    'week' (starting Monday), 'month' or 'year'. Count, sum and sum of squares
+    are kept so mean and standard deviation can be derived without touching
+    raw rows. Updated by services.ingestion on every upsert and rebuilt by
+    rebuild_aggregates.py.
+    """
+    __tablename__ = 'health_data_rollups'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    provider = db.Column(db.String(50), nullable=False)
+    data_type = db.Column(db.String(100), nullable=False)
+    period = db.Column(db.String(10), nullable=False)  # week, month, year
+    period_start = db.Column(db.Date, nullable=False)
+    value_count = db.Column(db.Integer, nullable=False, default=0)
+    value_sum = db.Column(db.Float, nullable=False, default=0.0)
+    value_sum_sq = db.Column(db.Float, nullable=False, default=0.0)
+    value_min = db.Column(db.Float)
+    value_max = db.Column(db.Float)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('idx_rollup_user_type_period', 'user_id', 'data_type', 'period', 'period_start'),
+        db.UniqueConstraint('user_id', 'provider', 'data_type', 'period', 'period_start',
+                            name='unique_rollup_user_provider_type_period'),
+    )
+
+    def to_dict(self):
+        mean = self.value_sum / self.value_count if self.value_count else None
+        std = None
+        if self.value_count:
+            variance = max(self.value_sum_sq / self.value_count - mean * mean, 0.0)
+            std = variance ** 0.5
+        return {
+            'provider': self.provider,
+            'data_type': self.data_type,
+            'period': self.period,
+            'period_start': self.period_start.isoformat() if self.period_start else None,
+            'count': self.value_count,
+            'sum': self.value_sum,
+            'min': self.value_min,
+            'max': self.value_max,
+            'mean': mean,
+            'std': std
+        }
+
+
+class HealthDataCatalog(db.Model):
+    """
+    Per-user catalog of stored series: one row per user/provider/data_type
+    with its unit, date range and record count. Maintained by
+    services.ingestion so data type listings and the data summary are read
+    in O(types) instead of scanning health_data. updated_at moves on every
+    write to the series and doubles as its version for cached analytics.
+    """
+    __tablename__ = 'health_data_catalog'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    provider = db.Column(db.String(50), nullable=False)
+    data_type = db.Column(db.String(100), nullable=False)
+    unit = db.Column(db.String(50))
+    first_date = db.Column(db.Date)
+    last_date = db.Column(db.Date)
+    record_count = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'provider', 'data_type', name='unique_catalog_user_provider_type'),
+    )
+
+    def to_dict(self):
+        return {
+            'provider': self.provider,
+            'data_type': self.data_type,
+            'unit': self.unit,
+            'first_date': self.first_date.isoformat() if self.first_date else None,
+            'last_date': self.last_date.isoformat() if self.last_date else None,
+            'record_count': self.record_count
+        }
+
+
+class HealthDataCanonical(db.Model):
+    """
+    One reconciled value per user/data_type/day across providers, chosen or
+    merged by the rules in services.reconciliation. provider records where
+    the value came from ('merged' when several were averaged). Maintained
+    by services.ingestion and rebuilt by rebuild_aggregates.py.
+    """
+    __tablename__ = 'health_data_canonical'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    data_type = db.Column(db.String(100), nullable=False)
+    date = db.Column(db.Date, nullable=False)
+    value = db.Column(db.Float, nullable=False)
+    unit = db.Column(db.String(50))
+    provider = db.Column(db.String(50), nullable=False)
+    source_count = db.Column(db.Integer, nullable=False, default=1)  # Providers with a value that day
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'data_type', 'date', name='unique_canonical_user_type_date'),
+    )
+
+    def to_dict(self):
+        return {
+            'data_type': self.data_type,
+            'date': self.date.isoformat() if self.date else None,
+            'value': self.value,
+            'unit': self.unit,
+            'provider': self.provider,
+            'source_count': self.source_count
+        }
+
+
+class HealthDataAnomalyState(db.Model):
+    """
+    Running EWMA mean and variance per user/provider/data_type, used to score
+    each new daily value against the series' recent behaviour in O(1).
+    The prev_* columns hold the state before the latest day so a re-synced
+    latest value can be re-scored without replaying history. Updated by
+    services.ingestion and rebuilt by rebuild_aggregates.py.
+    """
+    __tablename__ = 'health_data_anomaly_state'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    provider = db.Column(db.String(50), nullable=False)
+    data_type = db.Column(db.String(100), nullable=False)
+    ewma_mean = db.Column(db.Float)
+    ewma_var = db.Column(db.Float)
+    observation_count = db.Column(db.Integer, nullable=False, default=0)
+    last_date = db.Column(db.Date)
+    last_value = db.Column(db.Float)
+    prev_ewma_mean = db.Column(db.Float)
+    prev_ewma_var = db.Column(db.Float)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'provider', 'data_type', name='unique_anomaly_state_user_provider_type'),
+    )
+
+
+class HealthDataAnomaly(db.Model):
+    """
+    A daily value that deviated from its series' EWMA baseline by more than
+    the configured number of standard deviations.
+    """
+    __tablename__ = 'health_data_anomalies'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    provider = db.Column(db.String(50), nullable=False)
+    data_type = db.Column(db.String(100), nullable=False)
+    date = db.Column(db.Date, nullable=False)
+    value = db.Column(db.Float, nullable=False)
+    expected = db.Column(db.Float, nullable=False)  # EWMA mean before this value
+    std = db.Column(db.Float, nullable=False)  # EWMA standard deviation before this value
+    zscore = db.Column(db.Float, nullable=False)
+    detected_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('idx_anomaly_user_date', 'user_id', 'date'),
+        db.UniqueConstraint('user_id', 'provider', 'data_type', 'date', name='unique_anomaly_user_provider_type_date'),
+    )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'provider': self.provider,
+            'data_type': self.data_type,
+            'date': self.date.isoformat() if self.date else None,
+            'value': self.value,
+            'expected': self.expected,
+            'std': self.std,
+            'zscore': self.zscore,
+            'direction': 'high' if self.zscore > 0 else 'low',
+            'detected_at': self.detected_at.isoformat() if self.detected_at else None
+        }
+
+
+class HealthDataSnapshot(db.Model):
+    """
+    State of one user/month Parquet snapshot of health_data (see
+    services.snapshot_service). services.ingestion bumps version on every
+    write to the month; a refresh rewrites the file and records the version
+    it read, so the month is stale while version > snapshot_version.
+    """
+    __tablename__ = 'health_data_snapshots'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    month = db.Column(db.Date, nullable=False)  # First day of the month
+    version = db.Column(db.Integer, nullable=False, default=1)
+    snapshot_version = db.Column(db.Integer, nullable=False, default=0)
+    row_count = db.Column(db.Integer, nullable=False, default=0)
+    refreshed_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'month', name='unique_snapshot_user_month'),
+    )
+
+    @property
+    def is_stale(self):
+        return self.version > self.snapshot_version
+
+    def to_dict(self):
+        return {
+            'month': self.month.strftime('%Y-%m') if self.month else None,
+            'row_count': self.row_count,
+            'stale': self.is_stale,
+            'refreshed_at': self.refreshed_at.isoformat() if self.refreshed_at else None
         }
 
 
@@ -212,3 +533,90 @@ class BloodMarker(db.Model):
             'notes': self.notes
         }
 
+
+class ExportJob(db.Model):
+    """
+    Background full-account export.
+
+    The archive is a zip of gzipped NDJSON parts plus uploaded blood test
+    files. `watermark` is the snapshot time: health data created up to it
+    is in the archive, so the next export can reuse these parts and only
+    append rows created afterwards.
+    """
+    __tablename__ = 'export_jobs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending, running, completed, failed, expired
+    progress = db.Column(db.Integer, default=0)  # 0-100
+    file_path = db.Column(db.String(500))
+    file_size = db.Column(db.BigInteger)
+    watermark = db.Column(db.DateTime)
+    health_row_count = db.Column(db.Integer)  # health_data rows created up to watermark
+    base_job_id = db.Column(db.Integer, db.ForeignKey('export_jobs.id'))  # archive reused as the base, if any
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    completed_at = db.Column(db.DateTime)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'status': self.status,
+            'progress': self.progress,
+            'file_size': self.file_size,
+            'watermark': self.watermark.isoformat() if self.watermark else None,
+            'base_job_id': self.base_job_id,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'completed_at': self.completed_at.isoformat() if self.completed_at else None
+        }
+
+
+# Per-user data version
+# Any flush that writes health_data, blood_tests, blood_markers or
+# integrations bumps users.data_version for the affected users in the same
+# transaction. Read endpoints derive ETags from it (routes/http_cache.py),
+# and since flask-login loads the user row on every request anyway, a
+# conditional request can be answered without querying the data tables.
+# Bulk rewrites that bypass the ORM units of work (the rebuild_* functions
+# behind rebuild_aggregates.py) call bump_data_version themselves.
+VERSIONED_MODELS = (HealthData, BloodTest, BloodMarker, Integration)
+
+
+def bump_data_version(session, user_ids):
+    """Increment users.data_version for user_ids in the session's transaction"""
+    session.connection().execute(
+        db.update(User.__table__)
+        .where(User.__table__.c.id.in_(user_ids))
+        .values(data_version=User.__table__.c.data_version + 1)
+    )
+
+
+@event.listens_for(Session, 'after_flush')
+def bump_data_versions(session, flush_context):
+    user_ids = set()
+    marker_test_ids = set()
+
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if not isinstance(obj, VERSIONED_MODELS):
+            continue
+        if obj in session.dirty and not session.is_modified(obj):
+            continue
+        if isinstance(obj, BloodMarker):
+            marker_test_ids.add(obj.blood_test_id)
+        elif obj.user_id is not None:
+            user_ids.add(obj.user_id)
+
+    if not user_ids and not marker_test_ids:
+        return
+
+    if marker_test_ids:
+        rows = session.connection().execute(
+            db.select(BloodTest.user_id).where(BloodTest.id.in_(marker_test_ids))
+        )
+        user_ids.update(row[0] for row in rows)
+
+    if user_ids:
+        bump_data_version(session, user_ids)
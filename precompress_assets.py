@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Precompress the frontend build
+Writes .gz (and .br when the brotli package is installed) next to each
+compressible file in frontend/build so routes/static_assets.py can serve
+them without compressing per request. Variants that would not be smaller
+are skipped.
+
+Usage: python precompress_assets.py [build_dir]
+"""
+
+import argparse
+import gzip
+import os
+
+COMPRESSIBLE_EXTENSIONS = ('.html', '.js', '.css', '.json', '.map', '.svg', '.txt', '.ico')
+MIN_SIZE = 1024  # Bytes; smaller files are not worth a variant
+
+
+def precompress(build_dir):
+    """Write compressed variants for every compressible file; returns the number written"""
+    try:
+        import brotli
+    except ImportError:
+        brotli = None
+        print("brotli not installed, writing gzip variants only")
+
+    written = 0
+    for root, _, names in os.walk(build_dir):
+        for name in names:
+            if not name.endswith(COMPRESSIBLE_EXTENSIONS):
+                continue
+            path = os.path.join(root, name)
+            with open(path, 'rb') as f:
+                data = f.read()
+            if len(data) < MIN_SIZE:
+                continue
+
+            variants = [('.gz', gzip.compress(data, compresslevel=9, mtime=0))]
+            if brotli is not None:
+                variants.append(('.br', brotli.compress(data, quality=11)))
+
+            for suffix, compressed in variants:
+                if len(compressed) >= len(data):
+                    continue
+                with open(path + suffix, 'wb') as f:
+                    f.write(compressed)
+                written += 1
+
+    return written
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Precompress the frontend build')
+    parser.add_argument('build_dir', nargs='?', default=os.path.join('frontend', 'build'))
+    args = parser.parse_args()
+    count = precompress(args.build_dir)
+    print(f"✅ Wrote {count} precompressed files in {args.build_dir}")
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Rebuild derived health data tables
+Recomputes the tables maintained incrementally by services.ingestion
+(rollups, data type catalog, anomaly state and flags, canonical values,
+monthly Parquet snapshots) from raw health_data. Run after deploying a new derived table
+or if one is suspected to have drifted. Every rebuild bumps the user's
+data_version, so cached summaries and ETags computed from the old tables expire.
+
+Usage: python rebuild_aggregates.py [--user-id ID]
+"""
+
+import argparse
+import os
+import sys
+from datetime import datetime
+
+# Add current directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+
+def rebuild_aggregates(user_id=None):
+    """Rebuild derived tables for one user, or for every user with health data"""
+    from app import create_app
+    from models import db, HealthData
+    from services import rollup_service, catalog_service, anomaly_service, reconciliation, snapshot_service
+
+    app = create_app()
+
+    with app.app_context():
+        print(f"=== AGGREGATE REBUILD START: {datetime.utcnow()} ===")
+
+        if user_id is not None:
+            user_ids = [user_id]
+        else:
+            user_ids = [row[0] for row in db.session.query(HealthData.user_id).distinct()]
+        print(f"Rebuilding aggregates for {len(user_ids)} users")
+
+        for uid in user_ids:
+            try:
+                buckets = rollup_service.rebuild_rollups(uid)
+                series = catalog_service.rebuild_catalog(uid)
+                anomalies = anomaly_service.rebuild_anomalies(uid)
+                canonical = reconciliation.rebuild_canonical(uid)
+                months = snapshot_service.rebuild_snapshots(uid)
+                print(f"User {uid}: {buckets} rollup buckets, {series} catalog entries, "
+                      f"{anomalies} anomalies, {canonical} canonical values, {months} snapshot months")
+            except Exception as e:
+                print(f"❌ Error rebuilding aggregates for user {uid}: {e}")
+                db.session.rollback()
+
+        print("✅ Aggregate rebuild complete")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Rebuild derived health data tables')
+    parser.add_argument('--user-id', type=int, help='Only rebuild this user')
+    args = parser.parse_args()
+    rebuild_aggregates(args.user_id)
@@ -0,0 +1,212 @@
+from flask import Blueprint, request, jsonify, current_app
+from flask_login import login_required, current_user
+from datetime import datetime, timedelta
+import numpy as np
+from models import HealthDataAnomaly
+from routes.http_cache import etag_by_data_version, etag_by_version
+from services import analytics_service, cycle_service, snapshot_service
+from services.background_jobs import run_in_background
+
+analytics_bp = Blueprint('analytics', __name__)
+
+
+def _parse_list(name, default=None):
+    """Comma-separated query parameter as a list of non-empty strings"""
+    raw = request.args.get(name)
+    if not raw:
+        return list(default) if default else []
+    return [item.strip() for item in raw.split(',') if item.strip()]
+
+
+def _parse_date(name):
+    """Optional ISO date query parameter as datetime64[D]"""
+    raw = request.args.get(name)
+    if not raw:
+        return None
+    return np.datetime64(datetime.fromisoformat(raw).date(), 'D')
+
+
+@analytics_bp.route('/rolling', methods=['GET'])
+@login_required
+@etag_by_data_version
+def get_rolling_statistics():
+    """Rolling mean/median/std, personal baseline and z-scores per data type
+
+    Query parameters:
+    - data_types: comma-separated, required (e.g. resting_heart_rate,sleep_score)
+    - windows: comma-separated window sizes in days (default 7,30,90)
+    - baseline_days: trailing window for the baseline (default 90)
+    - provider: use one provider's series (default: reconciled across providers)
+    - start_date, end_date: limit the reported days
+    """
+    data_types = _parse_list('data_types')
+    if not data_types:
+        return jsonify({'error': 'data_types is required'}), 400
+
+    try:
+        windows = [int(w) for w in _parse_list('windows', analytics_service.DEFAULT_WINDOWS)]
+        baseline_days = int(request.args.get('baseline_days', analytics_service.DEFAULT_BASELINE_DAYS))
+        start = _parse_date('start_date')
+        end = _parse_date('end_date')
+    except ValueError as e:
+        return jsonify({'error': f'Invalid parameter: {e}'}), 400
+
+    if any(w < 1 or w > analytics_service.MAX_WINDOW_DAYS for w in windows + [baseline_days]):
+        return jsonify({'error': f'Windows must be between 1 and {analytics_service.MAX_WINDOW_DAYS} days'}), 400
+
+    results = analytics_service.rolling_analysis(
+        current_user.id, data_types, windows, baseline_days,
+        provider=request.args.get('provider'), start=start, end=end
+    )
+    return jsonify(results)
+
+
+@analytics_bp.route('/correlations', methods=['GET'])
+@login_required
+@etag_by_data_version
+def get_correlations():
+    """Correlation matrix between data types, optionally at several day lags
+
+    Query parameters:
+    - data_types: comma-separated, at least two (e.g. deep_sleep,sleep_efficiency,readiness_score)
+    - lags: comma-separated lags in days, 0-7 (default 0); at lag L entry [i][j]
+      pairs data_types[i] on a day with data_types[j] L days later
+    - method: pearson (default) or spearman
+    - min_overlap: paired days required for a coefficient (default 10)
+    - provider, start_date, end_date: as for /rolling
+    """
+    data_types = list(dict.fromkeys(_parse_list('data_types')))
+    if len(data_types) < 2:
+        return jsonify({'error': 'At least two data_types are required'}), 400
+    if len(data_types) > analytics_service.MAX_CORRELATION_TYPES:
+        return jsonify({'error': f'At most {analytics_service.MAX_CORRELATION_TYPES} data_types are supported'}), 400
+
+    method = request.args.get('method', 'pearson')
+    if method not in analytics_service.CORRELATION_METHODS:
+        return jsonify({'error': f"method must be one of {', '.join(analytics_service.CORRELATION_METHODS)}"}), 400
+
+    try:
+        lags = sorted({int(lag) for lag in _parse_list('lags', ['0'])})
+        min_overlap = int(request.args.get('min_overlap', analytics_service.MIN_CORRELATION_OVERLAP))
+        start = _parse_date('start_date')
+        end = _parse_date('end_date')
+    except ValueError as e:
+        return jsonify({'error': f'Invalid parameter: {e}'}), 400
+
+    if any(lag < 0 or lag > analytics_service.MAX_CORRELATION_LAG for lag in lags):
+        return jsonify({'error': f'Lags must be between 0 and {analytics_service.MAX_CORRELATION_LAG} days'}), 400
+
+    result = analytics_service.correlation_analysis(
+        current_user.id, data_types, lags, method,
+        provider=request.args.get('provider'), start=start, end=end, min_overlap=max(min_overlap, 2)
+    )
+    return jsonify(result)
+
+
+@analytics_bp.route('/anomalies', methods=['GET'])
+@login_required
+@etag_by_data_version
+def get_anomalies():
+    """Feed of flagged values, newest first
+
+    Query parameters:
+    - days: only anomalies from the last N days (default 30)
+    - data_types: comma-separated filter
+    - provider: provider filter
+    - limit: maximum number of anomalies (default 100)
+    """
+    try:
+        days = int(request.args.get('days', 30))
+        limit = min(int(request.args.get('limit', 100)), 1000)
+    except ValueError as e:
+        return jsonify({'error': f'Invalid parameter: {e}'}), 400
+
+    query = HealthDataAnomaly.query.filter(
+        HealthDataAnomaly.user_id == current_user.id,
+        HealthDataAnomaly.date >= datetime.utcnow().date() - timedelta(days=days)
+    )
+    data_types = _parse_list('data_types')
+    if data_types:
+        query = query.filter(HealthDataAnomaly.data_type.in_(data_types))
+    if request.args.get('provider'):
+        query = query.filter(HealthDataAnomaly.provider == request.args['provider'])
+
+    anomalies = query.order_by(HealthDataAnomaly.date.desc(), HealthDataAnomaly.id.desc()).limit(limit).all()
+    return jsonify([anomaly.to_dict() for anomaly in anomalies])
+
+
+@analytics_bp.route('/cycle-phase', methods=['GET'])
+@login_required
+@etag_by_data_version
+def get_cycle_phase():
+    """Metrics aligned by menstrual cycle day and averaged across cycles
+
+    Query parameters:
+    - data_types: comma-separated (default temperature_deviation,readiness_score,sleep_score)
+    - provider: provider of the metrics (default: reconciled across providers)
+    - max_day: last cycle day reported (default 35)
+    """
+    data_types = list(dict.fromkeys(_parse_list('data_types', cycle_service.DEFAULT_DATA_TYPES)))
+    try:
+        max_day = int(request.args.get('max_day', cycle_service.DEFAULT_MAX_DAY))
+    except ValueError as e:
+        return jsonify({'error': f'Invalid parameter: {e}'}), 400
+    if max_day < 1 or max_day > cycle_service.MAX_CYCLE_DAYS:
+        return jsonify({'error': f'max_day must be between 1 and {cycle_service.MAX_CYCLE_DAYS}'}), 400
+
+    result = cycle_service.cycle_phase_analysis(
+        current_user.id, data_types, provider=request.args.get('provider'), max_day=max_day
+    )
+    return jsonify(result)
+
+
+@analytics_bp.route('/snapshots', methods=['GET'])
+@login_required
+def get_snapshots():
+    """Monthly Parquet snapshot state and the predefined snapshot queries"""
+    return jsonify({
+        'months': [snapshot.to_dict() for snapshot in snapshot_service.snapshot_status(current_user.id)],
+        'queries': {name: query['description'] for name, query in snapshot_service.SNAPSHOT_QUERIES.items()}
+    })
+
+
+@analytics_bp.route('/snapshots/refresh', methods=['POST'])
+@login_required
+def refresh_snapshots():
+    """Rewrite stale snapshot months in the background"""
+    run_in_background(current_app._get_current_object(), snapshot_service.refresh_snapshots, current_user.id)
+    return jsonify({'status': 'refreshing'}), 202
+
+
+@analytics_bp.route('/snapshots/<query_name>', methods=['GET'])
+@login_required
+@etag_by_version(snapshot_service.snapshot_state)
+def query_snapshots(query_name):
+    """Run a predefined query over the user's Parquet snapshots with DuckDB
+
+    Query parameters:
+    - data_types: comma-separated filter
+    - provider: provider filter
+    - start_date, end_date: limit the scanned days (and snapshot months read)
+    Months written since their last refresh are listed in stale_months.
+    Months whose snapshot file has gone missing are listed in missing_months
+    (their rows are left out) and rewritten by a background refresh.
+    """
+    if query_name not in snapshot_service.SNAPSHOT_QUERIES:
+        return jsonify({'error': f"Unknown query; use one of {', '.join(snapshot_service.SNAPSHOT_QUERIES)}"}), 404
+
+    try:
+        start = _parse_date('start_date')
+        end = _parse_date('end_date')
+    except ValueError as e:
+        return jsonify({'error': f'Invalid parameter: {e}'}), 400
+
+    result = snapshot_service.run_query(
+        current_user.id, query_name,
+        data_types=_parse_list('data_types'), provider=request.args.get('provider'),
+        start=start.astype(object) if start is not None else None,
+        end=end.astype(object) if end is not None else None
+    )
+    if result['missing_months']:
+        run_in_background(current_app._get_current_object(), snapshot_service.refresh_snapshots, current_user.id)
+    return jsonify(result)
@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify, redirect, url_for, current_app, flash
 from flask_login import login_user, logout_user, login_required, current_user
 from models import db, User, Integration
+from routes.http_cache import etag_by_data_version
 from datetime import datetime, timedelta
 from services.fitbit_service import FitbitService
 from services.oura_service import OuraService
@@ -302,6 +303,7 @@ def clue_callback():
 # Get user integrations
 @auth_bp.route('/integrations', methods=['GET'])
 @login_required
+@etag_by_data_version
 def get_integrations():
     """Get all integrations for current user"""
     integrations = Integration.query.filter_by(user_id=current_user.id).all()
@@ -1,6 +1,8 @@
 from flask import Blueprint, request, jsonify, current_app
 from flask_login import login_required, current_user
 from models import db, User, BloodTest, BloodMarker
+from routes.http_cache import etag_by_data_version
+from services import serialization
 from datetime import datetime
 from werkzeug.utils import secure_filename
 import os
@@ -44,16 +46,16 @@ def create_blood_test():
 
 @blood_test_bp.route('', methods=['GET'])
 @login_required
+@etag_by_data_version
 def get_blood_tests():
     """Get all blood tests for current user"""
     user = current_user
     
-    blood_tests = BloodTest.query.filter_by(user_id=user.id).order_by(BloodTest.test_date.desc()).all()
-    
-    return jsonify([test.to_dict() for test in blood_tests])
+    return serialization.json_response(serialization.blood_tests(user.id))
 
 @blood_test_bp.route('/test/<int:test_id>', methods=['GET'])
 @login_required
+@etag_by_data_version
 def get_blood_test(test_id):
     """Get a specific blood test"""
     blood_test = BloodTest.query.filter_by(
@@ -176,6 +178,7 @@ def delete_blood_marker(marker_id):
 
 @blood_test_bp.route('/markers/trends', methods=['GET'])
 @login_required
+@etag_by_data_version
 def get_marker_trends():
     """Get trends for a specific marker over time"""
     user = current_user
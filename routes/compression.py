@@ -0,0 +1,94 @@
+import zlib
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+# Response compression for /api/*
+# Text responses (JSON, NDJSON, CSV) and MessagePack are compressed with brotli or gzip,
+# whichever the client prefers and this process supports. Small bodies
+# are left alone (COMPRESSION_MIN_SIZE), streamed responses are
+# compressed chunk by chunk with a sync flush so clients still receive
+# rows as they are produced, and responses that already carry a
+# Content-Encoding (e.g. gzip=1 exports) pass through untouched.
+
+COMPRESSIBLE_MIMETYPES = {'application/json', 'application/x-ndjson', 'application/msgpack', 'text/csv', 'text/plain'}
+
+
+def negotiate_encoding():
+    """'br', 'gzip' or None for the current request's Accept-Encoding"""
+    accepted = request.accept_encodings
+    candidates = [('br', accepted['br']), ('gzip', accepted['gzip'])] if brotli else [('gzip', accepted['gzip'])]
+    encoding, quality = max(candidates, key=lambda c: c[1])
+    return encoding if quality > 0 else None
+
+
+def _gzip_compressor(level):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    return (
+        lambda data: compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH),
+        compressor.flush
+    )
+
+
+def _brotli_compressor(quality):
+    compressor = brotli.Compressor(quality=quality)
+    return (
+        lambda data: compressor.process(data) + compressor.flush(),
+        compressor.finish
+    )
+
+
+def compress_stream(chunks, compress, finish):
+    """Compress an iterable of str/bytes chunks, yielding each as it is ready"""
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            data = compress(chunk)
+            if data:
+                yield data
+        yield finish()
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+
+
+def init_compression(app):
+    """Register the compression hook on the app"""
+
+    @app.after_request
+    def compress_response(response):
+        config = app.config
+        if not request.path.startswith('/api/') or not config.get('COMPRESSION_ENABLED', True):
+            return response
+        if response.mimetype not in COMPRESSIBLE_MIMETYPES or response.direct_passthrough:
+            return response
+        if response.status_code < 200 or response.status_code in (204, 206, 304):
+            return response
+        if 'Content-Encoding' in response.headers:
+            return response
+
+        response.vary.add('Accept-Encoding')
+        encoding = negotiate_encoding()
+        if encoding is None:
+            return response
+
+        if encoding == 'br':
+            compress, finish = _brotli_compressor(config.get('COMPRESSION_BROTLI_QUALITY', 4))
+        else:
+            compress, finish = _gzip_compressor(config.get('COMPRESSION_GZIP_LEVEL', 6))
+
+        if response.is_streamed:
+            response.response = compress_stream(response.response, compress, finish)
+            response.headers.pop('Content-Length', None)
+        else:
+            data = response.get_data()
+            if len(data) < config.get('COMPRESSION_MIN_SIZE', 1024):
+                return response
+            response.set_data(compress(data) + finish())
+
+        response.headers['Content-Encoding'] = encoding
+        return response
@@ -0,0 +1,60 @@
+from flask import Blueprint, request, jsonify
+from flask_login import login_required, current_user
+from sqlalchemy.orm import selectinload
+from models import Integration, HealthData, BloodTest
+from datetime import datetime
+from routes.http_cache import etag_by_data_version
+from services.cache import get_cache
+from services import serialization
+
+dashboard_bp = Blueprint('dashboard', __name__)
+
+@dashboard_bp.route('', methods=['GET'])
+@login_required
+@etag_by_data_version
+def get_dashboard():
+    """Everything the Dashboard page renders, in one round trip
+
+    Combines /api/auth/integrations, /api/health/summary and /api/blood-tests.
+    The assembled tile is cached per user under the user's data version, so
+    it is reused until the next write to their data.
+
+    Query parameters:
+    - days: health summary window (default 7)
+    - blood_tests_limit: only return the most recent N blood tests
+    - layout: columnar to return summary values as ascending dates/values
+      arrays (dates=delta for day offsets), as for /api/health/summary
+    """
+    user = current_user
+
+    days = int(request.args.get('days', 7))
+    blood_tests_limit = request.args.get('blood_tests_limit', type=int)
+    layout = request.args.get('layout', 'rows')
+    date_encoding = request.args.get('dates', 'iso')
+    if layout not in serialization.LAYOUTS or date_encoding not in serialization.DATE_ENCODINGS:
+        return jsonify({'error': 'layout must be rows or columnar and dates iso or delta'}), 400
+
+    cache = get_cache()
+    cache_key = f"dashboard:{user.id}:{user.data_version}:{datetime.utcnow().date()}:{days}:{blood_tests_limit}"
+    tile = cache.get(cache_key)
+
+    if tile is None:
+        integrations = Integration.query.filter_by(user_id=user.id).all()
+
+        blood_tests_query = BloodTest.query.options(selectinload(BloodTest.markers)).filter_by(
+            user_id=user.id
+        ).order_by(BloodTest.test_date.desc())
+        if blood_tests_limit:
+            blood_tests_query = blood_tests_query.limit(blood_tests_limit)
+
+        tile = {
+            'integrations': [integration.to_dict() for integration in integrations],
+            'health_summary': HealthData.get_window_summary(user.id, days),
+            'blood_tests': [test.to_dict() for test in blood_tests_query.all()]
+        }
+        cache.set(cache_key, tile)
+
+    if layout == 'columnar':
+        tile = dict(tile, health_summary=serialization.columnar_summary(tile['health_summary'], date_encoding))
+
+    return jsonify(tile)
@@ -1,10 +1,14 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, stream_with_context, current_app, send_file, url_for
 from flask_login import login_required, current_user
-from models import db, User, Integration, HealthData
-from datetime import datetime, timedelta
+from models import db, User, Integration, HealthData, HealthDataRollup, HealthDataCatalog, HealthDataCanonical, ExportJob
+from routes.http_cache import etag_by_data_version
+from datetime import datetime
 from services.fitbit_service import FitbitService
 from services.oura_service import OuraService
 from services.clue_service import ClueService
+from services import export_service, export_job_service, rollup_service, downsampling, units, serialization, snapshot_service, series_cache
+from services.background_jobs import run_in_background
+import os
 
 health_bp = Blueprint('health', __name__)
 
@@ -82,74 +86,313 @@ def sync_health_data():
             results['clue'] = {'error': str(e)}
     
     db.session.commit()
+
+    # Rewrite the Parquet snapshot months this sync touched, off the request path
+    run_in_background(current_app._get_current_object(), snapshot_service.refresh_snapshots, user.id)
     
     return jsonify(results)
 
 @health_bp.route('', methods=['GET'])
 @login_required
+@etag_by_data_version
 def get_health_data():
-    """Get health data for current user"""
+    """Get health data for current user
+
+    max_points/downsample reduce each provider/data_type series server-side
+    (see services.downsampling) for long-range charts; with layout=columnar
+    they are reduced over the in-memory series cache when it is enabled,
+    without querying health_data. units converts values
+    out of their stored units (see services.units.parse_preferences).
+    layout=columnar returns one object per series with parallel dates/values
+    arrays (dates=delta for day offsets) instead of one object per row.
+    """
     user = current_user
     
     # Query parameters
     start_date = request.args.get('start_date')
     end_date = request.args.get('end_date')
+    start = datetime.fromisoformat(start_date).date() if start_date else None
+    end = datetime.fromisoformat(end_date).date() if end_date else None
     data_type = request.args.get('data_type')
     provider = request.args.get('provider')
-    
-    query = HealthData.query.filter_by(user_id=user.id)
-    
+
+    layout, date_encoding, error = _layout_params()
+    if error:
+        return error
+
+    query = health_data_query(user.id, layout, start, end, data_type, provider)
+
+    max_points, method, error = _downsample_params()
+    if error:
+        return error
+
+    preferences, error = _unit_preferences()
+    if error:
+        return error
+
+    fields = [column.key for column in query.selected_columns]
+    if max_points and layout == 'columnar' and series_cache.is_enabled():
+        health_data = series_cache.downsampled_records(
+            user.id, max_points, method, provider=provider, data_type=data_type,
+            start=start, end=end, data_version=user.data_version
+        )
+        return _records_response(health_data, preferences, layout, date_encoding, fields=fields)
+
+    health_data = serialization.fetch_dicts(query)
+
+    if max_points:
+        health_data = downsampling.downsample_groups(
+            health_data, max_points, method,
+            group_key=lambda r: (r['provider'], r['data_type']),
+            date_key=lambda r: r['date'],
+            value_key=lambda r: r['value']
+        )
+
+    return _records_response(health_data, preferences, layout, date_encoding, fields=fields)
+
+def _downsample_params():
+    """Parse max_points/downsample query parameters for series endpoints
+
+    Returns (max_points, method, error_response).
+    """
+    max_points = request.args.get('max_points', type=int)
+    method = request.args.get('downsample', 'lttb')
+
+    if method not in downsampling.DOWNSAMPLE_METHODS:
+        return None, None, (jsonify({'error': f"downsample must be one of: {', '.join(downsampling.DOWNSAMPLE_METHODS)}"}), 400)
+    if max_points is not None and max_points < downsampling.MIN_POINTS:
+        return None, None, (jsonify({'error': f'max_points must be at least {downsampling.MIN_POINTS}'}), 400)
+
+    return max_points, method, None
+
+def _unit_preferences():
+    """Parse the units query parameter
+
+    Returns (preferences, error_response); preferences is None when no
+    conversion was asked for.
+    """
+    raw = request.args.get('units')
+    if not raw:
+        return None, None
+    try:
+        return units.parse_preferences(raw), None
+    except ValueError as e:
+        return None, (jsonify({'error': str(e)}), 400)
+
+def _layout_params():
+    """Parse layout/dates query parameters for series endpoints
+
+    Returns (layout, date_encoding, error_response).
+    """
+    layout = request.args.get('layout', 'rows')
+    date_encoding = request.args.get('dates', 'iso')
+
+    if layout not in serialization.LAYOUTS:
+        return None, None, (jsonify({'error': f"layout must be one of: {', '.join(serialization.LAYOUTS)}"}), 400)
+    if date_encoding not in serialization.DATE_ENCODINGS:
+        return None, None, (jsonify({'error': f"dates must be one of: {', '.join(serialization.DATE_ENCODINGS)}"}), 400)
+
+    return layout, date_encoding, None
+
+def health_data_query(user_id, layout='rows', start=None, end=None, data_type=None, provider=None):
+    """SELECT behind GET /api/health: plain column rows in to_dict() shape
+    (see services.serialization), newest first"""
+    if layout == 'columnar':
+        query = serialization.series_select()
+    else:
+        query = serialization.health_data_select()
+    query = query.where(HealthData.user_id == user_id)
+
+    if start:
+        query = query.where(HealthData.date >= start)
+
+    if end:
+        query = query.where(HealthData.date <= end)
+
+    if data_type:
+        query = query.where(HealthData.data_type == data_type)
+
+    if provider:
+        query = query.where(HealthData.provider == provider)
+
+    return query.order_by(HealthData.date.desc())
+
+def json_export_query(user_id):
+    """SELECT of every health_data row for the JSON export, newest first"""
+    return serialization.health_data_select().where(HealthData.user_id == user_id).order_by(
+        HealthData.date.desc(), HealthData.created_at.desc()
+    )
+
+def _records_response(records, preferences, layout='rows', date_encoding='iso', group_fields=('provider', 'data_type'),
+                      fields=None):
+    """List of record dicts, converted to the requested units and layout
+
+    The Accept header selects JSON (default), an Arrow IPC stream (always
+    one column per field, layout is ignored) or MessagePack (same document
+    as the JSON body). fields names the Arrow columns when there are no records.
+    """
+    if preferences:
+        try:
+            units.convert_records(records, preferences)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+    output_format = serialization.negotiate_format()
+    if output_format == 'arrow':
+        return serialization.arrow_response(records, fields)
+    if layout == 'columnar':
+        records = serialization.columnar_series(records, group_fields, date_encoding)
+    if output_format == 'msgpack':
+        return serialization.msgpack_response(records)
+    return serialization.json_response(records)
+
+@health_bp.route('/canonical', methods=['GET'])
+@login_required
+@etag_by_data_version
+def get_canonical_health_data():
+    """Get one reconciled value per data type and day across providers
+
+    Values are precomputed at ingestion (see services.reconciliation);
+    each row names the provider it came from. Accepts the same filters,
+    downsampling, units and layout parameters as GET /api/health, except
+    provider.
+    """
+    start_date = request.args.get('start_date')
+    end_date = request.args.get('end_date')
+    data_type = request.args.get('data_type')
+
+    query = HealthDataCanonical.query.filter_by(user_id=current_user.id)
+
     if start_date:
-        query = query.filter(HealthData.date >= datetime.fromisoformat(start_date).date())
-    
+        query = query.filter(HealthDataCanonical.date >= datetime.fromisoformat(start_date).date())
+
     if end_date:
-        query = query.filter(HealthData.date <= datetime.fromisoformat(end_date).date())
-    
+        query = query.filter(HealthDataCanonical.date <= datetime.fromisoformat(end_date).date())
+
     if data_type:
         query = query.filter_by(data_type=data_type)
-    
-    if provider:
-        query = query.filter_by(provider=provider)
-    
-    health_data = query.order_by(HealthData.date.desc()).all()
-    
-    return jsonify([data.to_dict() for data in health_data])
+
+    max_points, method, error = _downsample_params()
+    if error:
+        return error
+
+    preferences, error = _unit_preferences()
+    if error:
+        return error
+
+    layout, date_encoding, error = _layout_params()
+    if error:
+        return error
+
+    canonical = query.order_by(HealthDataCanonical.date.desc()).all()
+
+    if max_points:
+        canonical = downsampling.downsample_groups(
+            canonical, max_points, method,
+            group_key=lambda r: r.data_type,
+            date_key=lambda r: r.date,
+            value_key=lambda r: r.value
+        )
+
+    return _records_response([row.to_dict() for row in canonical], preferences, layout, date_encoding,
+                             group_fields=('data_type',), fields=list(HealthDataCanonical().to_dict()))
 
 @health_bp.route('/summary', methods=['GET'])
 @login_required
+@etag_by_data_version
 def get_health_summary():
-    """Get aggregated health data summary"""
+    """Get aggregated health data summary
+
+    Query parameters:
+    - days: window size in days (default 7)
+    - values: 0 to omit the per-day series and return only the statistics
+    - max_points, downsample: reduce each series to at most max_points
+      using lttb (default) or minmax
+    - units: output units, e.g. sleep_duration:minutes,°F (see services.units)
+    - layout: columnar to return each data type's values as ascending
+      dates/values arrays (dates=delta for day offsets)
+    """
     user = current_user
 
     days = int(request.args.get('days', 7))
-    start_date = datetime.utcnow().date() - timedelta(days=days)
-
-    # Get all health data for the user in date range
-    health_data = HealthData.query.filter(
-        HealthData.user_id == user.id,
-        HealthData.date >= start_date
-    ).order_by(HealthData.date.desc()).all()
-
-    # Aggregate data by data_type
-    summary = {}
-    for record in health_data:
-        data_type = record.data_type
-        if data_type not in summary:
-            summary[data_type] = {
-                'values': [],
-                'unit': record.unit or '',
-                'latest_value': record.value,
-                'latest_date': record.date.isoformat()
-            }
-        summary[data_type]['values'].append({
-            'date': record.date.isoformat(),
-            'value': record.value
-        })
+    include_values = request.args.get('values', '1').lower() not in ('0', 'false', 'no')
+
+    max_points, method, error = _downsample_params()
+    if error:
+        return error
+
+    preferences, error = _unit_preferences()
+    if error:
+        return error
+
+    layout, date_encoding, error = _layout_params()
+    if error:
+        return error
+
+    summary = HealthData.get_window_summary(user.id, days, include_values=include_values)
+
+    if include_values and max_points:
+        for data_type_summary in summary.values():
+            data_type_summary['values'] = downsampling.downsample_groups(
+                data_type_summary['values'], max_points, method,
+                group_key=lambda v: None,
+                date_key=lambda v: datetime.fromisoformat(v['date']),
+                value_key=lambda v: v['value']
+            )
+
+    if preferences:
+        try:
+            summary = units.convert_summary(summary, preferences)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+    if layout == 'columnar':
+        summary = serialization.columnar_summary(summary, date_encoding)
 
     return jsonify(summary)
 
+@health_bp.route('/rollups', methods=['GET'])
+@login_required
+@etag_by_data_version
+def get_health_rollups():
+    """Get weekly/monthly/yearly statistics for a data type from the rollup table
+
+    Query parameters:
+    - data_type: required
+    - period: week, month (default) or year
+    - provider, start_date, end_date: optional filters
+    """
+    user = current_user
+
+    data_type = request.args.get('data_type')
+    period = request.args.get('period', 'month')
+    provider = request.args.get('provider')
+    start_date = request.args.get('start_date')
+    end_date = request.args.get('end_date')
+
+    if not data_type:
+        return jsonify({'error': 'data_type is required'}), 400
+    if period not in rollup_service.ROLLUP_PERIODS:
+        return jsonify({'error': f"period must be one of: {', '.join(rollup_service.ROLLUP_PERIODS)}"}), 400
+
+    query = HealthDataRollup.query.filter_by(user_id=user.id, data_type=data_type, period=period)
+
+    if provider:
+        query = query.filter_by(provider=provider)
+
+    if start_date:
+        start = datetime.fromisoformat(start_date).date()
+        query = query.filter(HealthDataRollup.period_start >= rollup_service.period_start(start, period))
+
+    if end_date:
+        query = query.filter(HealthDataRollup.period_start <= datetime.fromisoformat(end_date).date())
+
+    rollups = query.order_by(HealthDataRollup.period_start, HealthDataRollup.provider).all()
+    return jsonify([rollup.to_dict() for rollup in rollups])
+
 @health_bp.route('/data-summary', methods=['GET'])
 @login_required
+@etag_by_data_version
 def get_data_summary():
     """Get comprehensive data summary for current user"""
     user = current_user
@@ -192,33 +435,42 @@ def sync_recent_health_data():
             print(f"Oura recent sync error: {str(e)}")
             results['oura'] = {'error': str(e)}
 
+    run_in_background(current_app._get_current_object(), snapshot_service.refresh_snapshots, user.id)
+
     return jsonify(results)
 
 @health_bp.route('/export', methods=['GET'])
 @login_required
 def export_user_data():
-    """Export all user health data as JSON"""
+    """Export all user health data as JSON, NDJSON, CSV or Parquet
+
+    Query parameters:
+    - format: json, ndjson, csv, parquet, arrow (IPC stream) or msgpack;
+      without it the Accept header picks json (default), arrow or msgpack
+    - table: health_data, blood_tests or blood_markers (csv/parquet/arrow
+      export one table per file; ndjson/msgpack export all tables unless
+      one is given)
+    - gzip: 1 to gzip-compress ndjson/csv/msgpack, or use gzip pages for parquet
+    """
     user = current_user
 
+    export_format = request.args.get('format') or serialization.negotiate_format()
+    if export_format not in export_service.EXPORT_FORMATS:
+        return jsonify({'error': f"Unsupported format. Use one of: {', '.join(export_service.EXPORT_FORMATS)}"}), 400
+
+    if export_format != 'json':
+        return _stream_export(user.id, export_format)
+
     # Get all health data for user
-    health_data = HealthData.query.filter_by(user_id=user.id).order_by(
-        HealthData.date.desc(), HealthData.created_at.desc()
-    ).all()
+    health_data = serialization.fetch_dicts(json_export_query(user.id))
 
     # Get all blood tests for user
     blood_tests = []
     try:
-        from models import BloodTest, BloodMarker
-        blood_tests_data = BloodTest.query.filter_by(user_id=user.id).order_by(
-            BloodTest.test_date.desc()
-        ).all()
-
-        for test in blood_tests_data:
-            markers = BloodMarker.query.filter_by(blood_test_id=test.id).all()
-            blood_tests.append({
-                'test': test.to_dict(),
-                'markers': [marker.to_dict() for marker in markers]
-            })
+        blood_tests = [
+            {'test': test, 'markers': test['markers']}
+            for test in serialization.blood_tests(user.id)
+        ]
     except:
         pass  # Blood test tables might not exist yet
 
@@ -239,41 +491,97 @@ def export_user_data():
             'name': user.name,
             'created_at': user.created_at.isoformat() if user.created_at else None
         },
-        'health_data': [data.to_dict() for data in health_data],
+        'health_data': health_data,
         'blood_tests': blood_tests,
         'integrations': integrations,
         'data_summary': HealthData.get_user_data_summary(user.id)
     }
 
-    return jsonify(export_data)
+    return serialization.json_response(export_data)
+
+def _stream_export(user_id, export_format):
+    """Build a streaming export response for the columnar/line formats"""
+    table = request.args.get('table')
+    if table and table not in export_service.EXPORT_TABLES:
+        return jsonify({'error': f"Unsupported table. Use one of: {', '.join(export_service.EXPORT_TABLES)}"}), 400
+
+    use_gzip = request.args.get('gzip', '').lower() in ('1', 'true', 'yes')
+
+    if export_format in ('ndjson', 'msgpack'):
+        tables = (table,) if table else export_service.EXPORT_TABLES
+        if export_format == 'ndjson':
+            chunks = export_service.generate_ndjson(user_id, tables)
+        else:
+            chunks = export_service.generate_msgpack(user_id, tables)
+        table = table or 'all'
+    elif export_format == 'csv':
+        table = table or 'health_data'
+        chunks = export_service.generate_csv(user_id, table)
+    else:
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            return jsonify({'error': f'{export_format.capitalize()} export requires pyarrow to be installed'}), 500
+        table = table or 'health_data'
+        if export_format == 'arrow':
+            chunks = export_service.generate_arrow(user_id, table)
+        else:
+            compression = 'gzip' if use_gzip else 'snappy'
+            chunks = export_service.generate_parquet(user_id, table, compression)
+        use_gzip = False  # Binary columnar formats are sent as is
+
+    filename = f"health_export_{user_id}_{table}.{export_format}"
+    mimetype = export_service.CONTENT_TYPES[export_format]
+    if use_gzip:
+        chunks = export_service.gzip_stream(chunks)
+        filename += '.gz'
+        mimetype = 'application/gzip'
+
+    return Response(
+        stream_with_context(chunks),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename={filename}'}
+    )
+
+@health_bp.route('/export/jobs', methods=['POST'])
 @login_required
-def get_health_summary():
-    """Get aggregated health data summary"""
-    user = current_user
-    
-    days = int(request.args.get('days', 7))
-    start_date = datetime.utcnow().date() - timedelta(days=days)
-    
-    health_data = HealthData.query.filter(
-        HealthData.user_id == user.id,
-        HealthData.date >= start_date
-    ).all()
-    
-    # Aggregate data by type
-    summary = {}
-    for data in health_data:
-        if data.data_type not in summary:
-            summary[data.data_type] = {
-                'provider': data.provider,
-                'unit': data.unit,
-                'values': []
-            }
-        summary[data.data_type]['values'].append({
-            'date': data.date.isoformat(),
-            'value': data.value
-        })
-    
-    return jsonify(summary)
+def create_export_job():
+    """Start a background full-account export (data plus uploaded files)"""
+    job, created = export_job_service.create_export_job(current_user.id)
+    if created:
+        run_in_background(current_app._get_current_object(), export_job_service.run_export_job, job.id)
+    return jsonify(job.to_dict()), 202 if created else 200
+
+@health_bp.route('/export/jobs/<int:job_id>', methods=['GET'])
+@login_required
+def get_export_job(job_id):
+    """Get export job progress, with a time-limited download link once complete"""
+    job = ExportJob.query.filter_by(id=job_id, user_id=current_user.id).first_or_404()
+
+    result = job.to_dict()
+    if job.status == 'completed':
+        token = export_job_service.make_download_token(job)
+        result['download_url'] = url_for('health.download_export_job', job_id=job.id, token=token)
+        result['download_expires_in'] = current_app.config['EXPORT_LINK_TTL']
+    return jsonify(result)
+
+@health_bp.route('/export/jobs/<int:job_id>/download', methods=['GET'])
+def download_export_job(job_id):
+    """Download an export archive using the signed link from get_export_job"""
+    user_id = export_job_service.verify_download_token(request.args.get('token', ''), job_id)
+    if user_id is None:
+        return jsonify({'error': 'Download link is invalid or has expired'}), 403
+
+    job = ExportJob.query.filter_by(id=job_id, user_id=user_id).first_or_404()
+    if job.status != 'completed' or not job.file_path or not os.path.exists(job.file_path):
+        return jsonify({'error': 'Export archive is no longer available'}), 404
+
+    return send_file(
+        os.path.abspath(job.file_path),
+        mimetype='application/zip',
+        as_attachment=True,
+        download_name=f"health_export_{job.user_id}_{job.id}.zip"
+    )
 
 @health_bp.route('/debug', methods=['GET'])
 def debug_endpoint():
@@ -337,8 +645,22 @@ def test_sync_health_data():
     return jsonify(results)
 
 @health_bp.route('/types', methods=['GET'])
+@login_required
+@etag_by_data_version
 def get_data_types():
-    """Get all available data types"""
-    data_types = db.session.query(HealthData.data_type).distinct().all()
+    """Get the data types the current user has data for (from the catalog)"""
+    data_types = db.session.query(HealthDataCatalog.data_type).filter_by(
+        user_id=current_user.id
+    ).distinct().order_by(HealthDataCatalog.data_type).all()
     return jsonify([dt[0] for dt in data_types])
 
+@health_bp.route('/catalog', methods=['GET'])
+@login_required
+@etag_by_data_version
+def get_data_catalog():
+    """Get the current user's series catalog: unit, date range and count per provider/data_type"""
+    entries = HealthDataCatalog.query.filter_by(user_id=current_user.id).order_by(
+        HealthDataCatalog.data_type, HealthDataCatalog.provider
+    ).all()
+    return jsonify([entry.to_dict() for entry in entries])
+
@@ -0,0 +1,65 @@
+import hashlib
+from datetime import datetime
+from functools import wraps
+from flask import request, current_app
+from flask_login import current_user
+
+# Conditional GET support for per-user read endpoints
+# The ETag is derived from users.data_version (bumped on every write to the
+# user's data, see models.bump_data_versions), the request path, query
+# string and Accept header (some endpoints negotiate JSON, Arrow or
+# MessagePack), and the current UTC day (relative windows like ?days=7 move at
+# midnight). A matching If-None-Match is answered with 304 before the view
+# runs, so no data tables are queried. Endpoints whose output changes
+# without a data_version bump (snapshot queries) pass their own validator
+# to etag_by_version.
+
+
+def data_version_etag(user=None, version=None):
+    """Weak ETag value for the current request and user's data version
+
+    version replaces users.data_version for endpoints that have their own
+    validator (see etag_by_version).
+    """
+    user = user or current_user
+    version = user.data_version if version is None else version
+    accept = request.headers.get('Accept', '')
+    material = f"{user.id}:{version}:{datetime.utcnow().date()}:{request.full_path}:{accept}"
+    return hashlib.sha1(material.encode('utf-8')).hexdigest()[:20]
+
+
+def etag_by_version(get_version):
+    """Decorator factory answering 304 Not Modified while get_version(user_id)
+    is unchanged
+
+    For endpoints whose output does not follow users.data_version. Apply
+    below @login_required.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            etag = data_version_etag(version=get_version(current_user.id))
+
+            if request.if_none_match.contains_weak(etag):
+                response = current_app.response_class(status=304)
+            else:
+                response = current_app.make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag, weak=True)
+            response.headers['Cache-Control'] = 'private, no-cache'
+            response.vary.add('Accept')
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def etag_by_data_version(view):
+    """Decorator answering 304 Not Modified when the user's data is unchanged
+
+    Apply below @login_required.
+    """
+    return etag_by_version(lambda user_id: current_user.data_version)(view)
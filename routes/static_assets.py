@@ -0,0 +1,115 @@
+import hashlib
+import json
+import mimetypes
+import os
+from flask import request, send_file
+
+# Static asset layer for the React build
+# The build folder is indexed once at startup: every file's content type,
+# content-hash ETag and precompressed .br/.gz variants (written by
+# precompress_assets.py) are kept in memory, so a request is answered
+# from a dict lookup without probing the filesystem first.
+#
+# Files under static/ (and anything listed in asset-manifest.json other
+# than index.html) have content hashes in their names and are sent as
+# immutable for a year. Everything else, index.html included, must be
+# revalidated with its ETag on each use.
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))  # Preferred first
+
+
+class Asset:
+    """One servable file plus its precompressed variants"""
+
+    __slots__ = ('path', 'mimetype', 'etag', 'immutable', 'variants')
+
+    def __init__(self, path, mimetype, etag, immutable, variants):
+        self.path = path
+        self.mimetype = mimetype
+        self.etag = etag
+        self.immutable = immutable
+        self.variants = variants  # {encoding: (path, etag)}
+
+
+def _file_etag(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()[:20]
+
+
+class StaticAssets:
+    """In-memory index of the frontend build folder"""
+
+    def __init__(self, folder):
+        self.folder = folder
+        self.assets = {}
+        if folder and os.path.isdir(folder):
+            self.load()
+
+    def _hashed_paths(self):
+        """Paths named in asset-manifest.json, which carry content hashes"""
+        manifest_path = os.path.join(self.folder, 'asset-manifest.json')
+        try:
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return set()
+        return {path.lstrip('/') for path in manifest.get('files', {}).values()} - {'index.html'}
+
+    def load(self):
+        hashed = self._hashed_paths()
+        assets = {}
+
+        for root, _, names in os.walk(self.folder):
+            present = set(names)
+            for name in names:
+                if any(name.endswith(suffix) and name[:-len(suffix)] in present for _, suffix in ENCODINGS):
+                    continue  # A variant, served through its original
+
+                path = os.path.join(root, name)
+                relative = os.path.relpath(path, self.folder).replace(os.sep, '/')
+                etag = _file_etag(path)
+                variants = {
+                    encoding: (path + suffix, f"{etag}-{encoding}")
+                    for encoding, suffix in ENCODINGS if name + suffix in present
+                }
+                assets[relative] = Asset(
+                    path=path,
+                    mimetype=mimetypes.guess_type(name)[0] or 'application/octet-stream',
+                    etag=etag,
+                    immutable=relative in hashed or relative.startswith('static/'),
+                    variants=variants
+                )
+
+        self.assets = assets
+
+    def response(self, relative_path):
+        """Response for a build file, or None if the build has no such file"""
+        asset = self.assets.get(relative_path)
+        if asset is None:
+            return None
+
+        path, etag, encoding = asset.path, asset.etag, None
+        for candidate, _ in ENCODINGS:
+            if candidate in asset.variants and request.accept_encodings[candidate]:
+                path, etag = asset.variants[candidate]
+                encoding = candidate
+                break
+
+        response = send_file(path, mimetype=asset.mimetype, etag=etag, conditional=True, max_age=None)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        if asset.variants:
+            response.vary.add('Accept-Encoding')
+
+        if asset.immutable:
+            response.cache_control.no_cache = None
+            response.cache_control.public = True
+            response.cache_control.max_age = IMMUTABLE_MAX_AGE
+            response.cache_control.immutable = True
+        else:
+            response.cache_control.no_cache = True
+        return response
@@ -1,5 +1,7 @@
 from flask import Blueprint, request, jsonify
-from models import db, User
+from models import db, User, ExportJob
+from services import snapshot_service
+import os
 
 user_bp = Blueprint('users', __name__)
 
@@ -38,7 +40,16 @@ def get_users():
 def delete_user(user_id):
     """Delete a user"""
     user = User.query.get_or_404(user_id)
+    archives = [job.file_path for job in ExportJob.query.filter_by(user_id=user.id) if job.file_path]
+
+    # Derived tables and export jobs go with the user (ON DELETE CASCADE)
     db.session.delete(user)
     db.session.commit()
+
+    # Files kept outside the database
+    snapshot_service.delete_snapshots(user_id)
+    for path in archives:
+        if os.path.exists(path):
+            os.remove(path)
     return jsonify({'message': 'User deleted successfully'}), 200
 
@@ -0,0 +1,359 @@
+import math
+import warnings
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from services import series_cache, catalog_service
+from services.cache import get_cache
+
+# Vectorised analytics over the cached per-user arrays (services.series_cache)
+# Series are placed on a daily grid (NaN for missing days) so rolling
+# windows are calendar windows, then every statistic is computed for all
+# days at once from cumulative sums or a strided window view.
+
+DEFAULT_WINDOWS = (7, 30, 90)
+DEFAULT_BASELINE_DAYS = 90
+MAX_WINDOW_DAYS = 365
+MIN_WINDOW_COVERAGE = 0.5  # Share of days in a window that must have data
+
+CORRELATION_METHODS = ('pearson', 'spearman')
+MAX_CORRELATION_LAG = 7
+MAX_CORRELATION_TYPES = 30
+MIN_CORRELATION_OVERLAP = 10  # Paired days needed before a coefficient is reported
+
+
+def daily_grid(dates, values):
+    """Place a series on a contiguous daily grid: (grid_dates, grid_values)"""
+    if len(dates) == 0:
+        return np.array([], dtype='datetime64[D]'), np.array([], dtype=np.float64)
+    grid_dates = np.arange(dates[0], dates[-1] + 1, dtype='datetime64[D]')
+    grid_values = np.full(len(grid_dates), np.nan)
+    grid_values[(dates - dates[0]).astype(np.int64)] = values
+    return grid_dates, grid_values
+
+
+def rolling_stats(values, window, exclude_current=False):
+    """Trailing rolling mean, sample std and median over a daily grid
+
+    With exclude_current the window ends the day before each point, which is
+    what a baseline for scoring that point needs.
+    """
+    n = len(values)
+    present = ~np.isnan(values)
+    filled = np.where(present, values, 0.0)
+
+    cum = np.concatenate(([0.0], np.cumsum(filled)))
+    cum_sq = np.concatenate(([0.0], np.cumsum(filled * filled)))
+    cum_n = np.concatenate(([0], np.cumsum(present)))
+
+    end = np.arange(n) + (0 if exclude_current else 1)
+    start = np.maximum(end - window, 0)
+    count = cum_n[end] - cum_n[start]
+    total = cum[end] - cum[start]
+    total_sq = cum_sq[end] - cum_sq[start]
+
+    min_periods = max(1, math.ceil(window * MIN_WINDOW_COVERAGE))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.where(count >= min_periods, total / count, np.nan)
+        variance = (total_sq - count * mean * mean) / (count - 1)
+        std = np.where(count >= max(min_periods, 2), np.sqrt(np.maximum(variance, 0.0)), np.nan)
+
+    # Median needs the values themselves: strided view of every window
+    padded = np.concatenate((np.full(window, np.nan), values))
+    views = sliding_window_view(padded, window)
+    views = views[:n] if exclude_current else views[1:n + 1]
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        median = np.nanmedian(views, axis=1)
+    median = np.where(count >= min_periods, median, np.nan)
+
+    return mean, std, median
+
+
+def _to_list(values):
+    """Float array to a JSON-ready list with None for NaN"""
+    return [None if math.isnan(v) else v for v in values.tolist()]
+
+
+def compute_rolling(dates, values, windows, baseline_days, start=None, end=None):
+    """Rolling statistics, baseline and z-scores for one series
+
+    Results are reported for days with an observation inside [start, end].
+    """
+    grid_dates, grid_values = daily_grid(dates, values)
+
+    observed = ~np.isnan(grid_values)
+    if start is not None:
+        observed &= grid_dates >= start
+    if end is not None:
+        observed &= grid_dates <= end
+
+    result = {
+        'dates': np.datetime_as_string(grid_dates[observed]).tolist(),
+        'values': _to_list(grid_values[observed]),
+        'windows': {}
+    }
+
+    for window in windows:
+        mean, std, median = rolling_stats(grid_values, window)
+        result['windows'][str(window)] = {
+            'mean': _to_list(mean[observed]),
+            'median': _to_list(median[observed]),
+            'std': _to_list(std[observed])
+        }
+
+    baseline_mean, baseline_std, _ = rolling_stats(grid_values, baseline_days, exclude_current=True)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        zscore = (grid_values - baseline_mean) / baseline_std
+    zscore[~np.isfinite(zscore)] = np.nan
+
+    result['baseline'] = {
+        'days': baseline_days,
+        'mean': _to_list(baseline_mean[observed]),
+        'std': _to_list(baseline_std[observed]),
+        'zscore': _to_list(zscore[observed])
+    }
+    return result
+
+
+def _series_version(versions, data_type, provider=None):
+    """Sorted (provider, updated_at) pairs identifying the state of one data type"""
+    return sorted(
+        (p, str(v)) for (p, t), v in versions.items()
+        if t == data_type and (provider is None or p == provider)
+    )
+
+
+def rolling_analysis(user_id, data_types, windows=DEFAULT_WINDOWS, baseline_days=DEFAULT_BASELINE_DAYS,
+                     provider=None, start=None, end=None):
+    """Rolling statistics for several data types, cached per series version
+
+    A data type's result is reused until the catalog shows a newer write to
+    one of its series.
+    """
+    cache = get_cache()
+    versions = catalog_service.get_series_versions(user_id, data_types)
+    user_series = None
+
+    results = {}
+    for data_type in data_types:
+        series_version = _series_version(versions, data_type, provider)
+        cache_key = (f"rolling:{user_id}:{data_type}:{provider}:{','.join(map(str, windows))}:"
+                     f"{baseline_days}:{start}:{end}:{series_version}")
+        result = cache.get(cache_key)
+
+        if result is None:
+            if user_series is None:
+                user_series = series_cache.get_user_series(user_id)
+            dates, values = user_series.get(data_type, provider)
+            result = compute_rolling(dates, values, windows, baseline_days, start, end)
+            result['provider'] = provider or ('reconciled' if len(series_version) > 1 else
+                                              (series_version[0][0] if series_version else None))
+            cache.set(cache_key, result)
+
+        results[data_type] = result
+
+    return results
+
+
+def aligned_matrix(series):
+    """Stack (dates, values) series into one (days x series) matrix on a shared daily grid"""
+    non_empty = [dates for dates, _ in series if len(dates)]
+    if not non_empty:
+        return np.array([], dtype='datetime64[D]'), np.empty((0, len(series)))
+
+    first = min(dates[0] for dates in non_empty)
+    last = max(dates[-1] for dates in non_empty)
+    grid_dates = np.arange(first, last + 1, dtype='datetime64[D]')
+    matrix = np.full((len(grid_dates), len(series)), np.nan)
+    for column, (dates, values) in enumerate(series):
+        matrix[(dates - first).astype(np.int64), column] = values
+    return grid_dates, matrix
+
+
+def masked_ranks(values, masks):
+    """Ranks of a 1-D series within each row of masks: (m x days)
+
+    Row r holds the rank of every value among the days masks[r] selects
+    (1-based, ties averaged) and 0 outside them; masks must exclude missing
+    values. The series is sorted once and every mask ranked from a
+    cumulative count of its days in sorted order.
+    """
+    order = np.argsort(values, kind='stable')
+    ordered = values[order]
+    positions = np.arange(len(values))
+    # NaN never equals NaN, so missing values stay in groups of one
+    starts = np.ones(len(values), dtype=bool)
+    starts[1:] = ordered[1:] != ordered[:-1]
+    ends = np.append(starts[1:], True)
+    first = np.maximum.accumulate(np.where(starts, positions, 0))
+    last = np.minimum.accumulate(np.where(ends, positions, len(values))[::-1])[::-1]
+
+    selected = masks[:, order]
+    counts = np.cumsum(selected, axis=1, dtype=np.int32)
+    if (first == last).all():
+        # No ties: the rank is the running count of selected days
+        ordered_ranks = counts * selected
+    else:
+        # Selected days before the tie group, plus the average position within it
+        before = counts[:, first] - selected[:, first]
+        ordered_ranks = (before + counts[:, last] + 1) * 0.5 * selected
+    ranks = np.empty(masks.shape)
+    ranks[:, order] = ordered_ranks
+    return ranks
+
+
+def lagged_correlation(matrix, lag=0, min_overlap=MIN_CORRELATION_OVERLAP):
+    """Pairwise-complete Pearson correlation between every column of the matrix
+    and every column shifted lag days later: (coefficients, overlap counts)
+
+    Entry [i, j] pairs column i on each day with column j lag days later.
+    All pairs are computed at once from masked matrix products, so the cost
+    is a handful of (k x days) @ (days x k) multiplications.
+    """
+    days = matrix.shape[0] - lag
+    if days <= 0:
+        k = matrix.shape[1]
+        return np.full((k, k), np.nan), np.zeros((k, k), dtype=np.int64)
+
+    # Centering first keeps the sums-of-products formula numerically stable
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        centered = matrix - np.nanmean(matrix, axis=0)
+    a = centered[:days]
+    b = centered[lag:lag + days]
+    mask_a = (~np.isnan(a)).astype(np.float64)
+    mask_b = (~np.isnan(b)).astype(np.float64)
+    a = np.nan_to_num(a)
+    b = np.nan_to_num(b)
+
+    n = mask_a.T @ mask_b
+    sum_a = a.T @ mask_b
+    sum_b = mask_a.T @ b
+    sum_ab = a.T @ b
+    sum_aa = (a * a).T @ mask_b
+    sum_bb = mask_a.T @ (b * b)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        covariance = sum_ab - sum_a * sum_b / n
+        variance_a = sum_aa - sum_a * sum_a / n
+        variance_b = sum_bb - sum_b * sum_b / n
+        coefficients = covariance / np.sqrt(variance_a * variance_b)
+
+    coefficients[(n < max(min_overlap, 2)) | ~np.isfinite(coefficients)] = np.nan
+    return np.clip(coefficients, -1.0, 1.0), n.astype(np.int64)
+
+
+def lagged_rank_correlation(matrix, lag=0, min_overlap=MIN_CORRELATION_OVERLAP):
+    """Pairwise-complete Spearman correlation, shaped like lagged_correlation
+
+    Each pair is ranked over exactly the days it is paired on (both values
+    present, the second lag days later). Every series is ranked over all of
+    its days; a pair whose overlap is all of both series' days correlates
+    those ranks directly, so all such pairs come from one matrix product.
+    Only pairs whose overlap drops days are re-ranked over it. Each series
+    is sorted once, and its own and pair masks are ranked together by
+    masked_ranks.
+    """
+    k = matrix.shape[1]
+    days = matrix.shape[0] - lag
+    if days <= 0:
+        return np.full((k, k), np.nan), np.zeros((k, k), dtype=np.int64)
+
+    # Series as rows; day t of the earlier side is row t, of the later t + lag
+    series = np.ascontiguousarray(matrix.T)
+    present = ~np.isnan(series)
+    present_a = present[:, :days]
+    present_b = present[:, lag:]
+    n = present_a.astype(np.int64) @ present_b.T.astype(np.int64)
+    rerank = ((n < present_a.sum(axis=1)[:, None]) | (n < present_b.sum(axis=1)[None, :])) & \
+             (n >= max(min_overlap, 2))
+    pairs_i, pairs_j = np.nonzero(rerank)
+    pair_days = present_a[pairs_i] & present_b[pairs_j]
+
+    rank_a = np.empty((k, days))
+    rank_b = np.empty((k, days))
+    pair_rank_a = np.empty((len(pairs_i), days))
+    pair_rank_b = np.empty((len(pairs_i), days))
+    for column in range(k):
+        rows_a = np.flatnonzero(pairs_i == column)
+        rows_b = np.flatnonzero(pairs_j == column)
+        split = 2 + len(rows_a)
+        masks = np.zeros((split + len(rows_b), len(series[column])), dtype=bool)
+        masks[0, :days] = present_a[column]
+        masks[1, lag:] = present_b[column]
+        masks[2:split, :days] = pair_days[rows_a]
+        masks[split:, lag:] = pair_days[rows_b]
+        ranks = masked_ranks(series[column], masks)
+        rank_a[column] = ranks[0, :days]
+        rank_b[column] = ranks[1, lag:]
+        pair_rank_a[rows_a] = ranks[2:split, :days]
+        pair_rank_b[rows_b] = ranks[split:, lag:]
+
+    # Ranks 1..n sum to n(n + 1)/2 whatever the ties, so centring reduces to
+    # subtracting n(n + 1)^2/4 from each raw sum of products (exact: every
+    # rank is a multiple of 0.5 and ranks are 0 off their days)
+    correction = n * (n + 1) ** 2 / 4.0
+    covariance = rank_a @ rank_b.T - correction
+    variance_a = np.einsum('kd,kd->k', rank_a, rank_a)[:, None] - correction
+    variance_b = np.einsum('kd,kd->k', rank_b, rank_b)[None, :] - correction
+
+    overlap = n[pairs_i, pairs_j]
+    pair_correction = overlap * (overlap + 1) ** 2 / 4.0
+    covariance[pairs_i, pairs_j] = np.einsum('pd,pd->p', pair_rank_a, pair_rank_b) - pair_correction
+    variance_a[pairs_i, pairs_j] = np.einsum('pd,pd->p', pair_rank_a, pair_rank_a) - pair_correction
+    variance_b[pairs_i, pairs_j] = np.einsum('pd,pd->p', pair_rank_b, pair_rank_b) - pair_correction
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        coefficients = covariance / np.sqrt(variance_a * variance_b)
+    coefficients[(n < max(min_overlap, 2)) | ~np.isfinite(coefficients)] = np.nan
+    return np.clip(coefficients, -1.0, 1.0), n
+
+
+def correlation_analysis(user_id, data_types, lags=(0,), method='pearson', provider=None,
+                         start=None, end=None, min_overlap=MIN_CORRELATION_OVERLAP):
+    """Correlation matrices between data types for each requested lag
+
+    Spearman ranks each pair over its pairwise-complete, lag-shifted days
+    (see lagged_rank_correlation). The result is cached until one of
+    the series involved changes.
+    """
+    cache = get_cache()
+    versions = catalog_service.get_series_versions(user_id, data_types)
+    series_version = [_series_version(versions, data_type, provider) for data_type in data_types]
+    cache_key = (f"correlation:{user_id}:{','.join(data_types)}:{','.join(map(str, lags))}:{method}:"
+                 f"{provider}:{start}:{end}:{min_overlap}:{series_version}")
+    result = cache.get(cache_key)
+    if result is not None:
+        return result
+
+    user_series = series_cache.get_user_series(user_id)
+    series = []
+    for data_type in data_types:
+        dates, values = user_series.get(data_type, provider)
+        in_range = np.ones(len(dates), dtype=bool)
+        if start is not None:
+            in_range &= dates >= start
+        if end is not None:
+            in_range &= dates <= end
+        series.append((dates[in_range], values[in_range]))
+
+    grid_dates, matrix = aligned_matrix(series)
+    correlate = lagged_rank_correlation if method == 'spearman' else lagged_correlation
+
+    result = {
+        'data_types': list(data_types),
+        'method': method,
+        'provider': provider,
+        'start_date': str(grid_dates[0]) if len(grid_dates) else None,
+        'end_date': str(grid_dates[-1]) if len(grid_dates) else None,
+        'lags': {}
+    }
+    for lag in lags:
+        coefficients, overlap = correlate(matrix, lag, min_overlap)
+        result['lags'][str(lag)] = {
+            'matrix': [_to_list(row) for row in coefficients],
+            'n': overlap.tolist()
+        }
+
+    cache.set(cache_key, result)
+    return result
@@ -0,0 +1,156 @@
+from flask import current_app
+from sqlalchemy import select
+from models import db, bump_data_version, HealthData, HealthDataAnomalyState, HealthDataAnomaly
+
+# Incremental anomaly detection on daily series
+# Each (user, provider, data_type) keeps an exponentially weighted mean and
+# variance. A new day's value is scored against the state before it and then
+# folded in, so every upsert costs O(1) regardless of history length.
+# Values for days older than the series' latest day are stored but not
+# scored; rebuild_aggregates.py replays whole series when needed.
+
+
+def _parameters():
+    """(alpha, zscore threshold, warm-up observations) from config"""
+    span = current_app.config.get('ANOMALY_EWMA_SPAN', 30)
+    return (
+        2.0 / (span + 1),
+        current_app.config.get('ANOMALY_ZSCORE_THRESHOLD', 3.0),
+        current_app.config.get('ANOMALY_MIN_OBSERVATIONS', 14)
+    )
+
+
+def ewma_update(mean, var, value, alpha):
+    """Fold one value into an EWMA mean/variance pair"""
+    if mean is None:
+        return value, 0.0
+    diff = value - mean
+    increment = alpha * diff
+    return mean + increment, (1 - alpha) * (var + diff * increment)
+
+
+def zscore(mean, var, count, value, min_observations):
+    """Deviation of value from the EWMA state in standard deviations, or None while warming up"""
+    if mean is None or count < min_observations or not var or var <= 0:
+        return None
+    return (value - mean) / var ** 0.5
+
+
+def apply_upsert(user_id, provider, data_type, date, value):
+    """Score one changed daily value and update the series state (caller commits)"""
+    if value is None:
+        return
+
+    alpha, threshold, min_observations = _parameters()
+    state = HealthDataAnomalyState.query.filter_by(
+        user_id=user_id,
+        provider=provider,
+        data_type=data_type
+    ).first()
+
+    if state is None:
+        state = HealthDataAnomalyState(
+            user_id=user_id,
+            provider=provider,
+            data_type=data_type,
+            observation_count=0
+        )
+        db.session.add(state)
+
+    if state.last_date is not None and date < state.last_date:
+        return
+
+    revision = state.last_date == date
+    if revision:
+        # Re-synced latest day: score against the state before it
+        mean, var, count = state.prev_ewma_mean, state.prev_ewma_var, state.observation_count - 1
+    else:
+        mean, var, count = state.ewma_mean, state.ewma_var, state.observation_count
+
+    score = zscore(mean, var, count, value, min_observations)
+    flagged = score is not None and abs(score) >= threshold
+
+    anomaly = None
+    if revision:
+        anomaly = HealthDataAnomaly.query.filter_by(
+            user_id=user_id,
+            provider=provider,
+            data_type=data_type,
+            date=date
+        ).first()
+        if anomaly is not None and not flagged:
+            db.session.delete(anomaly)
+
+    if flagged:
+        if anomaly is None:
+            anomaly = HealthDataAnomaly(user_id=user_id, provider=provider, data_type=data_type, date=date)
+            db.session.add(anomaly)
+        anomaly.value = value
+        anomaly.expected = mean
+        anomaly.std = var ** 0.5
+        anomaly.zscore = score
+
+    state.prev_ewma_mean, state.prev_ewma_var = mean, var
+    state.ewma_mean, state.ewma_var = ewma_update(mean, var, value, alpha)
+    state.observation_count = count + 1
+    state.last_date = date
+    state.last_value = value
+
+
+def replay_select(user_id):
+    """Every non-null value of a user in series and date order, for rebuild_anomalies"""
+    return select(
+        HealthData.provider, HealthData.data_type, HealthData.date, HealthData.value
+    ).where(
+        HealthData.user_id == user_id,
+        HealthData.value.isnot(None)
+    ).order_by(
+        HealthData.provider, HealthData.data_type, HealthData.date
+    )
+
+
+def rebuild_anomalies(user_id):
+    """Replay every series of a user from raw health_data; returns the number of anomalies"""
+    HealthDataAnomalyState.query.filter_by(user_id=user_id).delete()
+    HealthDataAnomaly.query.filter_by(user_id=user_id).delete()
+
+    alpha, threshold, min_observations = _parameters()
+    rows = db.session.execute(replay_select(user_id).execution_options(yield_per=10000))
+
+    states = {}
+    anomalies = []
+    for provider, data_type, date, value in rows:
+        state = states.get((provider, data_type))
+        if state is None:
+            state = states[(provider, data_type)] = {
+                'ewma_mean': None, 'ewma_var': None, 'observation_count': 0
+            }
+
+        mean, var, count = state['ewma_mean'], state['ewma_var'], state['observation_count']
+        score = zscore(mean, var, count, value, min_observations)
+        if score is not None and abs(score) >= threshold:
+            anomalies.append({
+                'user_id': user_id,
+                'provider': provider,
+                'data_type': data_type,
+                'date': date,
+                'value': value,
+                'expected': mean,
+                'std': var ** 0.5,
+                'zscore': score
+            })
+
+        state['prev_ewma_mean'], state['prev_ewma_var'] = mean, var
+        state['ewma_mean'], state['ewma_var'] = ewma_update(mean, var, value, alpha)
+        state['observation_count'] = count + 1
+        state['last_date'] = date
+        state['last_value'] = value
+
+    db.session.bulk_insert_mappings(HealthDataAnomalyState, [
+        dict(state, user_id=user_id, provider=provider, data_type=data_type)
+        for (provider, data_type), state in states.items()
+    ])
+    db.session.bulk_insert_mappings(HealthDataAnomaly, anomalies)
+    bump_data_version(db.session, [user_id])
+    db.session.commit()
+    return len(anomalies)
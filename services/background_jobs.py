@@ -0,0 +1,25 @@
+import threading
+import traceback
+from models import db
+
+# Minimal in-process background runner.
+# Production runs a single gunicorn worker, so a daemon thread with its own
+# app context (and therefore its own scoped DB session) is enough to move
+# long jobs off the request path without adding a task queue.
+
+
+def run_in_background(app, func, *args, **kwargs):
+    """Run func(*args, **kwargs) on a daemon thread inside an app context"""
+    def runner():
+        with app.app_context():
+            try:
+                func(*args, **kwargs)
+            except Exception as e:
+                print(f"Background job {func.__name__} failed: {e}")
+                traceback.print_exc()
+            finally:
+                db.session.remove()
+
+    thread = threading.Thread(target=runner, name=f"bg-{func.__name__}", daemon=True)
+    thread.start()
+    return thread
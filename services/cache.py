@@ -0,0 +1,102 @@
+import importlib
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app
+
+# Pluggable cache for derived per-user data
+# CACHE_BACKEND selects the backend: 'memory' (default, in-process LRU),
+# 'null' (caching disabled) or a 'module:Class' path to any class with the
+# same get/set/delete/clear methods, e.g. a shared Redis-backed cache when
+# running more than one process.
+#
+# The in-process backend only sees writes made by this process, so entries
+# also expire after CACHE_DEFAULT_TIMEOUT seconds to pick up writes made
+# elsewhere (e.g. sync_scheduler.py).
+
+
+class MemoryCacheBackend:
+    """Thread-safe in-process LRU cache with per-entry expiry"""
+
+    def __init__(self, max_entries=1024, default_timeout=300):
+        self.max_entries = max_entries
+        self.default_timeout = default_timeout
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout=None):
+        timeout = self.default_timeout if timeout is None else timeout
+        expires_at = time.monotonic() + timeout if timeout else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class NullCacheBackend:
+    """Backend that never stores anything"""
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value, timeout=None):
+        pass
+
+    def delete(self, key):
+        pass
+
+    def clear(self):
+        pass
+
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def get_cache():
+    """Cache backend configured for the current app (created on first use)"""
+    app = current_app._get_current_object()
+    backend = _backends.get(id(app))
+    if backend is None:
+        with _backends_lock:
+            backend = _backends.get(id(app))
+            if backend is None:
+                backend = _create_backend(app.config)
+                _backends[id(app)] = backend
+    return backend
+
+
+def _create_backend(config):
+    name = config.get('CACHE_BACKEND', 'memory')
+    max_entries = config.get('CACHE_MAX_ENTRIES', 1024)
+    timeout = config.get('CACHE_DEFAULT_TIMEOUT', 300)
+
+    if name == 'memory':
+        return MemoryCacheBackend(max_entries=max_entries, default_timeout=timeout)
+    if name == 'null':
+        return NullCacheBackend()
+
+    module_name, _, class_name = name.partition(':')
+    backend_class = getattr(importlib.import_module(module_name), class_name)
+    return backend_class(max_entries=max_entries, default_timeout=timeout)
@@ -0,0 +1,76 @@
+from datetime import datetime
+from sqlalchemy import func, insert, literal
+from models import db, bump_data_version, HealthData, HealthDataCatalog
+
+# Per-user catalog of stored series (user, provider, data_type)
+# Inserts extend the entry's date range and count; every change to a
+# series moves its updated_at, which analytics caches use as a version.
+
+
+def apply_upsert(user_id, provider, data_type, date, unit, created):
+    """Record one changed daily value in the catalog (caller commits)"""
+    entry = HealthDataCatalog.query.filter_by(
+        user_id=user_id,
+        provider=provider,
+        data_type=data_type
+    ).first()
+
+    if entry is None:
+        entry = HealthDataCatalog(
+            user_id=user_id,
+            provider=provider,
+            data_type=data_type,
+            record_count=0
+        )
+        db.session.add(entry)
+
+    if created:
+        entry.record_count += 1
+        if entry.first_date is None or date < entry.first_date:
+            entry.first_date = date
+        if entry.last_date is None or date > entry.last_date:
+            entry.last_date = date
+
+    entry.unit = unit
+    entry.updated_at = datetime.utcnow()
+
+
+def get_series_versions(user_id, data_types=None):
+    """{(provider, data_type): updated_at} for a user's series, for cache keys"""
+    query = db.session.query(
+        HealthDataCatalog.provider, HealthDataCatalog.data_type, HealthDataCatalog.updated_at
+    ).filter(HealthDataCatalog.user_id == user_id)
+    if data_types is not None:
+        query = query.filter(HealthDataCatalog.data_type.in_(data_types))
+    return {(provider, data_type): updated_at for provider, data_type, updated_at in query}
+
+
+def rebuild_select(user_id):
+    """Catalog rows of a user aggregated from raw health_data, for rebuild_catalog"""
+    return db.select(
+        HealthData.user_id,
+        HealthData.provider,
+        HealthData.data_type,
+        func.max(HealthData.unit),
+        func.min(HealthData.date),
+        func.max(HealthData.date),
+        func.count(HealthData.id),
+        literal(datetime.utcnow())
+    ).where(
+        HealthData.user_id == user_id
+    ).group_by(
+        HealthData.user_id, HealthData.provider, HealthData.data_type
+    )
+
+
+def rebuild_catalog(user_id):
+    """Recompute a user's catalog from raw health_data in one INSERT ... SELECT"""
+    HealthDataCatalog.query.filter_by(user_id=user_id).delete()
+
+    result = db.session.execute(insert(HealthDataCatalog).from_select(
+        ['user_id', 'provider', 'data_type', 'unit', 'first_date', 'last_date', 'record_count', 'updated_at'],
+        rebuild_select(user_id)
+    ))
+    bump_data_version(db.session, [user_id])
+    db.session.commit()
+    return result.rowcount
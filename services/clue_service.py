@@ -1,7 +1,7 @@
 import requests
 from datetime import datetime, timedelta
 from flask import current_app
-from models import db, HealthData
+from services.ingestion import save_health_data
 
 class ClueService:
     """
@@ -121,28 +121,7 @@ class ClueService:
     
     def _save_health_data(self, user_id, data_type, date, value, unit):
         """Save or update health data"""
-        existing = HealthData.query.filter_by(
-            user_id=user_id,
-            provider='clue',
-            data_type=data_type,
-            date=date
-        ).first()
-        
-        if existing:
-            existing.value = value
-            existing.unit = unit
-        else:
-            health_data = HealthData(
-                user_id=user_id,
-                provider='clue',
-                data_type=data_type,
-                date=date,
-                value=value,
-                unit=unit
-            )
-            db.session.add(health_data)
-        
-        db.session.commit()
+        save_health_data(user_id, 'clue', data_type, date, value, unit)
 
     def _save_parsed_data(self, user_id, parsed_data):
         """Save parsed Clue data to database"""
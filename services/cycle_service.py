@@ -0,0 +1,163 @@
+import numpy as np
+from services import series_cache, catalog_service
+from services.cache import get_cache
+
+# Menstrual cycle segmentation and cycle-day aligned aggregation
+# Cycles are segmented from Clue data (cycle_day == 1, or the first day of
+# a run of period days) and every other metric is placed on a cycle-day
+# axis, so e.g. temperature deviation can be averaged per cycle day across
+# all of a user's cycles.
+
+CLUE_PROVIDER = 'clue'
+SEGMENTATION_DATA_TYPES = ('cycle_day', 'period')
+DEFAULT_DATA_TYPES = ('temperature_deviation', 'readiness_score', 'sleep_score')
+MIN_CYCLE_DAYS = 15  # Starts closer together than this are treated as the same cycle
+MAX_CYCLE_DAYS = 60  # Longer gaps are missing tracking, not cycles
+DEFAULT_MAX_DAY = 35
+
+
+def find_cycle_starts(user_series):
+    """Cycle start dates (datetime64[D], sorted) from a user's Clue series"""
+    candidates = []
+
+    dates, values = user_series.get('cycle_day', CLUE_PROVIDER)
+    candidates.append(dates[values == 1])
+
+    dates, values = user_series.get('period', CLUE_PROVIDER)
+    period_days = np.unique(dates[values > 0])
+    if len(period_days):
+        # First day of each run of consecutive period days
+        run_start = np.concatenate(([True], np.diff(period_days).astype(np.int64) > 1))
+        candidates.append(period_days[run_start])
+
+    starts = np.unique(np.concatenate(candidates)) if candidates else np.array([], dtype='datetime64[D]')
+    if len(starts) < 2:
+        return starts
+
+    kept = [starts[0]]
+    for start in starts[1:]:
+        if (start - kept[-1]).astype(np.int64) >= MIN_CYCLE_DAYS:
+            kept.append(start)
+    return np.array(kept, dtype='datetime64[D]')
+
+
+def segment_cycles(user_id, user_series=None):
+    """Cycles as (starts, lengths, complete) arrays, cached until Clue data changes
+
+    A cycle runs until the next start; the latest one is open and runs to
+    the last day with Clue data. Cycles longer than MAX_CYCLE_DAYS are
+    treated as gaps in tracking and marked incomplete.
+    """
+    versions = catalog_service.get_series_versions(user_id, SEGMENTATION_DATA_TYPES)
+    clue_version = sorted(
+        (data_type, str(updated_at)) for (provider, data_type), updated_at in versions.items()
+        if provider == CLUE_PROVIDER
+    )
+    cache = get_cache()
+    cache_key = f"cycles:{user_id}:{clue_version}"
+    cached = cache.get(cache_key)
+
+    if cached is None:
+        if user_series is None:
+            user_series = series_cache.get_user_series(user_id)
+        starts = find_cycle_starts(user_series)
+
+        if len(starts):
+            last_clue_date = max(
+                user_series.get(data_type, CLUE_PROVIDER)[0][-1]
+                for data_type in SEGMENTATION_DATA_TYPES
+                if len(user_series.get(data_type, CLUE_PROVIDER)[0])
+            )
+            ends = np.append(starts[1:], max(last_clue_date, starts[-1]) + 1)
+            lengths = (ends - starts).astype(np.int64)
+            complete = np.append(np.ones(len(starts) - 1, dtype=bool), False) & (lengths <= MAX_CYCLE_DAYS)
+        else:
+            lengths = np.array([], dtype=np.int64)
+            complete = np.array([], dtype=bool)
+
+        cached = {
+            'starts': starts.astype(np.int64).tolist(),
+            'lengths': lengths.tolist(),
+            'complete': complete.tolist()
+        }
+        cache.set(cache_key, cached)
+
+    return (
+        np.array(cached['starts'], dtype=np.int64).astype('datetime64[D]'),
+        np.array(cached['lengths'], dtype=np.int64),
+        np.array(cached['complete'], dtype=bool)
+    )
+
+
+def cycle_day_index(dates, starts, lengths, max_day):
+    """(cycle index, 1-based cycle day) per date; -1 / 0 where a date is outside any cycle"""
+    if not len(starts):
+        return np.full(len(dates), -1, dtype=np.int64), np.zeros(len(dates), dtype=np.int64)
+
+    cycle = np.searchsorted(starts, dates, side='right') - 1
+    day = np.zeros(len(dates), dtype=np.int64)
+    inside = cycle >= 0
+    day[inside] = (dates[inside] - starts[cycle[inside]]).astype(np.int64) + 1
+    inside &= day <= np.minimum(lengths[np.maximum(cycle, 0)], max_day)
+    inside &= day <= MAX_CYCLE_DAYS
+    cycle[~inside] = -1
+    day[~inside] = 0
+    return cycle, day
+
+
+def cycle_phase_analysis(user_id, data_types=DEFAULT_DATA_TYPES, provider=None, max_day=DEFAULT_MAX_DAY):
+    """Per-cycle-day mean, std and counts of each data type across all cycles
+
+    All metrics are binned together: each value gets the bin
+    metric * max_day + (cycle_day - 1) and a few bincounts produce every
+    statistic at once.
+    """
+    user_series = series_cache.get_user_series(user_id)
+    starts, lengths, complete = segment_cycles(user_id, user_series)
+
+    result = {
+        'cycles': [
+            {'start_date': str(start), 'length': int(length), 'complete': bool(done)}
+            for start, length, done in zip(starts, lengths, complete)
+        ],
+        'cycle_days': list(range(1, max_day + 1)),
+        'metrics': {}
+    }
+
+    bins, weights, cycles = [], [], []
+    for metric, data_type in enumerate(data_types):
+        dates, values = user_series.get(data_type, provider)
+        cycle, day = cycle_day_index(dates, starts, lengths, max_day)
+        keep = (cycle >= 0) & ~np.isnan(values)
+        bins.append(metric * max_day + day[keep] - 1)
+        weights.append(values[keep])
+        cycles.append(cycle[keep])
+
+    size = len(data_types) * max_day
+    bins = np.concatenate(bins) if bins else np.array([], dtype=np.int64)
+    weights = np.concatenate(weights) if weights else np.array([], dtype=np.float64)
+    cycles = np.concatenate(cycles) if cycles else np.array([], dtype=np.int64)
+
+    counts = np.bincount(bins, minlength=size)
+    sums = np.bincount(bins, weights=weights, minlength=size)
+    sums_sq = np.bincount(bins, weights=weights * weights, minlength=size)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = sums / counts
+        variance = (sums_sq - counts * means * means) / (counts - 1)
+        stds = np.where(counts > 1, np.sqrt(np.maximum(variance, 0.0)), np.nan)
+
+    # Number of distinct cycles contributing to each metric
+    n_cycles = max(len(starts), 1)
+    metric_cycles = np.unique(bins // max_day * n_cycles + cycles)
+    cycles_per_metric = np.bincount(metric_cycles // n_cycles, minlength=len(data_types))
+
+    for metric, data_type in enumerate(data_types):
+        part = slice(metric * max_day, (metric + 1) * max_day)
+        result['metrics'][data_type] = {
+            'mean': [None if np.isnan(v) else v for v in means[part].tolist()],
+            'std': [None if np.isnan(v) else v for v in stds[part].tolist()],
+            'count': counts[part].tolist(),
+            'cycles': int(cycles_per_metric[metric])
+        }
+
+    return result
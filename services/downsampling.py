@@ -0,0 +1,121 @@
+import numpy as np
+
+# Server-side downsampling for chart series
+# Charts draw a few hundred points at most, so long date ranges are reduced
+# before serialisation. Two methods:
+# - lttb: Largest-Triangle-Three-Buckets, keeps the visually significant
+#   points (peaks, troughs, slope changes)
+# - minmax: keeps the minimum and maximum of each bucket, preserves extremes
+# x values are day ordinals; points without a value are dropped.
+
+DOWNSAMPLE_METHODS = ('lttb', 'minmax')
+MIN_POINTS = 3
+
+
+def lttb_indices(x, y, n_out):
+    """Indices of the points LTTB keeps, first and last always included
+
+    Bucket averages are computed for all buckets at once from cumulative
+    sums; the per-bucket triangle areas are NumPy operations, leaving only
+    one Python iteration per output point.
+    """
+    n = len(x)
+    if n_out >= n or n_out < MIN_POINTS:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    # n - 2 interior points split into n_out - 2 buckets
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    starts, ends = edges[:-1], edges[1:]
+
+    cum_x = np.concatenate(([0.0], np.cumsum(x)))
+    cum_y = np.concatenate(([0.0], np.cumsum(y)))
+    sizes = ends - starts
+    avg_x = (cum_x[ends] - cum_x[starts]) / sizes
+    avg_y = (cum_y[ends] - cum_y[starts]) / sizes
+
+    # Third triangle vertex: average of the next bucket (last point for the final bucket)
+    next_x = np.append(avg_x[1:], x[-1])
+    next_y = np.append(avg_y[1:], y[-1])
+
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    previous = 0
+    for i in range(n_out - 2):
+        start, end = starts[i], ends[i]
+        areas = np.abs(
+            (x[previous] - next_x[i]) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (next_y[i] - y[previous])
+        )
+        previous = start + int(np.argmax(areas))
+        selected[i + 1] = previous
+
+    return selected
+
+
+def minmax_indices(x, y, n_out):
+    """Indices of each bucket's min and max point, plus first and last point"""
+    n = len(y)
+    if n_out >= n:
+        return np.arange(n)
+
+    y = np.asarray(y, dtype=np.float64)
+    buckets = max((n_out - 2) // 2, 1)
+    bucket_ids = (np.arange(n) * buckets) // n
+    starts = np.searchsorted(bucket_ids, np.arange(buckets))
+
+    def first_hit(bucket_values):
+        # Index of the first point in each bucket equal to that bucket's extreme
+        hits = np.flatnonzero(y == bucket_values[bucket_ids])
+        _, first = np.unique(bucket_ids[hits], return_index=True)
+        return hits[first]
+
+    lows = first_hit(np.minimum.reduceat(y, starts))
+    highs = first_hit(np.maximum.reduceat(y, starts))
+
+    return np.unique(np.concatenate(([0, n - 1], lows, highs)))
+
+
+def downsample_indices(x, y, max_points, method='lttb'):
+    """Dispatch to the requested downsampling method"""
+    if method == 'minmax':
+        return minmax_indices(x, y, max_points)
+    return lttb_indices(x, y, max_points)
+
+
+def downsample_groups(items, max_points, method, group_key, date_key, value_key):
+    """Downsample each series in a flat list, keeping the list's order
+
+    items are grouped by group_key(item) and each group is reduced to at most
+    max_points using date_key(item) (a date) and value_key(item). Groups
+    already within max_points are returned whole; in larger groups items
+    without a value cannot be placed on the chart and are left out.
+    """
+    groups = {}
+    for position, item in enumerate(items):
+        groups.setdefault(group_key(item), []).append(position)
+
+    keep = []
+    for positions in groups.values():
+        if len(positions) <= max_points:
+            keep.extend(positions)
+            continue
+
+        positions = [p for p in positions if value_key(items[p]) is not None]
+        if len(positions) <= max_points:
+            keep.extend(positions)
+            continue
+
+        # Series must be ascending in x; input may be in either date order
+        positions.sort(key=lambda p: date_key(items[p]))
+        x = np.fromiter((date_key(items[p]).toordinal() for p in positions), dtype=np.float64, count=len(positions))
+        y = np.fromiter((value_key(items[p]) for p in positions), dtype=np.float64, count=len(positions))
+        kept = downsample_indices(x, y, max_points, method)
+        keep.extend(positions[i] for i in kept)
+
+    keep.sort()
+    return [items[p] for p in keep]
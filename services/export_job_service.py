@@ -0,0 +1,246 @@
+import json
+import os
+import shutil
+import zipfile
+from datetime import datetime, timedelta
+from flask import current_app
+from itsdangerous import URLSafeTimedSerializer, BadSignature, SignatureExpired
+from sqlalchemy import select, func, or_, case, update
+from models import db, ExportJob, HealthData, BloodTest
+from services import export_service
+
+# Background full-account exports
+# Archive layout (zip, entries stored uncompressed because every data
+# entry is already gzipped, which lets later exports copy them verbatim):
+#   manifest.json
+#   health_data/part-0000.ndjson.gz   base snapshot
+#   health_data/part-0001.ndjson.gz   rows created since the previous export
+#   blood_tests.ndjson.gz
+#   blood_markers.ndjson.gz
+#   files/<test id>_<name>            uploaded blood test files
+
+ACTIVE_JOB_WINDOW = timedelta(hours=1)  # Older pending/running jobs are treated as dead
+DOWNLOAD_SALT = 'export-download'
+
+
+def create_export_job(user_id):
+    """Create a pending export job, or return the user's job already in flight"""
+    active = ExportJob.query.filter(
+        ExportJob.user_id == user_id,
+        ExportJob.status.in_(('pending', 'running')),
+        ExportJob.created_at >= datetime.utcnow() - ACTIVE_JOB_WINDOW
+    ).first()
+    if active:
+        return active, False
+
+    job = ExportJob(user_id=user_id, status='pending', progress=0)
+    db.session.add(job)
+    db.session.commit()
+    return job, True
+
+
+class _Progress:
+    """Tracks written items and persists the job's percentage as it moves
+
+    Progress is written on its own connection: committing the job's session
+    would end the transaction holding the streaming (server-side) cursor of
+    the table being exported. SQLite cannot commit a write while that read
+    is open, so there progress is only saved between tables (save()).
+    """
+
+    def __init__(self, job, total):
+        self.job_id = job.id
+        self.total = max(total, 1)
+        self.done = 0
+        self.percent = job.progress or 0
+        self.saved = self.percent
+        self.live = db.engine.dialect.name != 'sqlite'
+
+    def advance(self, count):
+        self.done += count
+        self.percent = min(99, int(self.done * 100 / self.total))
+        if self.live:
+            self.save()
+
+    def save(self):
+        if self.percent == self.saved:
+            return
+        with db.engine.begin() as connection:
+            connection.execute(
+                update(ExportJob.__table__).where(ExportJob.__table__.c.id == self.job_id).values(progress=self.percent)
+            )
+        self.saved = self.percent
+
+
+def base_rows_select(user_id, watermark):
+    """Count of a user's rows created up to watermark, and how many were updated after it"""
+    return select(
+        func.count(HealthData.id),
+        func.sum(case((HealthData.updated_at > watermark, 1), else_=0))
+    ).where(
+        HealthData.user_id == user_id,
+        or_(HealthData.created_at <= watermark, HealthData.created_at.is_(None))
+    )
+
+
+def _reusable_base(user_id):
+    """Latest completed archive whose health data snapshot is still accurate
+
+    The snapshot stays valid when no row created before its watermark has
+    been deleted (count unchanged) or updated since (no newer updated_at).
+    """
+    base = ExportJob.query.filter_by(user_id=user_id, status='completed').order_by(
+        ExportJob.completed_at.desc()
+    ).first()
+    if not base or not base.watermark or not base.file_path or not os.path.exists(base.file_path):
+        return None
+
+    older = db.session.execute(base_rows_select(user_id, base.watermark)).one()
+
+    if older[0] != base.health_row_count or (older[1] or 0) > 0:
+        return None
+    return base
+
+
+def _write_ndjson_part(archive, name, table, user_id, progress, **filters):
+    """Write one table as a gzipped NDJSON entry; returns the row count"""
+    written = 0
+
+    def chunks():
+        nonlocal written
+        for columns, rows in export_service.iter_table_batches(table, user_id, **filters):
+            written += len(rows)
+            progress.advance(len(rows))
+            yield export_service.ndjson_chunk(table, columns, rows)
+
+    with archive.open(name, 'w', force_zip64=True) as entry:
+        for data in export_service.gzip_stream(chunks()):
+            entry.write(data)
+    progress.save()
+    return written
+
+
+def run_export_job(job_id):
+    """Build the archive for an export job (runs on a background thread)"""
+    job = ExportJob.query.get(job_id)
+    if not job:
+        return
+
+    user_id = job.user_id
+    job.status = 'running'
+    job.started_at = datetime.utcnow()
+    job.watermark = job.started_at
+    db.session.commit()
+
+    folder = current_app.config['EXPORT_FOLDER']
+    os.makedirs(folder, exist_ok=True)
+    final_path = os.path.join(folder, f"export_{user_id}_{job.id}.zip")
+    tmp_path = final_path + '.tmp'
+
+    try:
+        base = _reusable_base(user_id)
+        if base:
+            filters = {'created_after': base.watermark, 'created_until': job.watermark}
+        else:
+            filters = {'created_until': job.watermark}
+
+        health_rows = export_service.count_table_rows('health_data', user_id, **filters)
+        blood_tests = BloodTest.query.filter_by(user_id=user_id).all()
+        files = [t for t in blood_tests if t.file_path and os.path.exists(t.file_path)]
+        marker_count = sum(len(t.markers) for t in blood_tests)
+        progress = _Progress(job, health_rows + len(blood_tests) + marker_count + len(files))
+
+        parts = []
+        with zipfile.ZipFile(tmp_path, 'w', zipfile.ZIP_STORED, allowZip64=True) as archive:
+            if base:
+                # Copy the previous health data parts byte for byte
+                with zipfile.ZipFile(base.file_path) as previous:
+                    for info in previous.infolist():
+                        if info.filename.startswith('health_data/'):
+                            with previous.open(info) as src, archive.open(info.filename, 'w', force_zip64=True) as dst:
+                                shutil.copyfileobj(src, dst, 1024 * 1024)
+                            parts.append(info.filename)
+
+            new_rows = 0
+            if health_rows or not parts:
+                part_name = f"health_data/part-{len(parts):04d}.ndjson.gz"
+                new_rows = _write_ndjson_part(archive, part_name, 'health_data', user_id, progress, **filters)
+                parts.append(part_name)
+
+            _write_ndjson_part(archive, 'blood_tests.ndjson.gz', 'blood_tests', user_id, progress)
+            _write_ndjson_part(archive, 'blood_markers.ndjson.gz', 'blood_markers', user_id, progress)
+
+            attached = []
+            for test in files:
+                arcname = f"files/{test.id}_{os.path.basename(test.file_path)}"
+                archive.write(test.file_path, arcname, compress_type=zipfile.ZIP_DEFLATED)
+                attached.append(arcname)
+                progress.advance(1)
+            progress.save()
+
+            job.health_row_count = (base.health_row_count if base else 0) + new_rows
+            archive.writestr('manifest.json', json.dumps({
+                'user_id': user_id,
+                'job_id': job.id,
+                'export_date': job.started_at.isoformat(),
+                'watermark': job.watermark.isoformat(),
+                'base_job_id': base.id if base else None,
+                'health_data_parts': parts,
+                'health_data_rows': job.health_row_count,
+                'files': attached
+            }, indent=2), compress_type=zipfile.ZIP_DEFLATED)
+
+        os.replace(tmp_path, final_path)
+
+        job.file_path = final_path
+        job.file_size = os.path.getsize(final_path)
+        job.base_job_id = base.id if base else None
+        job.status = 'completed'
+        job.progress = 100
+        job.completed_at = datetime.utcnow()
+        db.session.commit()
+        print(f"Export job {job.id} completed: {job.file_size} bytes (base job: {job.base_job_id})")
+
+        _prune_archives(user_id)
+
+    except Exception as e:
+        db.session.rollback()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        job.status = 'failed'
+        job.error = str(e)
+        db.session.commit()
+        raise
+
+
+def _prune_archives(user_id):
+    """Delete archives beyond the newest EXPORT_ARCHIVES_KEPT for a user"""
+    keep = current_app.config.get('EXPORT_ARCHIVES_KEPT', 2)
+    old_jobs = ExportJob.query.filter_by(user_id=user_id, status='completed').order_by(
+        ExportJob.completed_at.desc()
+    ).offset(keep).all()
+
+    for old_job in old_jobs:
+        if old_job.file_path and os.path.exists(old_job.file_path):
+            os.remove(old_job.file_path)
+        old_job.file_path = None
+        old_job.status = 'expired'
+    db.session.commit()
+
+
+def make_download_token(job):
+    """Signed, time-limited token authorising a download of the job's archive"""
+    serializer = URLSafeTimedSerializer(current_app.config['SECRET_KEY'], salt=DOWNLOAD_SALT)
+    return serializer.dumps({'job_id': job.id, 'user_id': job.user_id})
+
+
+def verify_download_token(token, job_id):
+    """Return the user id a download token was issued to, or None if invalid/expired"""
+    serializer = URLSafeTimedSerializer(current_app.config['SECRET_KEY'], salt=DOWNLOAD_SALT)
+    try:
+        payload = serializer.loads(token, max_age=current_app.config['EXPORT_LINK_TTL'])
+    except (BadSignature, SignatureExpired):
+        return None
+    if payload.get('job_id') != job_id:
+        return None
+    return payload.get('user_id')
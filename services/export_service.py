@@ -0,0 +1,303 @@
+import csv
+import io
+import json
+import zlib
+from sqlalchemy import select, func, or_
+from models import db, HealthData, BloodTest, BloodMarker
+
+# Streaming exporters for /api/health/export
+# Rows are read as plain column tuples in batches (server-side cursor on
+# PostgreSQL) and written out as they arrive, so memory stays bounded
+# no matter how much history a user has.
+
+EXPORT_FORMATS = ('json', 'ndjson', 'csv', 'parquet', 'arrow', 'msgpack')
+EXPORT_TABLES = ('health_data', 'blood_tests', 'blood_markers')
+
+BATCH_SIZE = 5000
+PARQUET_ROW_GROUP_SIZE = 50000
+GZIP_LEVEL = 6
+
+CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+    'parquet': 'application/vnd.apache.parquet',
+    'arrow': 'application/vnd.apache.arrow.stream',
+    'msgpack': 'application/msgpack',
+}
+
+HEALTH_DATA_COLUMNS = (
+    HealthData.id, HealthData.user_id, HealthData.provider, HealthData.data_type,
+    HealthData.date, HealthData.value, HealthData.unit, HealthData.extra_data,
+    HealthData.source_version, HealthData.data_quality,
+    HealthData.created_at, HealthData.updated_at,
+)
+
+BLOOD_TEST_COLUMNS = (
+    BloodTest.id, BloodTest.test_date, BloodTest.lab_name, BloodTest.notes,
+    BloodTest.file_path, BloodTest.created_at, BloodTest.updated_at,
+)
+
+BLOOD_MARKER_COLUMNS = (
+    BloodMarker.id, BloodMarker.blood_test_id, BloodMarker.marker_name,
+    BloodMarker.value, BloodMarker.unit, BloodMarker.reference_range_low,
+    BloodMarker.reference_range_high, BloodMarker.is_abnormal, BloodMarker.notes,
+)
+
+
+def _table_query(table, user_id, created_after=None, created_until=None):
+    """Build the column-only SELECT for one export table
+
+    created_after/created_until restrict health_data to rows created in
+    that window (rows without created_at count as old), which is how
+    background export jobs split a base snapshot from a delta.
+    """
+    if table == 'health_data':
+        query = select(*HEALTH_DATA_COLUMNS).where(HealthData.user_id == user_id)
+        if created_after is not None:
+            query = query.where(HealthData.created_at > created_after)
+        if created_until is not None:
+            query = query.where(or_(HealthData.created_at <= created_until,
+                                    HealthData.created_at.is_(None)))
+        return query.order_by(HealthData.date.desc(), HealthData.id.desc())
+
+    if table == 'blood_tests':
+        return select(*BLOOD_TEST_COLUMNS).where(
+            BloodTest.user_id == user_id
+        ).order_by(BloodTest.test_date.desc(), BloodTest.id.desc())
+
+    if table == 'blood_markers':
+        return select(*BLOOD_MARKER_COLUMNS).join(
+            BloodTest, BloodMarker.blood_test_id == BloodTest.id
+        ).where(
+            BloodTest.user_id == user_id
+        ).order_by(BloodMarker.blood_test_id.desc(), BloodMarker.id)
+
+    raise ValueError(f"Unknown export table: {table}")
+
+
+def iter_table_batches(table, user_id, batch_size=BATCH_SIZE, **filters):
+    """Yield (column_names, rows) batches for a table without loading it whole"""
+    query = _table_query(table, user_id, **filters)
+    result = db.session.execute(
+        query.execution_options(stream_results=True, yield_per=batch_size)
+    )
+    columns = list(result.keys())
+    for partition in result.partitions(batch_size):
+        yield columns, partition
+
+
+def _count_query(table, user_id, **filters):
+    """Build the SELECT count(*) over the rows _table_query would export"""
+    return _table_query(table, user_id, **filters).with_only_columns(func.count()).order_by(None)
+
+
+def count_table_rows(table, user_id, **filters):
+    """Number of rows an export of the table would contain"""
+    return db.session.execute(_count_query(table, user_id, **filters)).scalar()
+
+
+def _json_value(value):
+    """Convert a column value to its JSON-friendly form"""
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+def _csv_value(value):
+    """Convert a column value to a CSV cell"""
+    if value is None:
+        return ''
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, separators=(',', ':'))
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+def generate_ndjson(user_id, tables=EXPORT_TABLES, **filters):
+    """Stream the requested tables as newline-delimited JSON
+
+    Every line carries a 'record_type' field naming the table it came from.
+    """
+    for table in tables:
+        for columns, rows in iter_table_batches(table, user_id, **filters):
+            yield ndjson_chunk(table, columns, rows)
+
+
+def ndjson_chunk(table, columns, rows):
+    """Encode one batch of rows as NDJSON lines"""
+    lines = []
+    for row in rows:
+        record = {'record_type': table}
+        for name, value in zip(columns, row):
+            record[name] = _json_value(value)
+        lines.append(json.dumps(record, separators=(',', ':')))
+    return '\n'.join(lines) + '\n'
+
+
+def generate_csv(user_id, table):
+    """Stream one table as CSV, header row first"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    header_written = False
+
+    for columns, rows in iter_table_batches(table, user_id):
+        if not header_written:
+            writer.writerow(columns)
+            header_written = True
+        for row in rows:
+            writer.writerow([_csv_value(value) for value in row])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+
+    if not header_written:
+        # Empty table: still emit the header so the file is loadable
+        writer.writerow([column.key for column in _table_query(table, user_id).selected_columns])
+        yield buffer.getvalue()
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file object that hands written bytes back to a generator"""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _arrow_schema(table):
+    """Arrow schema matching the columns exported for a table"""
+    import pyarrow as pa
+
+    if table == 'health_data':
+        return pa.schema([
+            ('id', pa.int64()), ('user_id', pa.int64()), ('provider', pa.string()),
+            ('data_type', pa.string()), ('date', pa.date32()), ('value', pa.float64()),
+            ('unit', pa.string()), ('extra_data', pa.string()),
+            ('source_version', pa.string()), ('data_quality', pa.string()),
+            ('created_at', pa.timestamp('us')), ('updated_at', pa.timestamp('us')),
+        ])
+    if table == 'blood_tests':
+        return pa.schema([
+            ('id', pa.int64()), ('test_date', pa.date32()), ('lab_name', pa.string()),
+            ('notes', pa.string()), ('file_path', pa.string()),
+            ('created_at', pa.timestamp('us')), ('updated_at', pa.timestamp('us')),
+        ])
+    return pa.schema([
+        ('id', pa.int64()), ('blood_test_id', pa.int64()), ('marker_name', pa.string()),
+        ('value', pa.float64()), ('unit', pa.string()),
+        ('reference_range_low', pa.float64()), ('reference_range_high', pa.float64()),
+        ('is_abnormal', pa.bool_()), ('notes', pa.string()),
+    ])
+
+
+def _column_values(columns, rows):
+    """(name, values) per column of a row batch, with extra_data as JSON text"""
+    for name, values in zip(columns, zip(*rows)):
+        if name == 'extra_data':
+            values = [json.dumps(v) if v is not None else None for v in values]
+        yield name, values
+
+
+def generate_parquet(user_id, table, compression='snappy'):
+    """Stream one table as Parquet, one row group per PARQUET_ROW_GROUP_SIZE rows"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = _arrow_schema(table)
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression=compression)
+    pending = {name: [] for name in schema.names}
+    pending_rows = 0
+
+    def flush_row_group():
+        columns = [pa.array(pending[name], type=schema.field(name).type) for name in schema.names]
+        writer.write_table(pa.Table.from_arrays(columns, schema=schema), row_group_size=PARQUET_ROW_GROUP_SIZE)
+        for values in pending.values():
+            values.clear()
+
+    try:
+        for columns, rows in iter_table_batches(table, user_id):
+            for name, values in _column_values(columns, rows):
+                pending[name].extend(values)
+            pending_rows += len(rows)
+
+            if pending_rows >= PARQUET_ROW_GROUP_SIZE:
+                flush_row_group()
+                pending_rows = 0
+                yield sink.drain()
+
+        if pending_rows:
+            flush_row_group()
+    finally:
+        writer.close()
+
+    yield sink.drain()
+
+
+def generate_arrow(user_id, table):
+    """Stream one table as an Arrow IPC stream, one record batch per query batch"""
+    import pyarrow as pa
+
+    schema = _arrow_schema(table)
+    sink = _ChunkSink()
+    writer = pa.ipc.new_stream(sink, schema)
+
+    try:
+        for columns, rows in iter_table_batches(table, user_id):
+            arrays = {name: values for name, values in _column_values(columns, rows)}
+            writer.write_batch(pa.RecordBatch.from_arrays(
+                [pa.array(arrays[name], type=schema.field(name).type) for name in schema.names],
+                schema=schema
+            ))
+            yield sink.drain()
+    finally:
+        writer.close()
+
+    yield sink.drain()
+
+
+def generate_msgpack(user_id, tables=EXPORT_TABLES):
+    """Stream tables as a sequence of MessagePack maps, one per row batch
+
+    Each map is {'record_type': table, 'columns': {name: [values]}}, so a
+    reader can build a DataFrame per batch without touching single rows.
+    Dates and timestamps are ISO strings.
+    """
+    import msgpack
+
+    packer = msgpack.Packer(default=_json_value)
+    for table in tables:
+        for columns, rows in iter_table_batches(table, user_id):
+            yield packer.pack({
+                'record_type': table,
+                'columns': {name: list(values) for name, values in zip(columns, zip(*rows))}
+            })
+
+
+def gzip_stream(chunks, level=GZIP_LEVEL):
+    """Gzip a stream of str/bytes chunks without buffering the whole body"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode('utf-8')
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
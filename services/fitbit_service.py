@@ -1,7 +1,8 @@
 import requests
 from datetime import datetime, timedelta
 from flask import current_app
-from models import db, HealthData
+from models import db
+from services.ingestion import save_health_data
 
 class FitbitService:
     BASE_URL = 'https://api.fitbit.com'
@@ -143,7 +144,7 @@ class FitbitService:
                         if sleep_record.get('isMainSleep'):
                             minutes = sleep_record.get('minutesAsleep', 0)
                             self._save_health_data(user_id, 'sleep_duration', current_date, 
-                                                 minutes / 60, 'hours')
+                                                 minutes, 'minutes')
                             synced_data['sleep'] += 1
                             break
                 
@@ -156,26 +157,5 @@ class FitbitService:
     
     def _save_health_data(self, user_id, data_type, date, value, unit):
         """Save or update health data"""
-        existing = HealthData.query.filter_by(
-            user_id=user_id,
-            provider='fitbit',
-            data_type=data_type,
-            date=date
-        ).first()
-        
-        if existing:
-            existing.value = value
-            existing.unit = unit
-        else:
-            health_data = HealthData(
-                user_id=user_id,
-                provider='fitbit',
-                data_type=data_type,
-                date=date,
-                value=value,
-                unit=unit
-            )
-            db.session.add(health_data)
-        
-        db.session.commit()
+        save_health_data(user_id, 'fitbit', data_type, date, value, unit)
 
@@ -0,0 +1,77 @@
+from sqlalchemy import select
+from models import db, HealthData
+from services import units, rollup_service, catalog_service, anomaly_service, reconciliation, snapshot_service, series_cache
+
+# Single write path for synced health data
+# Every provider service saves its daily values through save_health_data so
+# derived data (rollups, catalog, anomaly state, canonical values, snapshot versions) is maintained in the same transaction as the
+# raw row it depends on, and the cached series arrays are patched after commit.
+
+
+def existing_row_select(user_id, provider, data_type, date):
+    """The stored row for one user/provider/data_type/day, if any"""
+    return select(HealthData).where(
+        HealthData.user_id == user_id,
+        HealthData.provider == provider,
+        HealthData.data_type == data_type,
+        HealthData.date == date
+    ).limit(1)
+
+
+def save_health_data(user_id, provider, data_type, date, value, unit):
+    """Insert or update one daily value - PRESERVES ALL HISTORICAL DATA
+
+    value/unit may be in any unit the registry knows (services.units); they
+    are stored in the data type's canonical unit. Returns (record, created,
+    old_value), or (None, False, None) when the unit cannot be converted:
+    that value is logged and skipped so the rest of the sync goes on.
+    Derived tables are only touched when the stored value or unit actually
+    changes.
+    """
+    try:
+        value, unit = units.to_canonical(data_type, value, unit)
+    except ValueError as e:
+        print(f"Skipping {provider} {data_type} for {date}: {e}")
+        return None, False, None
+
+    existing = db.session.execute(existing_row_select(user_id, provider, data_type, date)).scalar()
+
+    if existing:
+        record = existing
+        created = False
+        old_value = existing.value
+        changed = existing.value != value or existing.unit != unit
+        existing.value = value
+        existing.unit = unit
+    else:
+        record = HealthData(
+            user_id=user_id,
+            provider=provider,
+            data_type=data_type,
+            date=date,
+            value=value,
+            unit=unit
+        )
+        db.session.add(record)
+        created = True
+        old_value = None
+        changed = True
+
+    try:
+        if changed:
+            rollup_service.apply_upsert(user_id, provider, data_type, date, old_value, value)
+            catalog_service.apply_upsert(user_id, provider, data_type, date, unit, created)
+            anomaly_service.apply_upsert(user_id, provider, data_type, date, value)
+            reconciliation.apply_upsert(user_id, data_type, date)
+            snapshot_service.mark_stale(user_id, date)
+        db.session.commit()
+    except Exception as e:
+        print(f"Error saving health data: {e}")
+        db.session.rollback()
+        raise
+
+    # Caches are only touched once the write is committed
+    if changed:
+        series_cache.apply_upsert(user_id, provider, data_type, date, value, unit)
+
+    return record, created, old_value
@@ -1,7 +1,7 @@
 import requests
 from datetime import datetime, timedelta
 from flask import current_app
-from models import db, HealthData
+from services.ingestion import save_health_data
 
 class OuraService:
     BASE_URL = 'https://api.ouraring.com'
@@ -181,8 +181,7 @@ class OuraService:
                     
                     # Total sleep time
                     if 'total_sleep_duration' in sleep_record:
-                        hours = sleep_record['total_sleep_duration'] / 3600
-                        self._save_health_data(user_id, 'sleep_duration', date, hours, 'hours')
+                        self._save_health_data(user_id, 'sleep_duration', date, sleep_record['total_sleep_duration'], 'seconds')
                     
                     # Sleep score
                     if 'score' in sleep_record:
@@ -190,13 +189,11 @@ class OuraService:
                     
                     # REM sleep
                     if 'rem_sleep_duration' in sleep_record:
-                        hours = sleep_record['rem_sleep_duration'] / 3600
-                        self._save_health_data(user_id, 'rem_sleep', date, hours, 'hours')
+                        self._save_health_data(user_id, 'rem_sleep', date, sleep_record['rem_sleep_duration'], 'seconds')
                     
                     # Deep sleep
                     if 'deep_sleep_duration' in sleep_record:
-                        hours = sleep_record['deep_sleep_duration'] / 3600
-                        self._save_health_data(user_id, 'deep_sleep', date, hours, 'hours')
+                        self._save_health_data(user_id, 'deep_sleep', date, sleep_record['deep_sleep_duration'], 'seconds')
 
                     # Sleep efficiency
                     if 'efficiency' in sleep_record:
@@ -206,9 +203,9 @@ class OuraService:
 
                     # Sleep latency (time to fall asleep)
                     if 'latency' in sleep_record:
-                        latency = sleep_record['latency'] / 60  # Convert to minutes
+                        latency = sleep_record['latency']
                         if latency is not None:
-                            self._save_health_data(user_id, 'sleep_latency', date, latency, 'minutes')
+                            self._save_health_data(user_id, 'sleep_latency', date, latency, 'seconds')
 
                     # Number of wake-ups
                     if 'wakeups' in sleep_record:
@@ -218,9 +215,9 @@ class OuraService:
 
                     # Light sleep duration
                     if 'light_sleep_duration' in sleep_record:
-                        hours = sleep_record['light_sleep_duration'] / 3600
-                        if hours > 0:
-                            self._save_health_data(user_id, 'light_sleep', date, hours, 'hours')
+                        seconds = sleep_record['light_sleep_duration']
+                        if seconds:
+                            self._save_health_data(user_id, 'light_sleep', date, seconds, 'seconds')
 
                     synced_data['sleep'] += 1
             
@@ -244,9 +241,9 @@ class OuraService:
 
                     # Sedentary time
                     if 'sedentary_time' in activity:
-                        sedentary_hours = activity['sedentary_time'] / 3600  # Convert to hours
-                        if sedentary_hours is not None:
-                            self._save_health_data(user_id, 'sedentary_time', date, sedentary_hours, 'hours')
+                        sedentary_seconds = activity['sedentary_time']
+                        if sedentary_seconds is not None:
+                            self._save_health_data(user_id, 'sedentary_time', date, sedentary_seconds, 'seconds')
 
                     # MET minutes - handle both simple values and complex objects
                     if 'met' in activity:
@@ -276,19 +273,19 @@ class OuraService:
 
                     # Activity time breakdown
                     if 'low_activity_time' in activity:
-                        low_activity_hours = activity['low_activity_time'] / 3600
-                        if low_activity_hours is not None:
-                            self._save_health_data(user_id, 'low_activity_time', date, low_activity_hours, 'hours')
+                        low_activity_seconds = activity['low_activity_time']
+                        if low_activity_seconds is not None:
+                            self._save_health_data(user_id, 'low_activity_time', date, low_activity_seconds, 'seconds')
 
                     if 'medium_activity_time' in activity:
-                        medium_activity_hours = activity['medium_activity_time'] / 3600
-                        if medium_activity_hours is not None:
-                            self._save_health_data(user_id, 'medium_activity_time', date, medium_activity_hours, 'hours')
+                        medium_activity_seconds = activity['medium_activity_time']
+                        if medium_activity_seconds is not None:
+                            self._save_health_data(user_id, 'medium_activity_time', date, medium_activity_seconds, 'seconds')
 
                     if 'high_activity_time' in activity:
-                        high_activity_hours = activity['high_activity_time'] / 3600
-                        if high_activity_hours is not None:
-                            self._save_health_data(user_id, 'high_activity_time', date, high_activity_hours, 'hours')
+                        high_activity_seconds = activity['high_activity_time']
+                        if high_activity_seconds is not None:
+                            self._save_health_data(user_id, 'high_activity_time', date, high_activity_seconds, 'seconds')
 
                     # Target calories
                     if 'target_calories' in activity:
@@ -462,38 +459,11 @@ class OuraService:
         # Data Retention Policy: Never delete historical health data
         # Each data point represents a unique measurement at a specific time
         # Updates are allowed for the same date/type/provider combination
+        record, created, old_value = save_health_data(user_id, 'oura', data_type, date, value, unit)
 
-        existing = HealthData.query.filter_by(
-            user_id=user_id,
-            provider='oura',
-            data_type=data_type,
-            date=date
-        ).first()
-
-        if existing:
-            # Update existing record (same date/type/provider)
-            old_value = existing.value
-            existing.value = value
-            existing.unit = unit
-            existing.updated_at = datetime.utcnow()
-            print(f"Updated Oura data: {data_type} for {date} - {old_value} → {value}")
-        else:
-            # Create new record (preserves all historical data)
-            health_data = HealthData(
-                user_id=user_id,
-                provider='oura',
-                data_type=data_type,
-                date=date,
-                value=value,
-                unit=unit
-            )
-            db.session.add(health_data)
+        if record is None:
+            return
+        if created:
             print(f"Saved new Oura data: {data_type} for {date} - {value} {unit}")
-
-        try:
-            db.session.commit()
-        except Exception as e:
-            print(f"Error saving health data: {e}")
-            db.session.rollback()
-            raise
-
+        else:
+            print(f"Updated Oura data: {data_type} for {date} - {old_value} → {value}")
@@ -0,0 +1,173 @@
+from itertools import groupby
+import numpy as np
+from sqlalchemy import select
+from models import db, bump_data_version, HealthData, HealthDataCanonical
+
+# Multi-provider reconciliation
+# Users with several devices get one row per provider for the same metric
+# and day (e.g. Fitbit and Oura steps). Each metric has a merge rule that
+# picks or combines those rows into one canonical value, kept in
+# health_data_canonical by services.ingestion so reads get one series per
+# metric without grouping by provider.
+#
+# Rules:
+# - 'priority': value of the first provider in the list that has one
+# - 'max' / 'min': largest / smallest value, attributed to its provider
+# - 'mean': average of all providers (provider recorded as 'merged')
+
+MERGE_RULES = ('priority', 'max', 'min', 'mean')
+DEFAULT_PROVIDER_PRIORITY = ('oura', 'fitbit', 'clue')
+MERGED_PROVIDER = 'merged'
+
+RECONCILIATION_RULES = {
+    # A device that was not worn all day under-counts, so the larger count wins
+    'steps': ('max', None),
+    'distance': ('max', None),
+    'calories': ('max', None),
+    'active_calories': ('max', None),
+    # Overnight measurements: prefer the ring over the wrist
+    'sleep_duration': ('priority', ('oura', 'fitbit')),
+    'resting_heart_rate': ('priority', ('oura', 'fitbit')),
+}
+
+
+def rule_for(data_type):
+    """(rule, provider priority) used for a data type"""
+    rule, priority = RECONCILIATION_RULES.get(data_type, ('priority', None))
+    return rule, priority or DEFAULT_PROVIDER_PRIORITY
+
+
+def _rank(provider, priority):
+    """Sort key of a provider: listed providers first, then alphabetical"""
+    return (priority.index(provider) if provider in priority else len(priority), provider)
+
+
+def reconcile(data_type, candidates):
+    """Canonical (value, unit, provider, source_count) from [(provider, value, unit)], or None"""
+    candidates = [c for c in candidates if c[1] is not None]
+    if not candidates:
+        return None
+
+    rule, priority = rule_for(data_type)
+    candidates.sort(key=lambda c: _rank(c[0], priority))
+
+    if rule == 'max':
+        provider, value, unit = max(candidates, key=lambda c: c[1])
+    elif rule == 'min':
+        provider, value, unit = min(candidates, key=lambda c: c[1])
+    elif rule == 'mean' and len(candidates) > 1:
+        provider = MERGED_PROVIDER
+        value = sum(c[1] for c in candidates) / len(candidates)
+        unit = candidates[0][2]
+    else:
+        provider, value, unit = candidates[0]
+
+    return value, unit, provider, len(candidates)
+
+
+def reconcile_arrays(data_type, parts):
+    """Vectorised reconcile over whole series: parts is [(provider, dates, values)]
+
+    Returns (dates, values) with one value per day, using the same rule as
+    reconcile().
+    """
+    if not parts:
+        return np.array([], dtype='datetime64[D]'), np.array([], dtype=np.float64)
+
+    rule, priority = rule_for(data_type)
+    order = sorted(range(len(parts)), key=lambda i: _rank(parts[i][0], priority))
+    dates = np.concatenate([parts[i][1] for i in order])
+    values = np.concatenate([parts[i][2] for i in order])
+    ranks = np.concatenate([np.full(len(parts[i][1]), rank) for rank, i in enumerate(order)])
+
+    valid = ~np.isnan(values)
+    dates, values, ranks = dates[valid], values[valid], ranks[valid]
+
+    if rule == 'mean':
+        unique_dates, inverse = np.unique(dates, return_inverse=True)
+        sums = np.bincount(inverse, weights=values, minlength=len(unique_dates))
+        counts = np.bincount(inverse, minlength=len(unique_dates))
+        return unique_dates, sums / counts
+
+    if rule == 'max':
+        first = np.lexsort((ranks, -values, dates))
+    elif rule == 'min':
+        first = np.lexsort((ranks, values, dates))
+    else:
+        first = np.lexsort((ranks, dates))
+
+    dates, values = dates[first], values[first]
+    unique_dates, index = np.unique(dates, return_index=True)
+    return unique_dates, values[index]
+
+
+def candidates_select(user_id, data_type, date):
+    """(provider, value, unit) of every provider's row for one user/data_type/day"""
+    return select(
+        HealthData.provider, HealthData.value, HealthData.unit
+    ).where(
+        HealthData.user_id == user_id,
+        HealthData.data_type == data_type,
+        HealthData.date == date
+    )
+
+
+def rebuild_select(user_id):
+    """All of a user's rows grouped by data_type and day, for rebuild_canonical"""
+    return select(
+        HealthData.data_type, HealthData.date, HealthData.provider, HealthData.value, HealthData.unit
+    ).where(
+        HealthData.user_id == user_id
+    ).order_by(
+        HealthData.data_type, HealthData.date
+    )
+
+
+def apply_upsert(user_id, data_type, date):
+    """Recompute the canonical value of one user/data_type/day (caller commits)"""
+    candidates = db.session.execute(candidates_select(user_id, data_type, date)).all()
+    result = reconcile(data_type, [tuple(c) for c in candidates])
+
+    canonical = HealthDataCanonical.query.filter_by(
+        user_id=user_id,
+        data_type=data_type,
+        date=date
+    ).first()
+
+    if result is None:
+        if canonical is not None:
+            db.session.delete(canonical)
+        return
+
+    if canonical is None:
+        canonical = HealthDataCanonical(user_id=user_id, data_type=data_type, date=date)
+        db.session.add(canonical)
+    canonical.value, canonical.unit, canonical.provider, canonical.source_count = result
+
+
+def rebuild_canonical(user_id):
+    """Recompute every canonical value of a user from raw health_data"""
+    HealthDataCanonical.query.filter_by(user_id=user_id).delete()
+
+    rows = db.session.execute(rebuild_select(user_id).execution_options(yield_per=10000))
+
+    mappings = []
+    for (data_type, date), group in groupby(rows, key=lambda row: (row[0], row[1])):
+        result = reconcile(data_type, [(provider, value, unit) for _, _, provider, value, unit in group])
+        if result is None:
+            continue
+        value, unit, provider, source_count = result
+        mappings.append({
+            'user_id': user_id,
+            'data_type': data_type,
+            'date': date,
+            'value': value,
+            'unit': unit,
+            'provider': provider,
+            'source_count': source_count
+        })
+
+    db.session.bulk_insert_mappings(HealthDataCanonical, mappings)
+    bump_data_version(db.session, [user_id])
+    db.session.commit()
+    return len(mappings)
@@ -0,0 +1,169 @@
+from datetime import timedelta
+from sqlalchemy import func, select
+from models import db, bump_data_version, HealthData, HealthDataRollup
+
+# Week/month/year rollups of health_data
+# Each upsert adjusts the three buckets containing its date in O(1): the
+# old value's contribution is subtracted and the new one added. Only when
+# an update removes the current min or max is that one bucket recomputed
+# from raw rows.
+
+ROLLUP_PERIODS = ('week', 'month', 'year')
+
+
+def period_start(date, period):
+    """First day of the period containing date (weeks start on Monday)"""
+    if period == 'week':
+        return date - timedelta(days=date.weekday())
+    if period == 'month':
+        return date.replace(day=1)
+    if period == 'year':
+        return date.replace(month=1, day=1)
+    raise ValueError(f"Unknown rollup period: {period}")
+
+
+def period_end(start, period):
+    """First day after the period starting at start"""
+    if period == 'week':
+        return start + timedelta(days=7)
+    if period == 'month':
+        return (start + timedelta(days=32)).replace(day=1)
+    return start.replace(year=start.year + 1)
+
+
+def apply_upsert(user_id, provider, data_type, date, old_value, new_value):
+    """Fold one changed daily value into its rollup buckets
+
+    old_value is the value the row held before (None for a new row).
+    Changes are added to the current session; the caller commits.
+    """
+    for period in ROLLUP_PERIODS:
+        start = period_start(date, period)
+        rollup = HealthDataRollup.query.filter_by(
+            user_id=user_id,
+            provider=provider,
+            data_type=data_type,
+            period=period,
+            period_start=start
+        ).first()
+
+        needs_recompute = False
+        if rollup is None:
+            if new_value is None:
+                continue
+            rollup = HealthDataRollup(
+                user_id=user_id,
+                provider=provider,
+                data_type=data_type,
+                period=period,
+                period_start=start,
+                value_count=0,
+                value_sum=0.0,
+                value_sum_sq=0.0
+            )
+            db.session.add(rollup)
+            # An update landing in a missing bucket means rollups predate this row
+            needs_recompute = old_value is not None
+        elif old_value is not None:
+            rollup.value_count -= 1
+            rollup.value_sum -= old_value
+            rollup.value_sum_sq -= old_value * old_value
+            if old_value == rollup.value_min or old_value == rollup.value_max:
+                needs_recompute = True
+
+        if new_value is not None:
+            rollup.value_count += 1
+            rollup.value_sum += new_value
+            rollup.value_sum_sq += new_value * new_value
+            rollup.value_min = new_value if rollup.value_min is None else min(rollup.value_min, new_value)
+            rollup.value_max = new_value if rollup.value_max is None else max(rollup.value_max, new_value)
+
+        if needs_recompute:
+            _recompute_bucket(rollup)
+
+        if rollup.value_count <= 0:
+            db.session.delete(rollup)
+
+
+def bucket_stats_select(user_id, provider, data_type, start, end):
+    """Count, sum, sum of squares, min and max of one series over start..end (exclusive)"""
+    return select(
+        func.count(HealthData.value),
+        func.sum(HealthData.value),
+        func.sum(HealthData.value * HealthData.value),
+        func.min(HealthData.value),
+        func.max(HealthData.value)
+    ).where(
+        HealthData.user_id == user_id,
+        HealthData.provider == provider,
+        HealthData.data_type == data_type,
+        HealthData.date >= start,
+        HealthData.date < end
+    )
+
+
+def rebuild_select(user_id):
+    """Every non-null value of a user, for rebuild_rollups"""
+    return select(
+        HealthData.provider, HealthData.data_type, HealthData.date, HealthData.value
+    ).where(
+        HealthData.user_id == user_id,
+        HealthData.value.isnot(None)
+    )
+
+
+def _recompute_bucket(rollup):
+    """Reload one bucket's statistics from raw rows
+
+    Raw rows already carry the new value (autoflush), so this sees the final
+    state of the bucket.
+    """
+    stats = db.session.execute(bucket_stats_select(
+        rollup.user_id, rollup.provider, rollup.data_type,
+        rollup.period_start, period_end(rollup.period_start, rollup.period)
+    )).one()
+
+    rollup.value_count = stats[0]
+    rollup.value_sum = stats[1] or 0.0
+    rollup.value_sum_sq = stats[2] or 0.0
+    rollup.value_min = stats[3]
+    rollup.value_max = stats[4]
+
+
+def rebuild_rollups(user_id):
+    """Recompute every rollup bucket for a user from raw health_data"""
+    HealthDataRollup.query.filter_by(user_id=user_id).delete()
+
+    buckets = {}
+    rows = db.session.execute(rebuild_select(user_id).execution_options(yield_per=10000))
+
+    for provider, data_type, date, value in rows:
+        for period in ROLLUP_PERIODS:
+            key = (provider, data_type, period, period_start(date, period))
+            bucket = buckets.get(key)
+            if bucket is None:
+                buckets[key] = [1, value, value * value, value, value]
+            else:
+                bucket[0] += 1
+                bucket[1] += value
+                bucket[2] += value * value
+                if value < bucket[3]:
+                    bucket[3] = value
+                if value > bucket[4]:
+                    bucket[4] = value
+
+    db.session.bulk_insert_mappings(HealthDataRollup, [{
+        'user_id': user_id,
+        'provider': provider,
+        'data_type': data_type,
+        'period': period,
+        'period_start': start,
+        'value_count': count,
+        'value_sum': total,
+        'value_sum_sq': total_sq,
+        'value_min': value_min,
+        'value_max': value_max
+    } for (provider, data_type, period, start), (count, total, total_sq, value_min, value_max) in buckets.items()])
+    bump_data_version(db.session, [user_id])
+    db.session.commit()
+    return len(buckets)
@@ -0,0 +1,222 @@
+import json
+import numpy as np
+from flask import current_app, request
+from sqlalchemy import select
+from models import db, HealthData, BloodTest, BloodMarker
+
+try:
+    import orjson
+except ImportError:  # Standard library encoder
+    orjson = None
+
+# Fast serialization for list endpoints
+# Rows are selected as plain column tuples (no ORM objects are built) and
+# turned into dicts with exactly the keys of the models' to_dict(). Those
+# are encoded by orjson, which handles date/datetime natively, with keys
+# sorted as jsonify does. The bytes match jsonify(obj.to_dict()) given
+# app.json.ensure_ascii = False (set in create_app), except for floats:
+# - NaN and +/-Infinity are written as null (jsonify writes NaN/Infinity,
+#   which is not valid JSON and breaks JSON.parse in browsers)
+# - exponents are shortest form (1e16, 1e-7 where jsonify writes 1e+16,
+#   1e-07); the parsed values are identical
+# Without orjson the standard library encoder matches jsonify exactly.
+
+HEALTH_DATA_FIELDS = (
+    HealthData.id, HealthData.user_id, HealthData.provider, HealthData.data_type,
+    HealthData.date, HealthData.value, HealthData.unit, HealthData.extra_data,
+    HealthData.created_at, HealthData.updated_at,
+)
+
+BLOOD_TEST_FIELDS = (
+    BloodTest.id, BloodTest.test_date, BloodTest.lab_name, BloodTest.notes,
+    BloodTest.file_path, BloodTest.created_at, BloodTest.updated_at,
+)
+
+BLOOD_MARKER_FIELDS = (
+    BloodMarker.id, BloodMarker.marker_name, BloodMarker.value, BloodMarker.unit,
+    BloodMarker.reference_range_low, BloodMarker.reference_range_high,
+    BloodMarker.is_abnormal, BloodMarker.notes,
+)
+
+
+def _default(value):
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(obj):
+    """Encode to compact JSON bytes with sorted keys (non-finite floats: see above)"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS)
+    return json.dumps(obj, sort_keys=True, separators=(',', ':'), ensure_ascii=False,
+                      default=_default).encode('utf-8')
+
+
+def json_response(obj, status=200):
+    """Drop-in for jsonify() on large payloads"""
+    return current_app.response_class(dumps(obj) + b'\n', status=status, mimetype='application/json')
+
+
+def fetch_dicts(statement):
+    """Execute a column SELECT and return one dict per row, keyed by column name"""
+    result = db.session.execute(statement)
+    keys = list(result.keys())
+    return [dict(zip(keys, row)) for row in result]
+
+
+def health_data_select():
+    """SELECT of the HealthData.to_dict() columns, ready for filters"""
+    return select(*HEALTH_DATA_FIELDS)
+
+
+def blood_tests(user_id, limit=None):
+    """BloodTest.to_dict() shaped dicts (markers included), newest first"""
+    query = select(*BLOOD_TEST_FIELDS).where(
+        BloodTest.user_id == user_id
+    ).order_by(BloodTest.test_date.desc())
+    if limit is not None:
+        query = query.limit(limit)
+
+    tests = fetch_dicts(query)
+    by_id = {}
+    for test in tests:
+        test['markers'] = []
+        by_id[test['id']] = test
+
+    if by_id:
+        markers = db.session.execute(
+            select(BloodMarker.blood_test_id, *BLOOD_MARKER_FIELDS).where(
+                BloodMarker.blood_test_id.in_(list(by_id))
+            ).order_by(BloodMarker.id)
+        )
+        keys = list(markers.keys())[1:]
+        for row in markers:
+            by_id[row[0]]['markers'].append(dict(zip(keys, row[1:])))
+
+    return tests
+
+
+# Columnar layout (layout=columnar)
+# One object per series with its metadata once and parallel arrays of
+# dates and values, ascending by date. With date_encoding='delta' the
+# dates become a start_date plus day offsets from the previous point
+# (the first offset is 0), which are mostly 1s for daily data.
+
+LAYOUTS = ('rows', 'columnar')
+DATE_ENCODINGS = ('iso', 'delta')
+
+SERIES_FIELDS = (
+    HealthData.provider, HealthData.data_type, HealthData.unit, HealthData.date, HealthData.value,
+)
+
+
+def series_select():
+    """SELECT of just the columns a columnar response needs"""
+    return select(*SERIES_FIELDS)
+
+
+def _date_arrays(dates, date_encoding):
+    """{'dates': [...]} or {'start_date': ..., 'date_deltas': [...]} for ascending dates"""
+    if date_encoding != 'delta':
+        return {'dates': [d if isinstance(d, str) else d.isoformat() for d in dates]}
+    if not dates:
+        return {'start_date': None, 'date_deltas': []}
+    days = np.array(dates, dtype='datetime64[D]')
+    return {
+        'start_date': str(days[0]),
+        'date_deltas': np.diff(days, prepend=days[:1]).astype(np.int64).tolist()
+    }
+
+
+def columnar_series(records, group_fields=('provider', 'data_type'), date_encoding='iso'):
+    """Group record dicts (date, value, unit, ...) into columnar series"""
+    groups = {}
+    for record in records:
+        groups.setdefault(tuple(record[field] for field in group_fields), []).append(record)
+
+    series = []
+    for key, rows in groups.items():
+        rows.sort(key=lambda r: r['date'])
+        entry = dict(zip(group_fields, key))
+        entry['unit'] = rows[-1].get('unit')
+        entry.update(_date_arrays([r['date'] for r in rows], date_encoding))
+        entry['values'] = [r['value'] for r in rows]
+        series.append(entry)
+
+    return {'layout': 'columnar', 'series': series}
+
+
+def columnar_summary(summary, date_encoding='iso'):
+    """Copy of a window summary with each 'values' list as ascending parallel arrays"""
+    converted = {}
+    for data_type, stats in summary.items():
+        stats = dict(stats)
+        if 'values' in stats:
+            points = sorted(stats.pop('values'), key=lambda v: v['date'])
+            stats.update(_date_arrays([v['date'] for v in points], date_encoding))
+            stats['values'] = [v['value'] for v in points]
+        converted[data_type] = stats
+    return converted
+
+
+# Binary formats, chosen with the Accept header
+# application/vnd.apache.arrow.stream returns the records as one Arrow IPC
+# stream (pyarrow.ipc.open_stream(...).read_pandas()), application/msgpack
+# returns the same document as the JSON body with dates as ISO strings.
+
+FORMAT_MIMETYPES = {
+    'json': 'application/json',
+    'arrow': 'application/vnd.apache.arrow.stream',
+    'msgpack': 'application/msgpack',
+}
+
+
+def negotiate_format():
+    """'json', 'arrow' or 'msgpack' from the request's Accept header (json when unspecified)"""
+    by_mimetype = {mimetype: name for name, mimetype in FORMAT_MIMETYPES.items()}
+    best = request.accept_mimetypes.best_match(list(by_mimetype), default='application/json')
+    return by_mimetype[best]
+
+
+def _arrow_types():
+    import pyarrow as pa
+    return {
+        'id': pa.int64(), 'user_id': pa.int64(), 'source_count': pa.int32(),
+        'provider': pa.string(), 'data_type': pa.string(), 'unit': pa.string(),
+        'date': pa.date32(), 'value': pa.float64(), 'extra_data': pa.string(),
+        'created_at': pa.timestamp('us'), 'updated_at': pa.timestamp('us'),
+    }
+
+
+def arrow_response(records, fields=None):
+    """Records as an Arrow IPC stream (one column per field)
+
+    fields gives the column names for an empty result (default: health data rows).
+    """
+    import pyarrow as pa
+
+    types = _arrow_types()
+    if records:
+        names = list(records[0])
+    else:
+        names = list(fields or [column.key for column in HEALTH_DATA_FIELDS])
+    arrays = []
+    for name in names:
+        values = [record[name] for record in records]
+        if name == 'extra_data':
+            values = [json.dumps(v) if v is not None else None for v in values]
+        arrays.append(pa.array(values, type=types.get(name)))
+    table = pa.Table.from_arrays(arrays, names=names)
+
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return current_app.response_class(sink.getvalue().to_pybytes(), mimetype=FORMAT_MIMETYPES['arrow'])
+
+
+def msgpack_response(obj):
+    """obj as MessagePack, dates and timestamps as ISO strings"""
+    import msgpack
+
+    return current_app.response_class(msgpack.packb(obj, default=_default), mimetype=FORMAT_MIMETYPES['msgpack'])
@@ -0,0 +1,271 @@
+import threading
+from collections import OrderedDict
+import numpy as np
+from flask import current_app
+from sqlalchemy import select
+from models import db, User, HealthData
+from services import reconciliation, downsampling
+
+# Process-local columnar cache of each active user's health data
+# A user's data is held as one pair of contiguous arrays per
+# (provider, data_type): dates (datetime64[D], ascending, unique) and
+# values (float64, NaN where no value was stored). It is loaded lazily with
+# one column-only query, evicted LRU once SERIES_CACHE_MAX_BYTES is
+# exceeded, and tagged with users.data_version:
+# - a request whose user has a newer version reloads (covers writes made
+#   by other processes such as sync_scheduler.py)
+# - services.ingestion swaps in a patched copy after each commit, tagged
+#   with the new version, when its own write is the only one since
+# Entries are never modified once cached, so readers holding one (and its
+# series dict) see a consistent version without taking the lock.
+
+
+class UserSeries:
+    """All cached series for one user"""
+
+    def __init__(self, data_version, series):
+        self.data_version = data_version
+        self.series = series  # {(provider, data_type): (dates, values, unit)}
+
+    @property
+    def nbytes(self):
+        # Arrays plus a rough per-series allowance for keys and tuples
+        return sum(d.nbytes + v.nbytes + 200 for d, v, _ in self.series.values())
+
+    def data_types(self):
+        return sorted({data_type for _, data_type in self.series})
+
+    def get(self, data_type, provider=None):
+        """(dates, values) for one data_type; without a provider, the reconciled series"""
+        if provider is not None:
+            entry = self.series.get((provider, data_type))
+            if entry is None:
+                return np.array([], dtype='datetime64[D]'), np.array([], dtype=np.float64)
+            return entry[0], entry[1]
+
+        parts = [(p, d, v) for (p, t), (d, v, _) in self.series.items() if t == data_type]
+        if len(parts) == 1:
+            return parts[0][1], parts[0][2]
+        return reconciliation.reconcile_arrays(data_type, parts)
+
+
+class SeriesCache:
+    """LRU (by bytes) map of user_id -> UserSeries"""
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, user_id, data_version):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry.data_version == data_version:
+                self._entries.move_to_end(user_id)
+                return entry
+        return None
+
+    def put(self, user_id, entry, max_bytes):
+        size = entry.nbytes
+        with self._lock:
+            previous = self._entries.pop(user_id, None)
+            if previous is not None:
+                self._bytes -= previous.nbytes
+            if size > max_bytes:
+                return
+            self._entries[user_id] = entry
+            self._bytes += size
+            while self._bytes > max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.nbytes
+
+    def peek(self, user_id):
+        with self._lock:
+            return self._entries.get(user_id)
+
+    def discard(self, user_id):
+        with self._lock:
+            entry = self._entries.pop(user_id, None)
+            if entry is not None:
+                self._bytes -= entry.nbytes
+
+    def replace(self, user_id, old_entry, new_entry):
+        """Swap old_entry for new_entry unless the user's entry changed meanwhile"""
+        with self._lock:
+            if self._entries.get(user_id) is not old_entry:
+                return False
+            self._entries[user_id] = new_entry
+            self._bytes += new_entry.nbytes - old_entry.nbytes
+            return True
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+
+_cache = SeriesCache()
+
+
+def is_enabled():
+    return current_app.config.get('SERIES_CACHE_MAX_BYTES', 0) > 0
+
+
+def user_series_select(user_id):
+    """Column-only SELECT of all of a user's series, in series and date order"""
+    return select(
+        HealthData.provider, HealthData.data_type, HealthData.date, HealthData.value, HealthData.unit
+    ).where(
+        HealthData.user_id == user_id
+    ).order_by(
+        HealthData.provider, HealthData.data_type, HealthData.date
+    )
+
+
+def load_user_series(user_id, data_version):
+    """Read all of a user's series with one column-only query"""
+    rows = db.session.execute(user_series_select(user_id)).all()
+
+    series = {}
+    start = 0
+    for end in range(1, len(rows) + 1):
+        if end == len(rows) or rows[end][:2] != rows[start][:2]:
+            chunk = rows[start:end]
+            dates = np.array([r[2] for r in chunk], dtype='datetime64[D]')
+            values = np.array([np.nan if r[3] is None else r[3] for r in chunk], dtype=np.float64)
+            series[rows[start][:2]] = (dates, values, chunk[-1][4])
+            start = end
+
+    return UserSeries(data_version, series)
+
+
+def get_user_series(user_id, data_version=None):
+    """Cached UserSeries for a user, loading it if missing or stale"""
+    if data_version is None:
+        # Usually already in the identity map (flask-login loaded it for this request)
+        data_version = db.session.get(User, user_id).data_version
+
+    entry = _cache.get(user_id, data_version)
+    if entry is None:
+        entry = load_user_series(user_id, data_version)
+        _cache.put(user_id, entry, current_app.config.get('SERIES_CACHE_MAX_BYTES', 0))
+    return entry
+
+
+def apply_upsert(user_id, provider, data_type, date, value, unit):
+    """Swap in a patched copy of a cached user's series after a committed write
+
+    Only applied when this write is the only one since the cached version;
+    otherwise the entry is dropped and reloaded on next use.
+    """
+    entry = _cache.peek(user_id)
+    if entry is None:
+        return
+
+    new_version = db.session.query(User.data_version).filter_by(id=user_id).scalar()
+    if new_version != entry.data_version + 1:
+        _cache.discard(user_id)
+        return
+
+    day = np.datetime64(date, 'D')
+    value = np.nan if value is None else float(value)
+    dates, values, _ = entry.series.get((provider, data_type), (
+        np.array([], dtype='datetime64[D]'), np.array([], dtype=np.float64), unit
+    ))
+
+    position = int(np.searchsorted(dates, day))
+    if position < len(dates) and dates[position] == day:
+        values = values.copy()
+        values[position] = value
+    else:
+        dates = np.insert(dates, position, day)
+        values = np.insert(values, position, value)
+
+    # Copy on write: requests may be reading entry concurrently, and another
+    # request may have reloaded the user since the peek (then theirs stays)
+    series = dict(entry.series)
+    series[(provider, data_type)] = (dates, values, unit)
+    _cache.replace(user_id, entry, UserSeries(new_version, series))
+
+
+def _json_float(value):
+    return None if np.isnan(value) else float(value)
+
+
+def window_summary(user_id, days, include_values=True, data_version=None):
+    """Same result as HealthData.get_window_summary, computed over cached arrays"""
+    from datetime import datetime, timedelta
+
+    entry = get_user_series(user_id, data_version)
+    start = np.datetime64(datetime.utcnow().date() - timedelta(days=days), 'D')
+
+    by_type = {}
+    for (provider, data_type), (dates, values, unit) in entry.series.items():
+        first = int(np.searchsorted(dates, start))
+        if first < len(dates):
+            by_type.setdefault(data_type, []).append((dates[first:], values[first:], unit))
+
+    summary = {}
+    for data_type, parts in by_type.items():
+        dates = np.concatenate([d for d, _, _ in parts])
+        values = np.concatenate([v for _, v, _ in parts])
+        units = np.concatenate([np.full(len(d), i) for i, (d, _, _) in enumerate(parts)])
+
+        # Newest first; stable so ties keep provider order
+        order = np.argsort(-dates.astype(np.int64), kind='stable')
+        dates, values, units = dates[order], values[order], units[order]
+
+        valid = values[~np.isnan(values)]
+        summary[data_type] = {
+            'unit': parts[units[0]][2] or '',
+            'latest_value': _json_float(values[0]),
+            'latest_date': str(dates[0]),
+            'count': int(len(values)),
+            'min': float(valid.min()) if len(valid) else None,
+            'max': float(valid.max()) if len(valid) else None,
+            'avg': float(valid.mean()) if len(valid) else None
+        }
+        if include_values:
+            summary[data_type]['values'] = [
+                {'date': day, 'value': _json_float(value)}
+                for day, value in zip(np.datetime_as_string(dates).tolist(), values.tolist())
+            ]
+
+    return summary
+
+
+def downsampled_records(user_id, max_points, method, provider=None, data_type=None, start=None, end=None,
+                        data_version=None):
+    """Downsampled series as serialization.SERIES_FIELDS dicts, newest first
+
+    Same rows as running downsampling.downsample_groups over the SQL
+    result, but reduced over the cached arrays: series within max_points
+    are returned whole, larger ones lose their missing values before LTTB
+    or min/max picks the points. start/end are dates.
+    """
+    entry = get_user_series(user_id, data_version)
+    start = np.datetime64(start, 'D') if start is not None else None
+    end = np.datetime64(end, 'D') if end is not None else None
+
+    records = []
+    for (series_provider, series_type), (dates, values, unit) in entry.series.items():
+        if (provider is not None and series_provider != provider) or (data_type is not None and series_type != data_type):
+            continue
+        first = int(np.searchsorted(dates, start)) if start is not None else 0
+        last = int(np.searchsorted(dates, end, side='right')) if end is not None else len(dates)
+        dates, values = dates[first:last], values[first:last]
+
+        if len(dates) > max_points:
+            present = ~np.isnan(values)
+            dates, values = dates[present], values[present]
+        if len(dates) > max_points:
+            kept = downsampling.downsample_indices(dates.astype(np.float64), values, max_points, method)
+            dates, values = dates[kept], values[kept]
+
+        records.extend({
+            'provider': series_provider, 'data_type': series_type, 'unit': unit,
+            'date': day, 'value': None if value != value else value
+        } for day, value in zip(dates.tolist(), values.tolist()))
+
+    records.sort(key=lambda record: record['date'], reverse=True)
+    return records
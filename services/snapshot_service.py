@@ -0,0 +1,263 @@
+import os
+import shutil
+import threading
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import select, func
+from models import db, HealthData, HealthDataSnapshot
+from services.rollup_service import period_start, period_end
+
+# Per-user monthly Parquet snapshots of health_data, queried with DuckDB
+# Ad-hoc analytics (range scans, group-bys over years of history) run over
+# these files instead of the OLTP table, so they never compete with sync
+# writes. services.ingestion bumps the version of the month it writes to;
+# refresh_snapshots rewrites only stale months, and runs in the background
+# after every sync. Files are hive-partitioned:
+#   {SNAPSHOT_FOLDER}/user_id=1/month=2024-05/data.parquet
+# Only predefined queries are exposed; their filters are bound parameters.
+
+SNAPSHOT_COLUMNS = (HealthData.provider, HealthData.data_type, HealthData.date, HealthData.value, HealthData.unit)
+
+_STATS = "count(value) AS count, avg(value) AS mean, stddev_samp(value) AS std, min(value) AS min, max(value) AS max"
+
+SNAPSHOT_QUERIES = {
+    'monthly': {
+        'description': 'Count/mean/std/min/max/sum per data type, provider and month',
+        'sql': f"""
+            SELECT data_type, provider, strftime(date_trunc('month', date), '%Y-%m') AS month,
+                   {_STATS}, sum(value) AS sum
+            FROM health_data {{where}}
+            GROUP BY ALL ORDER BY data_type, provider, month
+        """,
+    },
+    'weekly': {
+        'description': 'Count/mean/std/min/max/sum per data type, provider and ISO week (Monday start)',
+        'sql': f"""
+            SELECT data_type, provider, strftime(date_trunc('week', date), '%Y-%m-%d') AS week_start,
+                   {_STATS}, sum(value) AS sum
+            FROM health_data {{where}}
+            GROUP BY ALL ORDER BY data_type, provider, week_start
+        """,
+    },
+    'weekday': {
+        'description': 'Count/mean/std/min/max per data type, provider and ISO weekday (1 = Monday)',
+        'sql': f"""
+            SELECT data_type, provider, isodow(date) AS weekday, {_STATS}
+            FROM health_data {{where}}
+            GROUP BY ALL ORDER BY data_type, provider, weekday
+        """,
+    },
+    'distribution': {
+        'description': 'Count/mean/std and percentiles per data type and provider',
+        'sql': f"""
+            SELECT data_type, provider, {_STATS},
+                   quantile_cont(value, 0.1) AS p10, quantile_cont(value, 0.25) AS p25,
+                   quantile_cont(value, 0.5) AS median, quantile_cont(value, 0.75) AS p75,
+                   quantile_cont(value, 0.9) AS p90
+            FROM health_data {{where}}
+            GROUP BY ALL ORDER BY data_type, provider
+        """,
+    },
+}
+
+# One refresh at a time per user (a second sync waits, then picks up what is left)
+_refresh_locks = {}
+_refresh_locks_guard = threading.Lock()
+
+
+def _user_lock(user_id):
+    with _refresh_locks_guard:
+        return _refresh_locks.setdefault(user_id, threading.Lock())
+
+
+def _user_folder(user_id):
+    return os.path.join(current_app.config['SNAPSHOT_FOLDER'], f'user_id={user_id}')
+
+
+def snapshot_path(user_id, month):
+    """Parquet file holding a user's rows for the month starting at month"""
+    return os.path.join(_user_folder(user_id), f"month={month.strftime('%Y-%m')}", 'data.parquet')
+
+
+def mark_stale(user_id, date):
+    """Record a write to the month containing date (caller commits)"""
+    month = period_start(date, 'month')
+    snapshot = HealthDataSnapshot.query.filter_by(user_id=user_id, month=month).first()
+    if snapshot is None:
+        db.session.add(HealthDataSnapshot(user_id=user_id, month=month, version=1, snapshot_version=0, row_count=0))
+    else:
+        # SQL-side increment so a refresh reading the row concurrently is never overwritten
+        snapshot.version = HealthDataSnapshot.version + 1
+
+
+def month_rows_select(user_id, month):
+    """SNAPSHOT_COLUMNS of a user's rows in the month starting at month"""
+    return select(*SNAPSHOT_COLUMNS).where(
+        HealthData.user_id == user_id,
+        HealthData.date >= month,
+        HealthData.date < period_end(month, 'month')
+    ).order_by(HealthData.data_type, HealthData.provider, HealthData.date)
+
+
+def data_dates_select(user_id):
+    """Distinct dates a user has health data on, for rebuild_snapshots"""
+    return select(HealthData.date).where(HealthData.user_id == user_id).distinct()
+
+
+def _write_month(user_id, month):
+    """Rewrite one month's Parquet file from health_data; returns its row count"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    rows = db.session.execute(month_rows_select(user_id, month)).all()
+
+    path = snapshot_path(user_id, month)
+    if not rows:
+        if os.path.exists(path):
+            os.remove(path)
+        return 0
+
+    provider, data_type, date, value, unit = zip(*rows)
+    table = pa.table({
+        'provider': pa.array(provider, pa.string()),
+        'data_type': pa.array(data_type, pa.string()),
+        'date': pa.array(date, pa.date32()),
+        'value': pa.array(value, pa.float64()),
+        'unit': pa.array(unit, pa.string()),
+    })
+
+    # Write next to the target and swap, so readers never see a partial file
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.tmp'
+    pq.write_table(table, tmp_path, compression='zstd')
+    os.replace(tmp_path, path)
+    return len(rows)
+
+
+def _file_missing(snapshot):
+    """Whether a month that was written with rows has lost its Parquet file"""
+    return bool(snapshot.row_count) and not os.path.exists(snapshot_path(snapshot.user_id, snapshot.month))
+
+
+def refresh_snapshots(user_id):
+    """Rewrite every stale month of a user's snapshot, and months whose file
+    has gone missing; returns months written"""
+    with _user_lock(user_id):
+        stale = [s for s in snapshot_status(user_id) if s.is_stale or _file_missing(s)]
+
+        for snapshot in stale:
+            # Writes landing after this point bump version past it and keep the month stale
+            version = snapshot.version
+            snapshot.row_count = _write_month(user_id, snapshot.month)
+            snapshot.snapshot_version = version
+            snapshot.refreshed_at = datetime.utcnow()
+            db.session.commit()
+
+        return len(stale)
+
+
+def rebuild_snapshots(user_id):
+    """Drop a user's snapshots and rewrite every month with health data"""
+    with _user_lock(user_id):
+        HealthDataSnapshot.query.filter_by(user_id=user_id).delete()
+        shutil.rmtree(_user_folder(user_id), ignore_errors=True)
+
+        months = {
+            period_start(date, 'month')
+            for (date,) in db.session.execute(data_dates_select(user_id))
+        }
+        db.session.bulk_insert_mappings(HealthDataSnapshot, [{
+            'user_id': user_id,
+            'month': month,
+            'version': 1,
+            'snapshot_version': 0,
+            'row_count': 0
+        } for month in months])
+        db.session.commit()
+
+    return refresh_snapshots(user_id)
+
+
+def delete_snapshots(user_id):
+    """Remove a user's snapshot files (their rows go with the user)"""
+    shutil.rmtree(_user_folder(user_id), ignore_errors=True)
+
+
+def snapshot_status(user_id):
+    """Snapshot months of a user, oldest first"""
+    return HealthDataSnapshot.query.filter_by(user_id=user_id).order_by(HealthDataSnapshot.month).all()
+
+
+def snapshot_state(user_id):
+    """Validator for a user's snapshot query results
+
+    Snapshot refreshes are not covered by users.data_version (see
+    models.VERSIONED_MODELS), so snapshot queries are cached on this
+    instead: it changes on every write (version), refresh (snapshot_version,
+    refreshed_at) and rebuild (month count) of the user's snapshot months.
+    """
+    count, versions, snapshot_versions, refreshed_at = db.session.query(
+        func.count(HealthDataSnapshot.id), func.sum(HealthDataSnapshot.version),
+        func.sum(HealthDataSnapshot.snapshot_version), func.max(HealthDataSnapshot.refreshed_at)
+    ).filter(HealthDataSnapshot.user_id == user_id).one()
+    return f'{count}:{versions}:{snapshot_versions}:{refreshed_at}'
+
+
+def run_query(user_id, name, data_types=None, provider=None, start=None, end=None):
+    """Run a predefined query over a user's snapshot files
+
+    Only the months overlapping start..end are read. Returns {'query',
+    'rows', 'stale_months', 'missing_months'}; stale months are still
+    answered from their last snapshot and refresh after the next sync.
+    Months whose file has gone missing are left out of the rows and listed
+    in missing_months (and stale_months) until refresh_snapshots rewrites
+    them. Nothing is written here.
+    """
+    import duckdb
+
+    sql = SNAPSHOT_QUERIES[name]['sql']
+    snapshots = [
+        s for s in snapshot_status(user_id)
+        if (start is None or period_end(s.month, 'month') > start) and (end is None or s.month <= end)
+    ]
+    files, missing = [], []
+    for snapshot in snapshots:
+        if _file_missing(snapshot):
+            missing.append(snapshot)
+        elif snapshot.row_count:
+            files.append(snapshot_path(user_id, snapshot.month))
+
+    result = {
+        'query': name,
+        'rows': [],
+        'stale_months': [s.month.strftime('%Y-%m') for s in snapshots if s.is_stale or s in missing],
+        'missing_months': [s.month.strftime('%Y-%m') for s in missing],
+    }
+    if not files:
+        return result
+
+    conditions, params = [], []
+    if data_types:
+        conditions.append('list_contains(?, data_type)')
+        params.append(list(data_types))
+    if provider:
+        conditions.append('provider = ?')
+        params.append(provider)
+    if start is not None:
+        conditions.append('date >= ?')
+        params.append(start)
+    if end is not None:
+        conditions.append('date <= ?')
+        params.append(end)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+
+    with duckdb.connect(config={
+        'threads': current_app.config['SNAPSHOT_QUERY_THREADS'],
+        'memory_limit': current_app.config['SNAPSHOT_QUERY_MEMORY_LIMIT'],
+    }) as connection:
+        connection.read_parquet(files).create_view('health_data')
+        cursor = connection.execute(sql.format(where=where), params)
+        columns = [description[0] for description in cursor.description]
+        result['rows'] = [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    return result
@@ -0,0 +1,194 @@
+# Unit registry
+# Every data type is stored in one canonical unit, so aggregates and
+# cross-provider comparisons never convert per row at query time.
+# Provider services hand save_health_data whatever unit the source API
+# uses (e.g. Oura durations in seconds) and ingestion converts it with
+# to_canonical(); read endpoints convert back out with convert() when the
+# client asks for other units.
+#
+# Unit codes are the short strings already stored in health_data.unit,
+# so existing rows stay valid.
+
+# code: (dimension, scale, offset) where base value = value * scale + offset
+UNITS = {
+    'seconds': ('duration', 1.0, 0.0),
+    'minutes': ('duration', 60.0, 0.0),
+    'hours': ('duration', 3600.0, 0.0),
+    'm': ('distance', 1.0, 0.0),
+    'km': ('distance', 1000.0, 0.0),
+    'mi': ('distance', 1609.344, 0.0),
+    'kcal': ('energy', 1.0, 0.0),
+    'kJ': ('energy', 1 / 4.184, 0.0),
+    '°C': ('temperature', 1.0, 0.0),
+    '°F': ('temperature', 5 / 9, -32 * 5 / 9),
+    'ms': ('interval', 1.0, 0.0),
+    'bpm': ('rate', 1.0, 0.0),
+    '%': ('ratio', 1.0, 0.0),
+    'steps': ('steps', 1.0, 0.0),
+    'score': ('score', 1.0, 0.0),
+    'count': ('count', 1.0, 0.0),
+    'day': ('day', 1.0, 0.0),
+    'boolean': ('boolean', 1.0, 0.0),
+}
+
+# Accepted spellings of source units
+ALIASES = {
+    's': 'seconds', 'sec': 'seconds', 'second': 'seconds',
+    'min': 'minutes', 'minute': 'minutes',
+    'h': 'hours', 'hr': 'hours', 'hour': 'hours',
+    'kilometers': 'km', 'meters': 'm', 'miles': 'mi',
+    'C': '°C', 'F': '°F', 'celsius': '°C', 'fahrenheit': '°F',
+}
+
+CANONICAL_UNITS = {
+    'sleep_duration': 'hours',
+    'rem_sleep': 'hours',
+    'deep_sleep': 'hours',
+    'light_sleep': 'hours',
+    'sleep_latency': 'minutes',
+    'sedentary_time': 'hours',
+    'low_activity_time': 'hours',
+    'medium_activity_time': 'hours',
+    'high_activity_time': 'hours',
+    'distance': 'km',
+    'calories': 'kcal',
+    'active_calories': 'kcal',
+    'target_calories': 'kcal',
+    'body_temperature': '°C',
+    'temperature_deviation': '°C',
+    'temperature_trend_deviation': '°C',
+    'resting_heart_rate': 'bpm',
+    'hrv': 'ms',
+    'steps': 'steps',
+    'sleep_efficiency': '%',
+    'sleep_wakeups': 'count',
+    'cycle_day': 'day',
+    'period': 'boolean',
+}
+
+# Data types whose values are differences, so temperature offsets do not apply
+DELTA_DATA_TYPES = {'temperature_deviation', 'temperature_trend_deviation'}
+
+
+def unit_code(unit):
+    """Registry code for a unit string, or the string itself if unknown"""
+    return ALIASES.get(unit, unit)
+
+
+def canonical_unit(data_type):
+    """Stored unit of a data type, or None if the data type is not registered"""
+    return CANONICAL_UNITS.get(data_type)
+
+
+def converter(data_type, from_unit, to_unit):
+    """(scale, offset) turning from_unit values into to_unit values for a data type
+
+    Raises ValueError if the units are unknown or measure different things.
+    """
+    from_code, to_code = unit_code(from_unit), unit_code(to_unit)
+    if from_code == to_code:
+        return 1.0, 0.0
+    if from_code not in UNITS or to_code not in UNITS:
+        raise ValueError(f"Unknown unit for {data_type}: {from_unit if from_code not in UNITS else to_unit}")
+
+    from_dimension, from_scale, from_offset = UNITS[from_code]
+    to_dimension, to_scale, to_offset = UNITS[to_code]
+    if from_dimension != to_dimension:
+        raise ValueError(f"Cannot convert {data_type} from {from_unit} to {to_unit}")
+
+    scale = from_scale / to_scale
+    if data_type in DELTA_DATA_TYPES:
+        return scale, 0.0
+    return scale, (from_offset - to_offset) / to_scale
+
+
+def convert(data_type, value, from_unit, to_unit):
+    """Convert one value between units of the same dimension"""
+    if value is None:
+        return None
+    scale, offset = converter(data_type, from_unit, to_unit)
+    return value * scale + offset
+
+
+def to_canonical(data_type, value, unit):
+    """(value, unit) in the data type's canonical unit, used at write time
+
+    Unregistered data types keep the unit they were given.
+    """
+    target = canonical_unit(data_type)
+    if target is None:
+        return value, unit_code(unit) if unit else unit
+    return convert(data_type, value, unit or target, target), target
+
+
+def parse_preferences(raw):
+    """Parse a units= query parameter into (per data type, per dimension) preferences
+
+    Accepts comma-separated 'data_type:unit' pairs and bare units, which
+    apply to every data type of that unit's dimension, e.g.
+    'sleep_duration:minutes,°F,mi'. Raises ValueError on unknown units.
+    """
+    by_type, by_dimension = {}, {}
+    for token in (raw or '').split(','):
+        token = token.strip()
+        if not token:
+            continue
+        data_type, _, unit = token.rpartition(':')
+        code = unit_code(unit)
+        if code not in UNITS:
+            raise ValueError(f"Unknown unit: {unit}")
+        if data_type:
+            by_type[data_type] = code
+        else:
+            by_dimension[UNITS[code][0]] = code
+    return by_type, by_dimension
+
+
+def preferred_unit(data_type, unit, preferences):
+    """Unit a client asked for, or None when the stored unit should be kept"""
+    by_type, by_dimension = preferences
+    target = by_type.get(data_type)
+    if target is None and unit in UNITS:
+        target = by_dimension.get(UNITS[unit][0])
+    return target if target and target != unit else None
+
+
+def convert_records(records, preferences, fields=('value',)):
+    """Convert record dicts ({'data_type', 'unit', ...}) in place to preferred units"""
+    converters = {}
+    for record in records:
+        key = (record.get('data_type'), record.get('unit'))
+        if key not in converters:
+            target = preferred_unit(key[0], key[1], preferences)
+            converters[key] = (target, converter(key[0], key[1], target)) if target else None
+        conversion = converters[key]
+        if conversion is None:
+            continue
+        target, (scale, offset) = conversion
+        for field in fields:
+            if record.get(field) is not None:
+                record[field] = record[field] * scale + offset
+        record['unit'] = target
+    return records
+
+
+def convert_summary(summary, preferences):
+    """Copy of a {data_type: summary} mapping with statistics in preferred units"""
+    converted = {}
+    for data_type, stats in summary.items():
+        target = preferred_unit(data_type, stats.get('unit'), preferences)
+        if target is None:
+            converted[data_type] = stats
+            continue
+        scale, offset = converter(data_type, stats['unit'], target)
+        stats = dict(stats, unit=target)
+        for field in ('latest_value', 'min', 'max', 'avg'):
+            if stats.get(field) is not None:
+                stats[field] = stats[field] * scale + offset
+        if 'values' in stats:
+            stats['values'] = [
+                dict(v, value=v['value'] * scale + offset if v['value'] is not None else None)
+                for v in stats['values']
+            ]
+        converted[data_type] = stats
+    return converted
@@ -18,6 +18,7 @@ def sync_recent_user_data():
     from models import Integration, User
     from services.oura_service import OuraService
     from services.fitbit_service import FitbitService
+    from services import snapshot_service
 
     app = create_app()
 
@@ -29,6 +30,7 @@ def sync_recent_user_data():
         print(f"Found {len(active_integrations)} active integrations")
 
         synced_users = 0
+        synced_user_ids = set()
         total_synced = {'oura': 0, 'fitbit': 0, 'clue': 0}
 
         for integration in active_integrations:
@@ -52,6 +54,7 @@ def sync_recent_user_data():
                 # Update last sync timestamp
                 integration.last_sync = datetime.utcnow()
                 synced_users += 1
+                synced_user_ids.add(user.id)
 
             except Exception as e:
                 print(f"Error syncing {integration.provider} for user {integration.user_id}: {e}")
@@ -66,6 +69,15 @@ def sync_recent_user_data():
             print(f"❌ Database commit error: {e}")
             db.session.rollback()
 
+        # Bring the Parquet snapshots up to date with what was just synced
+        for uid in sorted(synced_user_ids):
+            try:
+                months = snapshot_service.refresh_snapshots(uid)
+                print(f"Refreshed {months} snapshot months for user {uid}")
+            except Exception as e:
+                print(f"❌ Snapshot refresh error for user {uid}: {e}")
+                db.session.rollback()
+
 if __name__ == '__main__':
     sync_recent_user_data()
 
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Add repository root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from services.analytics_service import lagged_rank_correlation
+
+
+def reference_spearman(matrix, lag, min_overlap):
+    """Per-pair Spearman: pandas ranks over each pair's overlap, then np.corrcoef"""
+    days = matrix.shape[0] - lag
+    a, b = matrix[:days], matrix[lag:lag + days]
+    k = matrix.shape[1]
+    coefficients = np.full((k, k), np.nan)
+    overlap = np.zeros((k, k), dtype=np.int64)
+    for i in range(k):
+        for j in range(k):
+            paired = ~np.isnan(a[:, i]) & ~np.isnan(b[:, j])
+            overlap[i, j] = paired.sum()
+            if overlap[i, j] < max(min_overlap, 2):
+                continue
+            rank_a = pd.Series(a[paired, i]).rank().to_numpy()
+            rank_b = pd.Series(b[paired, j]).rank().to_numpy()
+            if rank_a.std() and rank_b.std():
+                coefficients[i, j] = np.corrcoef(rank_a, rank_b)[0, 1]
+    return coefficients, overlap
+
+
+def sample_matrix(seed, days=200):
+    rng = np.random.default_rng(seed)
+    matrix = rng.normal(size=(days, 6))
+    matrix[:, 1] = np.round(matrix[:, 1] * 2)  # Many ties
+    matrix[:, 2] = matrix[:, 0] + rng.normal(scale=0.5, size=days)
+    matrix[:, 3] = 7.0  # Constant: undefined correlation
+    # Columns 0 and 2 share their gaps, as series from one provider do
+    shared = rng.random(days) < 0.2
+    matrix[shared, 0] = np.nan
+    matrix[shared, 2] = np.nan
+    matrix[rng.random(days) < 0.3, 4] = np.nan
+    matrix[:days // 2, 5] = np.nan
+    return matrix
+
+
+@pytest.mark.parametrize('lag', [0, 1, 3])
+@pytest.mark.parametrize('seed', [0, 1])
+def test_lagged_rank_correlation_matches_per_pair_ranking(seed, lag):
+    matrix = sample_matrix(seed)
+
+    coefficients, overlap = lagged_rank_correlation(matrix, lag, min_overlap=10)
+    expected, expected_overlap = reference_spearman(matrix, lag, min_overlap=10)
+
+    np.testing.assert_array_equal(overlap, expected_overlap)
+    np.testing.assert_allclose(coefficients, expected, atol=1e-12, equal_nan=True)
+
+
+def test_lagged_rank_correlation_without_gaps():
+    matrix = np.random.default_rng(2).normal(size=(120, 4))
+
+    coefficients, overlap = lagged_rank_correlation(matrix, 2, min_overlap=10)
+    expected, _ = reference_spearman(matrix, 2, min_overlap=10)
+
+    assert (overlap == 118).all()
+    np.testing.assert_allclose(coefficients, expected, atol=1e-12)
+
+
+def test_lagged_rank_correlation_below_min_overlap():
+    matrix = sample_matrix(3, days=12)
+
+    coefficients, overlap = lagged_rank_correlation(matrix, 5, min_overlap=10)
+
+    assert (overlap < 10).all()
+    assert np.isnan(coefficients).all()
+
+
+def test_lagged_rank_correlation_lag_beyond_range():
+    coefficients, overlap = lagged_rank_correlation(np.ones((3, 2)), 5)
+
+    assert np.isnan(coefficients).all()
+    assert (overlap == 0).all()
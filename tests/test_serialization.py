@@ -0,0 +1,66 @@
+import math
+
+import pytest
+from flask import Flask, jsonify
+
+from services import serialization
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.json.ensure_ascii = False  # as in create_app
+    with app.app_context():
+        yield app
+
+
+def jsonify_bytes(obj):
+    return jsonify(obj).get_data()
+
+
+def response_bytes(obj):
+    return serialization.json_response(obj).get_data()
+
+
+RECORDS = [{
+    'id': 1,
+    'provider': 'oura',
+    'data_type': 'body_temperature',
+    'date': '2024-01-31',
+    'value': 36.55,
+    'unit': '°C',
+    'extra_data': {'source': 'ring', 'samples': [1, 2.5, None], 'valid': True},
+    'created_at': '2024-01-31T08:15:00.123456',
+    'updated_at': None,
+}, {
+    'value': 0.1,
+    'count': 10 ** 12,
+    'ratio': -0.0,
+    'large': 1.5e15,
+}]
+
+
+def test_matches_jsonify_for_regular_values(app):
+    assert response_bytes(RECORDS) == jsonify_bytes(RECORDS)
+
+
+@pytest.mark.skipif(serialization.orjson is None, reason='orjson not installed')
+def test_non_finite_floats_are_null(app):
+    obj = {'nan': math.nan, 'inf': math.inf, 'ninf': -math.inf}
+    assert jsonify_bytes(obj) == b'{"inf":Infinity,"nan":NaN,"ninf":-Infinity}\n'
+    assert response_bytes(obj) == b'{"inf":null,"nan":null,"ninf":null}\n'
+
+
+@pytest.mark.skipif(serialization.orjson is None, reason='orjson not installed')
+def test_exponent_notation_parses_to_the_same_values(app):
+    obj = [1e16, 1e-7, 2.5e-300, 1.5e300]
+    assert response_bytes(obj) == b'[1e16,1e-7,2.5e-300,1.5e300]\n'
+    assert jsonify_bytes(obj) == b'[1e+16,1e-07,2.5e-300,1.5e+300]\n'
+    assert app.json.loads(response_bytes(obj)) == app.json.loads(jsonify_bytes(obj)) == obj
+
+
+@pytest.mark.parametrize('value', [math.nan, math.inf, -math.inf, 1e16, 1e-7])
+def test_standard_library_fallback_matches_jsonify(app, monkeypatch, value):
+    monkeypatch.setattr(serialization, 'orjson', None)
+    obj = RECORDS + [{'value': value}]
+    assert response_bytes(obj) == jsonify_bytes(obj)